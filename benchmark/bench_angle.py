@@ -0,0 +1,35 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from time import perf_counter
+import numpy as np
+from lib.optimize_ import optimize_angle
+
+"""
+航线方向自动优化的基准测试: 不同顶点数的多边形, 每隔0.5度评估一次（共360个候选角度）
+运行方式: python benchmark/bench_angle.py [顶点数 ...]
+"""
+
+
+def make_polygon(n, rng):
+    # 随机半径的星形多边形, 尺寸约 1600 x 1000 米
+    theta = np.sort(rng.uniform(0, 2 * np.pi, n))
+    radius = rng.uniform(0.6, 1.0, n)
+    return np.column_stack([800 * radius * np.cos(theta), 500 * radius * np.sin(theta)])
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4, 20, 100, 500]
+    rng = np.random.default_rng(0)
+    repeat = 10
+    for n in sizes:
+        coords = make_polygon(n, rng)
+        optimize_angle(coords, 13.9, 5)  # 预热
+        start = perf_counter()
+        for _ in range(repeat):
+            best, curve = optimize_angle(coords, 13.9, 5, return_curve=True)
+        elapsed = (perf_counter() - start) / repeat
+        print(f"顶点数 {n:>5d}: {elapsed * 1000:8.2f} 毫秒, 最优角度 {best:6.1f} 度")
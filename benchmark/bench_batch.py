@@ -0,0 +1,48 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from time import perf_counter
+import tempfile
+import numpy as np
+from lib.batch_ import BatchPlanner
+
+"""
+批量规划吞吐量基准测试: 进程数从 1 增加到 N 时每秒完成的任务数
+运行方式: python benchmark/bench_batch.py [任务数] [最大进程数] [--kmz]
+"""
+
+
+def make_jobs(count, seed=0):
+    # 生成随机的凸四边形区域（约 200 米 x 300 米）
+    rng = np.random.default_rng(seed)
+    jobs = []
+    for _ in range(count):
+        lng, lat = rng.uniform(110, 115), rng.uniform(25, 30)
+        dx, dy = 0.002, 0.003
+        polygon = [[lng, lat], [lng + dx, lat], [lng + dx, lat + dy], [lng, lat + dy]]
+        params = {"global_height": 20, "flight_speed": 3, "angle": float(rng.uniform(0, 180))}
+        jobs.append((polygon, params))
+    return jobs
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if len(args) > 0 else 200
+    max_cores = int(args[1]) if len(args) > 1 else (os.cpu_count() or 1)
+    export_kmz = "--kmz" in sys.argv
+    jobs = make_jobs(count)
+
+    workers = sorted({1, *[2**i for i in range(1, max_cores.bit_length())], max_cores})
+    print(f"{'进程数':>6} {'耗时(s)':>10} {'任务/秒':>10} {'加速比':>8} {'失败数':>6}")
+    base = None
+    for n in workers:
+        with tempfile.TemporaryDirectory() as output_dir:
+            planner = BatchPlanner(max_workers=n, output_dir=output_dir if export_kmz else None)
+            start = perf_counter()
+            failed = sum(not result.ok for result in planner.run(jobs))
+            elapsed = perf_counter() - start
+        base = base or elapsed
+        print(f"{n:>6d} {elapsed:>10.3f} {count / elapsed:>10.1f} {base / elapsed:>8.2f} {failed:>6d}")
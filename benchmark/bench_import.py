@@ -0,0 +1,89 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+import argparse
+import json
+import re
+import numpy as np
+
+"""
+导入耗时基准测试: 每次在新的Python进程中导入, 取多次运行的中位数
+只使用坐标转换或kmz导出时不应加载 pyproj、shapely、matplotlib, 且导入耗时相对 numpy 本身的增加不超过预算
+超出预算或加载了不需要的库时返回值为1; --importtime 显示 python -X importtime 中自身耗时最长的模块
+运行方式: python benchmark/bench_import.py [--repeat 7] [--budget 50] [--importtime]
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pyproj", "shapely", "matplotlib")
+# (名称, 导入语句, 是否检查预算)
+CASES = (
+    ("numpy", "import numpy", False),
+    ("transform", "from lib import CoordinateTransformer", True),
+    ("export", "from lib import KmzCreator", True),
+    ("reader", "from lib import read_kmz", True),
+    ("all", "from lib import *", False),
+)
+MEASURE_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from time import perf_counter
+start = perf_counter()
+{statement}
+elapsed = perf_counter() - start
+import json
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def measure(statement: str, repeat: int):
+    """返回 (导入耗时的中位数---单位: 秒, 加载了的重量级库)"""
+    times, loaded = [], set()
+    for _ in range(repeat):
+        script = MEASURE_SCRIPT.format(root=ROOT, statement=statement, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+        elapsed, heavy = json.loads(output.strip().splitlines()[-1])
+        times.append(elapsed)
+        loaded.update(heavy)
+    return float(np.median(times)), sorted(loaded)
+
+
+def importtime(statement: str, top: int = 8):
+    """python -X importtime 中自身耗时最长的模块 [(自身耗时---单位: 微秒, 模块名)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {ROOT!r}); {statement}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    rows = re.findall(r"import time:\s+(\d+) \|\s+\d+ \| (.+)", result.stderr)
+    return sorted(((int(self_time), name.strip()) for self_time, name in rows), reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导入耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=7, help="每种导入的运行次数")
+    parser.add_argument("--budget", type=float, default=50, help="相对 numpy 导入耗时的增加上限---单位: 毫秒")
+    parser.add_argument("--importtime", action="store_true", help="显示自身耗时最长的模块")
+    args = parser.parse_args()
+
+    failures = []
+    baseline = None
+    for name, statement, checked in CASES:
+        elapsed, loaded = measure(statement, args.repeat)
+        baseline = elapsed if baseline is None else baseline
+        extra = (elapsed - baseline) * 1000
+        print(f"{name:<10s} {elapsed * 1000:8.1f} ms  (numpy +{extra:6.1f} ms)  {', '.join(loaded) or '-'}")
+        if checked and extra > args.budget:
+            failures.append(f"{name}: 比 numpy 多 {extra:.1f} ms, 超出预算 {args.budget:.0f} ms")
+        if checked and loaded:
+            failures.append(f"{name}: 加载了 {', '.join(loaded)}")
+        if args.importtime:
+            for self_time, module in importtime(statement):
+                print(f"    {self_time / 1000:8.2f} ms  {module}")
+    for failure in failures:
+        print(f"  超出预算 {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from time import perf_counter
+import io
+import tracemalloc
+import numpy as np
+from lib.create_ import KmzCreator
+from lib.reader_ import read_kmz
+
+"""
+kmz流式读取的基准测试: 生成不同航点数量的kmz, 统计读取耗时和内存峰值, 并检查往返后航点坐标不变
+运行方式: python benchmark/bench_reader.py [航点数 ...]
+"""
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        waypoints = np.column_stack([112.9 + rng.uniform(0, 0.1, n), 28.1 + rng.uniform(0, 0.1, n)])
+        data = KmzCreator(20, 40, 7.5, waypoints.tolist()).to_bytes()
+
+        start = perf_counter()
+        mission = read_kmz(io.BytesIO(data))
+        elapsed = perf_counter() - start
+        tracemalloc.start()
+        read_kmz(io.BytesIO(data))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        same = np.array_equal(mission.waypoints, waypoints)
+        print(
+            f"航点数 {n:>7d}: 耗时 {elapsed:7.3f} 秒, 内存峰值 {peak / 1e6:6.2f} MB, "
+            f"每航点 {peak / n:6.1f} 字节, 坐标一致: {same}"
+        )
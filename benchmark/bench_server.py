@@ -0,0 +1,68 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from time import perf_counter
+import subprocess
+import threading
+import numpy as np
+from lib.server_ import PlanningServer, request_plan
+
+"""
+常驻规划服务的延迟基准测试: 每个小任务单独启动Python进程（导入库、初始化PROJ后规划并导出）
+与向已预热的服务发送HTTP请求的耗时对比
+运行方式: python benchmark/bench_server.py [任务数] [进程数]
+"""
+
+POLYGON = [[112.9446, 28.1851], [112.9450, 28.1851], [112.9448, 28.1865], [112.9444, 28.1863]]
+# 冷启动: 与main.py相同的导入和流程
+COLD_SCRIPT = """
+import sys
+sys.path.append({root!r})
+from lib import *
+calc = Calculator({polygon!r}, global_height={height})
+waypoints, flight_speed = calc.calculate(draw=False)
+KmzCreator(20, calc.global_height, flight_speed, waypoints).to_bytes()
+"""
+
+
+def summary(values) -> str:
+    values = np.array(values) * 1000
+    return f"平均 {values.mean():8.2f} ms, p50 {np.percentile(values, 50):8.2f} ms, p95 {np.percentile(values, 95):8.2f} ms"
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    heights = np.linspace(20, 60, count)
+
+    cold = []
+    for height in heights[: min(count, 10)]:  # 冷启动较慢，最多运行10次
+        start = perf_counter()
+        script = COLD_SCRIPT.format(root=root, polygon=POLYGON, height=float(height))
+        subprocess.run([sys.executable, "-c", script], check=True, capture_output=True)
+        cold.append(perf_counter() - start)
+    print(f"冷启动（{len(cold)} 次）: {summary(cold)}")
+
+    start = perf_counter()
+    with PlanningServer(port=0, max_workers=workers) as server:
+        print(f"服务启动和预热: {(perf_counter() - start) * 1000:.2f} ms")
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://{server.host}:{server.port}"
+        warm = []
+        for height in heights:
+            start = perf_counter()
+            request_plan({"coords": POLYGON, "params": {"global_height": float(height)}}, url)
+            warm.append(perf_counter() - start)
+        print(f"常驻服务（{count} 次）: {summary(warm)}")
+        metrics = server.metrics.summary()
+        for step in ("queue", "plan", "export", "total"):
+            print(
+                f"  服务端 {step:<6s}: 平均 {metrics[step]['mean'] * 1000:8.2f} ms, p95 {metrics[step]['p95'] * 1000:8.2f} ms"
+            )
+        server.shutdown()
+    print(f"冷启动 / 常驻服务: {np.mean(cold) / np.mean(warm):.1f} 倍")
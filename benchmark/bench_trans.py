@@ -0,0 +1,60 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from time import perf_counter
+import numpy as np
+from lib.trans_ import CoordinateTransformer, A_WGS84, E2_WGS84, A_CGCS2000, E2_CGCS2000
+
+"""
+CGCS2000 <-> WGS84 七参数转换的基准测试: 整体数组版本 vs 原逐点循环版本
+运行方式: python benchmark/bench_trans.py [点数 ...]
+"""
+
+
+# 原逐点循环版本（仅用于对比）
+def legacy_geocentric_to_geodetic(X, Y, Z, a, e2):
+    lon = np.arctan2(Y, X)
+    p = np.sqrt(X**2 + Y**2)
+    lat = np.arctan2(Z, p * (1 - e2))
+    lat_prev = 0.0
+    while np.abs(lat - lat_prev) > 1e-12:
+        lat_prev = lat
+        N = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+        h = p / np.cos(lat) - N
+        lat = np.arctan2(Z, p * (1 - e2 * N / (N + h)))
+    return np.rad2deg(lon), np.rad2deg(lat)
+
+
+def legacy_wgs84_to_cgcs2000(trans, coords):
+    output_coords = np.zeros_like(coords)
+    for i in range(coords.shape[0]):
+        X, Y, Z = trans.geodetic_to_geocentric(coords[i, 0], coords[i, 1], 0.0, A_WGS84, E2_WGS84)
+        X2, Y2, Z2 = trans.helmert_transformation(X, Y, Z, -0.00016, 0.00026, 0.00011, 0.0, 0.0, 0.0, 0.0)
+        output_coords[i] = legacy_geocentric_to_geodetic(X2, Y2, Z2, A_CGCS2000, E2_CGCS2000)
+    return output_coords
+
+
+def timeit(func, *args, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func(*args)
+        best = min(best, perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    sizes = [int(float(n)) for n in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    trans = CoordinateTransformer()
+    rng = np.random.default_rng(0)
+
+    print(f"{'点数':>10} {'循环版本(s)':>14} {'数组版本(s)':>14} {'加速比':>10} {'最大差值(度)':>14}")
+    for n in sizes:
+        coords = np.column_stack([rng.uniform(73, 135, n), rng.uniform(3, 54, n)])
+        t_loop, ref = timeit(legacy_wgs84_to_cgcs2000, trans, coords)
+        t_vec, out = timeit(trans.wgs84_to_cgcs2000, coords, repeat=3)
+        diff = np.abs(out - ref).max()
+        print(f"{n:>10d} {t_loop:>14.4f} {t_vec:>14.4f} {t_loop / t_vec:>10.1f} {diff:>14.3e}")
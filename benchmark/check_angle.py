@@ -0,0 +1,87 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import numpy as np
+from lib.calculate_ import Calculator
+from lib.optimize_ import TURN_TIME
+
+"""
+航线方向自动优化的检查: 矩形和随机凸多边形（只有一个单元）在两种起始飞行点下,
+自动选择的角度按实际生成的航线计算的飞行时间不应超过0度, 且与优化时的估计值一致; 存在问题时返回值为1
+运行方式: python benchmark/check_angle.py [--count 40] [--seed 0]
+"""
+
+CENTER = (112.9, 28.1)  # 多边形中心经纬度---单位: 度
+METERS_PER_DEGREE = 111320.0
+# (宽, 高)---单位: 米
+RECTANGLES = ((600, 100), (400, 250), (300, 300), (1000, 37), (120, 800))
+HEIGHT = 30  # 航线高度---单位: 米
+
+
+def to_wgs84(xy: np.ndarray) -> list:
+    """以CENTER为原点的平面坐标（米）近似转换为经纬度"""
+    lng = CENTER[0] + xy[:, 0] / (METERS_PER_DEGREE * np.cos(np.radians(CENTER[1])))
+    lat = CENTER[1] + xy[:, 1] / METERS_PER_DEGREE
+    return np.column_stack([lng, lat]).tolist()
+
+
+def rectangle(width: float, height: float) -> list:
+    return to_wgs84(np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * (width / 2, height / 2))
+
+
+def convex_polygon(rng) -> list:
+    """随机顶点数和半径的圆内接多边形（凸多边形）"""
+    theta = np.sort(rng.uniform(0, 2 * np.pi, rng.integers(3, 9)))
+    radius = rng.uniform(80, 500)
+    return to_wgs84(radius * np.column_stack([np.cos(theta), np.sin(theta)]))
+
+
+def flight_time(calc: Calculator) -> float:
+    """按实际生成的航线计算飞行时间: 总航程 / 飞行速度 + 转弯次数 * 每次转弯耗时"""
+    segments = calc.adjusted_segments
+    length = np.hypot(*np.diff(segments, axis=0).T).sum()
+    return length / calc.effective_flight_speed + TURN_TIME * 2 * (len(segments) // 2 - 1)
+
+
+def check(polygons) -> list:
+    """返回存在问题的情况 [(名称, 起始飞行点, 说明)]"""
+    failures = []
+    for name, coords in polygons:
+        for start_dir in ("right", "left"):
+            auto = Calculator(coords, global_height=HEIGHT, angle="auto", start_dir=start_dir)
+            auto.calculate()
+            auto_time = flight_time(auto)
+            estimate = float(auto.angle_curve.flight_time.min())
+            if not np.isclose(auto_time, estimate, rtol=1e-9, atol=1e-6):
+                failures.append((name, start_dir, f"实际飞行时间 {auto_time:.2f} 秒与估计值 {estimate:.2f} 秒不一致"))
+            zero = Calculator(coords, global_height=HEIGHT, angle=0, start_dir=start_dir)
+            try:
+                zero.calculate()
+            except AssertionError:  # 0度无法规划，不比较
+                continue
+            zero_time = flight_time(zero)
+            if auto_time > zero_time + 1e-6:
+                failures.append(
+                    (name, start_dir, f"{auto.angle:.1f} 度 {auto_time:.2f} 秒, 比 0 度 {zero_time:.2f} 秒更长")
+                )
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="航线方向自动优化的检查")
+    parser.add_argument("--count", type=int, default=40, help="随机凸多边形的数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    polygons = [(f"矩形 {width}x{height}", rectangle(width, height)) for width, height in RECTANGLES]
+    polygons += [(f"凸多边形 {i}", convex_polygon(rng)) for i in range(args.count)]
+    failures = check(polygons)
+    for name, start_dir, message in failures:
+        print(f"  {name} ({start_dir}): {message}")
+    print(f"多边形 {len(polygons)} 个, 存在问题 {len(failures)} 个")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,107 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+from lib.calculate_ import Calculator
+from lib.decompose_ import TRANSIT_TOLERANCE
+
+"""
+单元之间连接段的检查: 非凸区域和带禁飞区的区域分解为多个单元时, 完整的飞行路线（航线、航线之间的连接段以及绕行的连接航线）
+应全部位于区域内, 不穿过禁飞区也不离开区域; 存在问题时返回值为1
+运行方式: python benchmark/check_transit.py [--count 20] [--seed 0]
+"""
+
+CENTER = (112.9, 28.1)  # 区域中心经纬度---单位: 度
+METERS_PER_DEGREE = 111320.0
+HEIGHT = 30  # 航线高度---单位: 米
+ANGLES = (0, 30, 90, 137.5, "auto")
+
+
+def to_wgs84(xy) -> list:
+    """以CENTER为原点的平面坐标（米）近似转换为经纬度"""
+    xy = np.asarray(xy, dtype=np.float64)
+    lng = CENTER[0] + xy[:, 0] / (METERS_PER_DEGREE * np.cos(np.radians(CENTER[1])))
+    lat = CENTER[1] + xy[:, 1] / METERS_PER_DEGREE
+    return np.column_stack([lng, lat]).tolist()
+
+
+def star_polygon(rng) -> list:
+    """内外半径交替的随机星形多边形（非凸）"""
+    count = 2 * rng.integers(3, 12)
+    theta = np.linspace(0, 2 * np.pi, count, endpoint=False) + rng.uniform(0, np.pi)
+    radius = rng.uniform(150, 400) * np.where(np.arange(count) % 2, rng.uniform(0.3, 0.7), 1.0)
+    return to_wgs84(radius[:, None] * np.column_stack([np.cos(theta), np.sin(theta)]))
+
+
+def fixed_areas() -> list:
+    """(名称, Calculator参数): U形区域、带一个和两个禁飞区的正方形"""
+    square = to_wgs84([[0, 0], [300, 0], [300, 300], [0, 300]])
+    return [
+        (
+            "U形",
+            dict(
+                wgs84_coords=to_wgs84(
+                    [[0, 0], [300, 0], [300, 300], [200, 300], [200, 80], [100, 80], [100, 300], [0, 300]]
+                )
+            ),
+        ),
+        ("禁飞区", dict(wgs84_coords=square, holes=[to_wgs84([[100, 100], [200, 100], [200, 200], [100, 200]])])),
+        (
+            "两个禁飞区",
+            dict(
+                wgs84_coords=square,
+                holes=[
+                    to_wgs84([[40, 60], [120, 60], [120, 240], [40, 240]]),
+                    to_wgs84([[180, 40], [260, 120], [200, 260]]),
+                ],
+            ),
+        ),
+    ]
+
+
+def outside_length(calc: Calculator) -> float:
+    """飞行路线（旋转后的平面坐标）位于区域外的总长度---单位: 米"""
+    area = Polygon(calc.point_list, calc.hole_lists).buffer(TRANSIT_TOLERANCE)
+    route = calc.adjusted_segments
+    lines = shapely.linestrings(np.stack([route[:-1], route[1:]], axis=1))
+    return float(shapely.length(shapely.difference(lines, area)).sum())
+
+
+def check(areas) -> list:
+    """返回存在问题的情况 [(名称, 角度, 起始飞行点, 说明)]"""
+    failures = []
+    for name, params in areas:
+        for angle in ANGLES:
+            for start_dir in ("right", "left"):
+                calc = Calculator(global_height=HEIGHT, angle=angle, start_dir=start_dir, **params)
+                try:
+                    calc.calculate()
+                except AssertionError:  # 该方向无法规划，不检查
+                    continue
+                if len(calc.cells) == 1:  # 单个单元时末尾航线可以超出区域，不检查
+                    continue
+                length = outside_length(calc)
+                if length > 0:
+                    failures.append((name, angle, start_dir, f"飞行路线位于区域外 {length:.2f} 米"))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="单元之间连接段的检查")
+    parser.add_argument("--count", type=int, default=20, help="随机星形多边形的数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    areas = fixed_areas() + [(f"星形 {i}", dict(wgs84_coords=star_polygon(rng))) for i in range(args.count)]
+    failures = check(areas)
+    for name, angle, start_dir, message in failures:
+        print(f"  {name} (angle={angle}, {start_dir}): {message}")
+    print(f"区域 {len(areas)} 个, 存在问题 {len(failures)} 个")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,111 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import numpy as np
+from lib.calculate_ import Calculator
+
+"""
+增量规划一致性检查: 同一个 Calculator 在固定场景中以及随机多次 update（包括修改边界点）后再 calculate,
+结果（航点和实际飞行速度, 或规划失败的错误信息）应与使用相同参数新建的 Calculator 完全一致; 存在不一致时返回值为1
+运行方式: python benchmark/check_update.py [--rounds 100] [--seed 0]
+"""
+
+POLYGON = [[112.9446, 28.1851], [112.9450, 28.1851], [112.9448, 28.1865], [112.9444, 28.1863]]
+HOLE = [[112.94465, 28.1856], [112.94475, 28.1856], [112.94475, 28.1858], [112.94465, 28.1858]]
+SQUARE = [[112.9443, 28.1852], [112.9452, 28.1852], [112.9452, 28.1864], [112.9443, 28.1864]]
+
+
+def scaled(coords, factor: float) -> list:
+    """绕顶点平均值缩放（正方形的形心不变, 如该正方形缩放0.5倍时计算出的形心完全相同）"""
+    coords = np.array(coords)
+    center = coords.mean(axis=0)
+    return (center + (coords - center) * factor).tolist()
+
+
+# 参数名 -> 可选取值
+CHOICES = {
+    # 包括形心不变的缩放和顶点顺序改变（以索引指定的航线方向随之改变）
+    "wgs84_coords": (POLYGON, POLYGON[1:] + POLYGON[:1], POLYGON[::-1], SQUARE, scaled(SQUARE, 0.5)),
+    "flight_speed": (None, 3, 8.5, 15),
+    "global_height": (20, 35, 60),
+    "heading_offset": (0, 1, -1, 3),
+    "angle": ((0, 1), 30, 135.5, "auto"),
+    "start_dir": ("right", "left"),
+    "side_overlap_ratio": (10, 15, 30),
+    "camera_shoot_time": (1, 2),
+    "holes": (None, [HOLE]),
+}
+
+
+# 固定场景: (构造参数, 修改的参数)
+SCENARIOS = (
+    # 绕形心缩放: 形心不变但边界改变
+    (dict(wgs84_coords=scaled(SQUARE, 0.5)), dict(wgs84_coords=SQUARE)),
+    # 改变顶点顺序: 以索引指定的航线方向随之改变
+    (dict(wgs84_coords=POLYGON, angle=(0, 1)), dict(wgs84_coords=POLYGON[1:] + POLYGON[:1])),
+)
+
+
+def plan(calc: Calculator):
+    """返回 (航点, 实际飞行速度), 规划失败时返回 (None, 错误信息)"""
+    try:
+        waypoints, flight_speed = calc.calculate()
+    except AssertionError as e:
+        return None, str(e)
+    return np.asarray(waypoints), flight_speed
+
+
+def compare(calc: Calculator) -> str:
+    """calc 的规划结果（或错误）与使用相同参数新建的 Calculator 不一致时返回说明, 一致时返回空字符串"""
+    waypoints, flight_speed = plan(calc)
+    expected_waypoints, expected_speed = plan(Calculator(**calc.inputs))
+    if waypoints is None or expected_waypoints is None:
+        if waypoints is None and expected_waypoints is None and flight_speed == expected_speed:
+            return ""
+        return f"规划失败不一致 {flight_speed} / {expected_speed}"
+    if flight_speed != expected_speed:
+        return f"飞行速度 {flight_speed} != {expected_speed}"
+    if waypoints.shape != expected_waypoints.shape or not np.array_equal(waypoints, expected_waypoints):
+        return f"航点不一致 {waypoints.shape} / {expected_waypoints.shape}"
+    return ""
+
+
+def check(rounds: int, seed: int) -> list:
+    """先检查固定场景, 再随机修改参数, 返回不一致的情况 [(场景或第几轮, 修改的参数, 说明)]"""
+    failures = []
+    for scenario_index, (params, changes) in enumerate(SCENARIOS):
+        calc = Calculator(**params)
+        plan(calc)
+        calc.update(**changes)
+        message = compare(calc)
+        if message:
+            failures.append((f"场景 {scenario_index}", changes, message))
+
+    rng = np.random.default_rng(seed)
+    calc = Calculator(POLYGON, flight_speed=None)
+    plan(calc)
+    for round_index in range(rounds):
+        names = [str(name) for name in rng.choice(list(CHOICES), size=rng.integers(1, 3), replace=False)]
+        changes = {name: CHOICES[name][rng.integers(len(CHOICES[name]))] for name in names}
+        calc.update(**changes)
+        message = compare(calc)
+        if message:
+            failures.append((f"第 {round_index} 轮", changes, message))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="增量规划一致性检查")
+    parser.add_argument("--rounds", type=int, default=100, help="随机修改参数的次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+
+    failures = check(args.rounds, args.seed)
+    for label, changes, message in failures:
+        print(f"  {label} {changes}: {message}")
+    print(f"固定场景 {len(SCENARIOS)} 个, 随机修改 {args.rounds} 轮, 不一致 {len(failures)} 个")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,260 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contextlib import redirect_stdout
+from time import perf_counter
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import json
+import io
+import numpy as np
+from lib.trans_ import CoordinateTransformer
+from lib.calculate_ import Calculator, CALCULATE_STAGES
+from lib.create_ import KmzCreator
+from lib.waypoints_ import Waypoints
+from lib.preview_ import save_preview
+
+"""
+规划、坐标转换、kmz导出和预览图渲染热点路径的基准测试套件: 使用合成数据, 不需要网络和额外依赖
+每个用例记录最短耗时（多次运行取最小值）和内存峰值（tracemalloc）, 结果保存为JSON, 可与基线比较
+运行方式:
+    python benchmark/suite.py                                   # 运行全部用例
+    python benchmark/suite.py --quick                           # 只运行较小的规模
+    python benchmark/suite.py --only calc/convex                # 只运行名称包含该字符串的用例
+    python benchmark/suite.py --output benchmark/baseline.json  # 保存结果（作为基线）
+    python benchmark/suite.py --baseline benchmark/baseline.json --threshold 0.25
+    # 与基线比较, 耗时或内存峰值增加超过阈值的用例视为退化, 存在退化时返回值为1
+"""
+
+CENTER = (112.9, 28.1)  # 合成数据的中心经纬度---单位: 度
+RADIUS = 2000.0  # 合成多边形的半径---单位: 米
+METERS_PER_DEGREE = 111320.0
+# 比较时忽略的最小变化，避免计时和内存统计的噪声被误判为退化
+MIN_TIME_DELTA = 1e-3  # 单位: 秒
+MIN_PEAK_DELTA = 1 << 20  # 单位: 字节
+# 单次运行超过该时间的用例不再重复运行---单位: 秒
+LONG_CASE_TIME = 1.0
+
+TRANSFORM_PAIRS = (
+    ("wgs84_to_cgcs2000", {}),
+    ("cgcs2000_to_wgs84", {}),
+    ("wgs84_to_gcj02", {}),
+    ("gcj02_to_wgs84", {}),
+    ("gcj02_to_wgs84", {"precise": True}),
+    ("gcj02_to_cgcs2000", {}),
+    ("cgcs2000_to_gcj02", {}),
+)
+
+
+def polygon(vertices: int, star: bool = False) -> list:
+    """以CENTER为中心、RADIUS为半径的正多边形经纬度坐标, star为True时内外半径交替（非凸）"""
+    theta = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radius = np.full(vertices, RADIUS)
+    if star:
+        radius[1::2] *= 0.6
+    lat = CENTER[1] + radius * np.sin(theta) / METERS_PER_DEGREE
+    lng = CENTER[0] + radius * np.cos(theta) / (METERS_PER_DEGREE * np.cos(np.radians(CENTER[1])))
+    return np.column_stack([lng, lat]).tolist()
+
+
+def height_for_lanes(lanes: int) -> float:
+    """航线条数约为lanes时的航线高度（默认相机参数）"""
+    spacing = Calculator(polygon(4), global_height=1).calculate_lane_spacing()
+    return 2 * RADIUS / (lanes * spacing)
+
+
+def peak_memory(func) -> int:
+    """单独运行一次并返回内存峰值（tracemalloc会降低速度，不与计时同时进行），输出被丢弃"""
+    with redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def measure(func, repeat: int = 3):
+    """返回 (最短耗时, 内存峰值)，输出被丢弃"""
+    best = float("inf")
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = perf_counter()
+            func()
+            elapsed = perf_counter() - start
+            best = min(best, elapsed)
+            if elapsed > LONG_CASE_TIME:
+                break
+    return best, peak_memory(func)
+
+
+def transform_cases(sizes, selected):
+    trans = CoordinateTransformer()
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        coords = np.column_stack([rng.uniform(73, 135, n), rng.uniform(18, 54, n)])
+        for method, kwargs in TRANSFORM_PAIRS:
+            name = f"trans/{method}{'_precise' if kwargs.get('precise') else ''}/{n}"
+            if selected(name):
+                func = getattr(trans, method)
+                yield (name, *measure(lambda: func(coords, **kwargs)))
+
+
+def calculator_cases(shapes, selected):
+    """逐阶段计时: 每次重复都新建 Calculator, 按 CALCULATE_STAGES 的顺序依次执行"""
+    for kind, vertices, lanes, angle in shapes:
+        prefix = f"calc/{kind}{'_auto' if angle == 'auto' else ''}/v{vertices}/l{lanes}"
+        stages = [stage for stage, *_ in CALCULATE_STAGES if stage != "optimize_angle" or angle == "auto"]
+        if not any(selected(f"{prefix}/{stage}") for stage in [*stages, "total"]):
+            continue
+        params = dict(
+            wgs84_coords=polygon(vertices, kind == "star"), global_height=height_for_lanes(lanes), angle=angle
+        )
+
+        def run():
+            calc = Calculator(**params)
+            timing = []
+            for stage in stages:
+                start = perf_counter()
+                getattr(calc, stage)()
+                timing.append(perf_counter() - start)
+            return np.array(timing), len(calc.offset_adjusted_segments) // 2
+
+        stage_best = None
+        with redirect_stdout(io.StringIO()):
+            for _ in range(3):
+                timing, lane_count = run()
+                stage_best = timing if stage_best is None else np.minimum(stage_best, timing)
+                if timing.sum() > LONG_CASE_TIME:
+                    break
+        print(f"{prefix}: 航线 {lane_count} 条")
+        for stage, elapsed in zip(stages, stage_best):
+            yield f"{prefix}/{stage}", float(elapsed), None
+        yield f"{prefix}/total", float(stage_best.sum()), peak_memory(lambda: Calculator(**params).calculate())
+
+
+def export_cases(sizes, selected):
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        if not selected(f"export/{n}"):
+            continue
+        waypoints = Waypoints(np.column_stack([CENTER[0] + rng.uniform(0, 0.1, n), CENTER[1] + rng.uniform(0, 0.1, n)]))
+        kmz = KmzCreator(20, 40, 7.5, waypoints)
+        yield (f"export/{n}", *measure(kmz.to_bytes))
+
+
+def serpentine(n: int) -> np.ndarray:
+    """以CENTER为中心、边长2*RADIUS的正方形内往返飞行的n个航点"""
+    lanes = n // 2
+    half_lng = RADIUS / (METERS_PER_DEGREE * np.cos(np.radians(CENTER[1])))
+    lat = CENTER[1] + np.linspace(-RADIUS, RADIUS, lanes) / METERS_PER_DEGREE
+    forward = np.arange(lanes) % 2 == 0
+    start = np.where(forward, CENTER[0] - half_lng, CENTER[0] + half_lng)
+    return np.column_stack([np.column_stack([start, 2 * CENTER[0] - start]).ravel(), np.repeat(lat, 2)])
+
+
+def preview_cases(sizes, selected):
+    """固定图像尺寸下的预览图渲染（png）"""
+    if not any(selected(f"preview/{n}") for n in sizes):
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        # 首次渲染包含 matplotlib 的导入和字体加载，不计入结果
+        save_preview(os.path.join(directory, "warmup.png"), serpentine(4), polygon(4))
+        for n in sizes:
+            name = f"preview/{n}"
+            if selected(name):
+                waypoints, outline = serpentine(n), polygon(4)
+                output_path = os.path.join(directory, "preview.png")
+                yield (name, *measure(lambda: save_preview(output_path, waypoints, outline)))
+
+
+def run_suite(quick: bool = False, only: str = None) -> dict:
+    if quick:
+        trans_sizes = [100, 10_000]
+        shapes = [("convex", 4, 10, 0), ("convex", 100, 1000, 0), ("star", 20, 100, 0), ("convex", 100, 100, "auto")]
+        export_sizes = [10, 10_000]
+        preview_sizes = [1000, 100_000]
+    else:
+        trans_sizes = [100, 10_000, 1_000_000]
+        shapes = [("convex", v, l, 0) for v in (4, 100, 10_000) for l in (10, 1000, 10_000)]
+        shapes += [("star", v, l, 0) for v in (20, 200) for l in (10, 1000)]
+        shapes += [("convex", 100, 100, "auto"), ("star", 200, 100, "auto")]
+        export_sizes = [10, 1000, 100_000]
+        preview_sizes = [1000, 100_000, 1_000_000]
+
+    def selected(name):
+        return not only or only in name
+
+    results = {}
+    for cases in (
+        transform_cases(trans_sizes, selected),
+        calculator_cases(shapes, selected),
+        export_cases(export_sizes, selected),
+        preview_cases(preview_sizes, selected),
+    ):
+        for name, elapsed, peak in cases:
+            if not selected(name):
+                continue
+            results[name] = {"time": elapsed, "peak": peak}
+            peak_text = "" if peak is None else f"{peak / 1e6:10.2f} MB"
+            print(f"{name:<70s} {elapsed * 1000:10.3f} ms {peak_text}")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """返回耗时或内存峰值增加超过阈值的用例列表 [(名称, 指标, 基线值, 当前值)]"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, min_delta in (("time", MIN_TIME_DELTA), ("peak", MIN_PEAK_DELTA)):
+            old, new = base.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > min_delta:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="规划、坐标转换和kmz导出的基准测试")
+    parser.add_argument("--quick", action="store_true", help="只运行较小的规模")
+    parser.add_argument("--only", default=None, help="只运行名称包含该字符串的用例")
+    parser.add_argument("--output", default=None, help="结果保存路径（JSON）")
+    parser.add_argument("--baseline", default=None, help="基线结果路径（JSON）")
+    parser.add_argument("--threshold", type=float, default=0.25, help="退化阈值，0.25表示增加25%%")
+    args = parser.parse_args()
+
+    results = run_suite(args.quick, args.only)
+    if args.output:
+        report = {
+            "meta": {
+                "date": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.platform(),
+                "quick": args.quick,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        common = len(set(results) & set(baseline))
+        print(f"与基线比较: 共同用例 {common} 个, 退化 {len(regressions)} 个（阈值 {args.threshold:.0%}）")
+        for name, metric, old, new in regressions:
+            unit, scale = ("ms", 1000) if metric == "time" else ("MB", 1e-6)
+            print(f"  {name} [{metric}]: {old * scale:.3f} {unit} -> {new * scale:.3f} {unit} ({new / old - 1:+.0%})")
+        sys.exit(1 if regressions else 0)
@@ -1,3 +1,152 @@
-from .create_ import *
-from .trans_ import *
-from .calculate_ import *
+from importlib import import_module
+
+"""
+按需导入: 包中的公开名称在首次使用时才导入对应的模块, 只使用坐标转换或kmz导出时不会加载 pyproj、shapely 和 matplotlib
+from lib import * 仍然导入全部公开名称
+"""
+
+# 各模块的公开名称
+_EXPORTS = {
+    "instrument_": ("logger", "Recorder", "Timer", "current_recorder", "jsonl_sink", "instrument", "bind_context"),
+    "waypoints_": ("Waypoints", "as_waypoints"),
+    "create_": (
+        "TEMPLATE_FOLDER",
+        "KML_TEMPLATE_PATH",
+        "WPML_TEMPLATE_PATH",
+        "PLACEMARK_SLOT",
+        "SLOT_MARK",
+        "PLACEMARK_CHUNK",
+        "NAMESPACES",
+        "KML_POINT_PARAM",
+        "WPML_POINT_PARAM",
+        "KML_HEADER_FIELDS",
+        "WPML_HEADER_FIELDS",
+        "CompiledTemplate",
+        "compile_template",
+        "template_cache_info",
+        "KmzCreator",
+    ),
+    "reader_": (
+        "WAYLINES_ARCNAME",
+        "TEMPLATE_ARCNAME",
+        "WPML_MISSION_FIELDS",
+        "KML_MISSION_FIELDS",
+        "PLACEMARK_TAG",
+        "FOLDER_TAG",
+        "WPML_FIELDS",
+        "KML_FIELDS",
+        "KmzMission",
+        "parse_waylines",
+        "read_kmz",
+    ),
+    "trans_": (
+        "A_WGS84",
+        "F_WGS84",
+        "E2_WGS84",
+        "A_CGCS2000",
+        "F_CGCS2000",
+        "E2_CGCS2000",
+        "GEODETIC_ITERATIONS",
+        "GCJ02_INVERSE_TOL",
+        "GCJ02_INVERSE_MAX_ITER",
+        "keep_waypoints",
+        "CoordinateTransformer",
+    ),
+    "decompose_": (
+        "MIN_CELL_AREA",
+        "TRANSIT_TOLERANCE",
+        "TRANSIT_BATCH",
+        "decompose_polygon",
+        "reflex_vertices",
+        "route_inside",
+        "route_transits",
+    ),
+    "optimize_": ("ANGLE_STEP", "TURN_TIME", "AngleCurve", "optimize_angle"),
+    "calculate_": (
+        "SPEED_PARAMS",
+        "SPACING_PARAMS",
+        "CALCULATE_STAGES",
+        "TMERC_CACHE_DECIMALS",
+        "TMERC_CACHE_SIZE",
+        "get_tmerc_transformers",
+        "tmerc_cache_info",
+        "clear_tmerc_cache",
+        "PREVIEW_WORKERS",
+        "Calculator",
+    ),
+    "preview_": (
+        "PREVIEW_MAX_SEGMENTS",
+        "PREVIEW_GRID",
+        "PREVIEW_MAX_MARKERS",
+        "decimate_segments",
+        "render_preview",
+        "save_preview",
+    ),
+    "cache_": (
+        "CACHE_VERSION",
+        "COORD_DECIMALS",
+        "CACHE_SUFFIX",
+        "CacheEntry",
+        "CacheStats",
+        "template_digest",
+        "plan_key",
+        "write_atomic",
+        "PlanCache",
+    ),
+    "batch_": ("BatchResult", "convert_coords", "BatchPlanner"),
+    "export_": ("export_kmz", "ExportService"),
+    "sortie_": ("Sortie", "split_sorties", "export_sorties", "sortie_summary"),
+    "deviation_": (
+        "INDEX_PIECE_LENGTH",
+        "DeviationReport",
+        "read_kmz_waypoints",
+        "deviation_report",
+        "format_deviation_report",
+    ),
+    "ingest_": (
+        "KML_NAMESPACE",
+        "COORD_SYSTEM_KEYWORDS",
+        "MIN_RING_AREA",
+        "Area",
+        "parse_coordinates",
+        "clean_ring",
+        "detect_coord_system",
+        "iter_areas",
+        "load_areas",
+        "plan_areas",
+    ),
+    "server_": (
+        "DEFAULT_HOST",
+        "DEFAULT_PORT",
+        "MAX_REQUEST_BYTES",
+        "METRICS_WINDOW",
+        "KMZ_CONTENT_TYPE",
+        "JOB_FIELDS",
+        "WARM_UP_COORDS",
+        "PlanReply",
+        "parse_job",
+        "LatencyMetrics",
+        "PlanningServer",
+        "request_plan",
+    ),
+}
+
+# 名称 -> 所在模块
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:  # 子模块，如 lib.calculate_
+        return import_module(f".{name}", __name__)
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value  # 之后直接从包的命名空间中取值
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
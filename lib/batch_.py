@@ -0,0 +1,210 @@
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from collections import deque
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import traceback
+import os
+import numpy as np
+
+from .trans_ import CoordinateTransformer
+from .calculate_ import Calculator
+from .create_ import KmzCreator
+from .cache_ import PlanCache, plan_key, write_atomic
+from .instrument_ import instrument
+
+
+class BatchResult(NamedTuple):
+    index: int  # 任务在输入中的序号
+    waypoints: Optional[np.ndarray]  # 目标坐标系下的航点经纬度 (n, 2)，失败时为None
+    flight_speed: Optional[float]  # 实际飞行速度---单位: 米/秒
+    kmz_path: Optional[str]  # 生成的kmz文件路径，未导出时为None
+    error: Optional[str]  # 失败时的错误信息，成功时为None
+    cached: bool = False  # 是否来自缓存
+    records: Optional[List[dict]] = None  # 启用运行记录时，该任务的规划和导出记录
+    cache_counters: Optional[Tuple[int, int, int, int]] = None  # 子进程中缓存副本的计数增量，已合并到父进程的缓存
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def convert_coords(coords: np.ndarray, source: str, target: str) -> np.ndarray:
+    """在 'wgs84','cgcs2000','gcj02' 三种坐标系之间转换经纬度坐标"""
+    assert source in ["wgs84", "cgcs2000", "gcj02"], "输入坐标系统错误"
+    assert target in ["wgs84", "cgcs2000", "gcj02"], "输出坐标系统错误"
+    if source == target:
+        return coords
+    trans = CoordinateTransformer()
+    return getattr(trans, f"{source}_to_{target}")(coords)
+
+
+def _job_key(polygon, params: dict, settings: dict) -> str:
+    # 缓存键包含输入坐标、坐标系、Calculator参数和起飞高度，不包含输出文件夹等与结果无关的设置
+    options = {name: settings[name] for name in ("input_coord_system", "output_coord_system", "takeoff_height")}
+    return plan_key(polygon, {**options, "calculator": params})
+
+
+def _plan_job(index: int, polygon, params: dict, settings: dict, key: Optional[str] = None) -> BatchResult:
+    """在子进程中执行单个规划任务，捕获所有异常，保证单个任务失败不影响整个批次"""
+    with instrument(job=index) if settings["instrument"] else nullcontext() as records:
+        try:
+            return _run_job(index, polygon, params, settings, key)._replace(records=records)
+        except Exception:
+            return BatchResult(index, None, None, None, traceback.format_exc(), records=records)
+
+
+def _run_job(index: int, polygon, params: dict, settings: dict, key: Optional[str]) -> BatchResult:
+    # 转换坐标、规划航点、生成kmz并写入缓存
+    coords = np.array(polygon, dtype=np.float64)
+    wgs84_coords = convert_coords(coords, settings["input_coord_system"], "wgs84")
+    if params.get("holes"):  # 禁飞区与边界使用相同的坐标系
+        holes = [
+            convert_coords(np.array(hole, dtype=np.float64), settings["input_coord_system"], "wgs84")
+            for hole in params["holes"]
+        ]
+        params = {**params, "holes": holes}
+    calc = Calculator(wgs84_coords=wgs84_coords, **params)
+    waypoints, flight_speed = calc.calculate(draw=False)
+    target_coords = convert_coords(waypoints, "wgs84", settings["output_coord_system"])
+
+    kmz_path = None
+    kmz = KmzCreator(settings["takeoff_height"], calc.global_height, flight_speed, target_coords)
+    cache_counters = None
+    if key is not None:  # 使用缓存时总是生成kmz数据，写入缓存后再写出文件
+        data = kmz.to_bytes()
+        cache = settings["cache"]
+        start = cache.counters()
+        cache.put(key, target_coords, flight_speed, data)
+        # 子进程中的缓存是副本，写入和淘汰次数随结果返回，由父进程合并
+        cache_counters = tuple(after - before for after, before in zip(cache.counters(), start))
+        if settings["output_dir"] is not None:
+            kmz_path = os.path.join(settings["output_dir"], f"{settings['prefix']}{index}.kmz")
+            write_atomic(kmz_path, data)
+    elif settings["output_dir"] is not None:
+        kmz_path = os.path.join(settings["output_dir"], f"{settings['prefix']}{index}.kmz")
+        kmz.create(kmz_path)
+    return BatchResult(index, np.asarray(target_coords), flight_speed, kmz_path, None, cache_counters=cache_counters)
+
+
+class BatchPlanner:
+    """
+    批量航点规划: 输入由 (多边形顶点坐标, Calculator参数字典) 组成的任务序列,
+    使用进程池并行规划, 每完成一个任务即返回一个 BatchResult
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,  # 进程数，取值为None时使用CPU核数
+        input_coord_system: str = "wgs84",  # 输入坐标系：'wgs84','cgcs2000','gcj02'
+        output_coord_system: str = "wgs84",  # 输出坐标系：'wgs84','cgcs2000','gcj02'
+        output_dir: Optional[str] = None,  # kmz输出文件夹，取值为None时不导出kmz
+        takeoff_height: float = 20,  # 起飞高度---单位: 米
+        prefix: str = "waypoints_",  # kmz文件名前缀，文件名为 前缀+任务序号.kmz
+        cache: Optional[PlanCache] = None,  # 规划结果缓存，取值为None时不使用缓存
+        instrument: bool = False,  # 是否记录每个任务的各阶段耗时和计数（BatchResult.records）
+    ) -> None:
+        assert max_workers is None or max_workers >= 1, "进程数错误"
+        assert input_coord_system in ["wgs84", "cgcs2000", "gcj02"], "输入坐标系统错误"
+        assert output_coord_system in ["wgs84", "cgcs2000", "gcj02"], "输出坐标系统错误"
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.settings = {
+            "input_coord_system": input_coord_system,
+            "output_coord_system": output_coord_system,
+            "output_dir": output_dir,
+            "takeoff_height": takeoff_height,
+            "prefix": prefix,
+            "cache": cache,
+            "instrument": instrument,
+        }
+
+    @staticmethod
+    def _failed(index: int) -> Future:
+        # 以当前异常作为该任务的错误结果，返回已完成的Future
+        future = Future()
+        future.set_result(BatchResult(index, None, None, None, traceback.format_exc()))
+        return future
+
+    def _submit(self, executor, index: int, job) -> Future:
+        # 命中缓存时直接返回已完成的Future，否则提交到进程池；任务格式错误或无法提交时返回该任务的错误结果
+        try:
+            polygon, params = job
+        except Exception:
+            return self._failed(index)
+        cache = self.settings["cache"]
+        if cache is None:
+            return executor.submit(_plan_job, index, polygon, params, self.settings)
+        try:
+            key = _job_key(polygon, params, self.settings)
+        except Exception:
+            return self._failed(index)
+        entry = cache.get(key)
+        if entry is None:
+            return executor.submit(_plan_job, index, polygon, params, self.settings, key)
+        kmz_path = None
+        if self.settings["output_dir"] is not None:
+            kmz_path = os.path.join(self.settings["output_dir"], f"{self.settings['prefix']}{index}.kmz")
+            write_atomic(kmz_path, entry.kmz)
+        future = Future()
+        future.set_result(BatchResult(index, entry.waypoints, entry.flight_speed, kmz_path, None, True))
+        return future
+
+    def _collect(self, index: int, future: Future) -> BatchResult:
+        # 取出任务结果，参数无法序列化、子进程异常退出（BrokenProcessPool）等异常转换为该任务的错误结果
+        try:
+            result = future.result()
+        except Exception:
+            return BatchResult(index, None, None, None, traceback.format_exc())
+        # 将子进程中缓存副本的计数合并到父进程的缓存，cache.stats() 包含所有任务的写入和淘汰
+        if result.cache_counters is not None:
+            self.settings["cache"].merge_counters(result.cache_counters)
+        return result
+
+    def run(self, jobs: Iterable[Tuple[List, dict]], ordered: bool = False) -> Iterator[BatchResult]:
+        """
+        执行批量规划，ordered为False时按完成顺序返回结果，为True时按提交顺序返回结果
+        同时在途的任务数量限制为进程数的4倍，输入可以是任意长度的迭代器
+        设置了缓存时，命中缓存的任务不再提交到进程池，未命中的任务在子进程中规划后写入缓存
+        任务格式错误、无法提交或子进程异常退出时，只有相关任务返回错误结果；进程池损坏后重新创建，继续执行后续任务
+        """
+        if self.settings["output_dir"] is not None:
+            os.makedirs(self.settings["output_dir"], exist_ok=True)
+        max_pending = self.max_workers * 4
+        jobs = enumerate(jobs)
+
+        executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending = deque()  # 按提交顺序记录在途任务 (序号, Future)
+            exhausted = False
+            while True:
+                # 补充在途任务
+                while not exhausted and len(pending) < max_pending:
+                    try:
+                        index, job = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    try:
+                        future = self._submit(executor, index, job)
+                    except BrokenProcessPool:  # 进程池已损坏（此前的任务使子进程异常退出），重新创建后再提交一次
+                        executor.shutdown(wait=False)
+                        executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                        try:
+                            future = self._submit(executor, index, job)
+                        except Exception:
+                            future = self._failed(index)
+                    except Exception:
+                        future = self._failed(index)
+                    pending.append((index, future))
+                if not pending:
+                    break
+                if ordered:  # 按提交顺序返回
+                    yield self._collect(*pending.popleft())
+                else:  # 按完成顺序返回
+                    done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                    for item in [item for item in pending if item[1] in done]:
+                        pending.remove(item)
+                        yield self._collect(*item)
+        finally:
+            executor.shutdown(wait=True)
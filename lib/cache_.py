@@ -0,0 +1,237 @@
+from functools import lru_cache
+from time import time
+from typing import NamedTuple, Optional, Tuple
+from uuid import uuid4
+import hashlib
+import json
+import io
+import os
+import numpy as np
+
+from .create_ import KML_TEMPLATE_PATH, WPML_TEMPLATE_PATH
+
+"""
+规划结果和kmz文件的磁盘缓存: 以输入坐标、坐标系、所有规划及导出参数和模板文件内容的哈希值为键,
+缓存航点坐标和kmz文件的字节数据; 按访问时间进行LRU淘汰, 写入时先写临时文件再重命名, 多个进程可同时使用
+"""
+
+# 缓存格式版本，规划算法或缓存格式改变时修改，使旧的缓存全部失效
+CACHE_VERSION = 1
+# 坐标归一化时保留的小数位数（约0.1毫米）
+COORD_DECIMALS = 9
+CACHE_SUFFIX = ".npz"
+
+
+class CacheEntry(NamedTuple):
+    waypoints: np.ndarray  # 目标坐标系下的航点经纬度 (n, 2)---单位: 度
+    flight_speed: float  # 实际飞行速度---单位: 米/秒
+    kmz: bytes  # kmz文件的字节数据
+
+
+class CacheStats(NamedTuple):
+    # 计数只包含本实例及通过 merge_counters 合并的其它进程中的缓存副本
+    hits: int  # 命中次数
+    misses: int  # 未命中次数
+    writes: int  # 写入次数
+    evictions: int  # 淘汰的缓存数量
+    entries: int  # 缓存文件夹中的缓存数量（所有进程共享）
+    size: int  # 缓存文件夹的总大小---单位: 字节
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _normalize(value):
+    # 将参数转换为稳定的可序列化形式: 数字统一为浮点数, 坐标数组四舍五入, 字典按键排序
+    if isinstance(value, dict):
+        return {str(key): _normalize(value[key]) for key in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)) or hasattr(value, "__array__"):  # 包括 numpy 数组和 Waypoints
+        try:
+            array = np.asarray(value, dtype=np.float64)
+        except (TypeError, ValueError):  # 不规则的嵌套列表或包含字符串
+            return [_normalize(item) for item in value]
+        return (np.round(array, COORD_DECIMALS) + 0.0).tolist()  # 加0.0去掉负零
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return repr(value)
+
+
+@lru_cache(maxsize=16)
+def _file_digest(path: str, mtime: float) -> str:
+    # 文件内容的哈希值，文件修改后重新计算
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def template_digest() -> str:
+    """kml和wpml模板文件内容的哈希值"""
+    return "".join(_file_digest(path, os.path.getmtime(path)) for path in (KML_TEMPLATE_PATH, WPML_TEMPLATE_PATH))
+
+
+def plan_key(coords, params: dict) -> str:
+    """
+    计算缓存键: coords为输入的边界坐标, params包含坐标系、Calculator参数（含禁飞区）和 KmzCreator参数
+    坐标四舍五入到COORD_DECIMALS位小数, 整数和浮点数视为相同, 模板文件修改后键随之改变
+    """
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "coords": _normalize(coords), "params": _normalize(params)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    digest = hashlib.sha256(payload.encode("utf-8"))
+    digest.update(template_digest().encode("ascii"))
+    return digest.hexdigest()
+
+
+def write_atomic(path: str, data: bytes):
+    """先写入同目录下的临时文件, 完成后再重命名, 其它进程不会读到写了一半的文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{uuid4().hex}.tmp"
+    try:
+        with open(temp_path, "xb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class PlanCache:
+    """
+    规划结果的磁盘缓存, 每个键对应一个npz文件, 文件的修改时间即最后访问时间
+    超过 max_age 的缓存视为失效; 总大小超过 max_size 时从最久未访问的缓存开始删除
+
+    使用示例:
+        cache = PlanCache("cache")
+        key = plan_key(coords, params)
+        entry = cache.get(key)
+        if entry is None:
+            ...
+            cache.put(key, waypoints, flight_speed, kmz_bytes)
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "cache",  # 缓存文件夹
+        max_size: Optional[int] = 512 * 1024 * 1024,  # 缓存总大小上限，取值为None时不限制---单位: 字节
+        max_age: Optional[float] = 30 * 24 * 3600,  # 缓存有效期，取值为None时不过期---单位: 秒
+    ) -> None:
+        assert max_size is None or max_size > 0, "缓存大小上限错误"
+        assert max_age is None or max_age > 0, "缓存有效期错误"
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def _expired(self, mtime: float, now: float) -> bool:
+        return self.max_age is not None and now - mtime > self.max_age
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """读取缓存，未命中或已失效时返回None；命中时更新访问时间"""
+        path = self.path(key)
+        try:
+            if self._expired(os.path.getmtime(path), time()):
+                self._remove(path)
+                raise FileNotFoundError(path)
+            with np.load(path, allow_pickle=False) as data:
+                entry = CacheEntry(data["waypoints"], float(data["flight_speed"]), data["kmz"].tobytes())
+            os.utime(path)
+        except (OSError, KeyError, ValueError):  # 不存在、已被其它进程删除或文件损坏
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, waypoints, flight_speed: float, kmz: bytes):
+        """写入缓存，写入后按大小和有效期淘汰旧缓存"""
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            waypoints=np.asarray(waypoints, dtype=np.float64),
+            flight_speed=np.float64(flight_speed),
+            kmz=np.frombuffer(kmz, dtype=np.uint8),
+        )
+        write_atomic(self.path(key), buffer.getvalue())
+        self.writes += 1
+        self.evict()
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # 已被其它进程删除
+            return False
+        self.evictions += 1
+        return True
+
+    def _scan(self):
+        # 返回缓存文件的 (修改时间, 大小, 路径) 列表
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def evict(self):
+        """删除失效的缓存，总大小超过上限时从最久未访问的缓存开始删除"""
+        now = time()
+        files = []
+        for mtime, size, path in self._scan():
+            if self._expired(mtime, now):
+                self._remove(path)
+            else:
+                files.append((mtime, size, path))
+        if self.max_size is None:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """删除所有缓存"""
+        for _, _, path in self._scan():
+            self._remove(path)
+
+    def counters(self) -> Tuple[int, int, int, int]:
+        """当前的 (命中, 未命中, 写入, 淘汰) 次数"""
+        return self.hits, self.misses, self.writes, self.evictions
+
+    def merge_counters(self, counters: Tuple[int, int, int, int]):
+        """
+        合并其它进程中缓存副本的计数增量 (命中, 未命中, 写入, 淘汰)
+        进程池中的任务使用的是缓存的副本, 其计数不会自动反映到父进程的 stats() 中
+        """
+        hits, misses, writes, evictions = counters
+        self.hits += hits
+        self.misses += misses
+        self.writes += writes
+        self.evictions += evictions
+
+    def stats(self) -> CacheStats:
+        """返回命中/未命中统计以及缓存文件夹的当前大小"""
+        files = self._scan()
+        return CacheStats(
+            self.hits, self.misses, self.writes, self.evictions, len(files), sum(size for _, size, _ in files)
+        )
@@ -4,14 +4,119 @@
 # lib_directory = os.path.dirname(os.path.abspath(__file__))
 # sys.path.append(lib_directory)
 
-from matplotlib.lines import Line2D
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from shapely.geometry import Polygon
 from pyproj import CRS, Transformer
-from shapely.geometry import Polygon, Point, MultiPoint, LineString
 from shapely.affinity import rotate
-import matplotlib.pyplot as plt
+import shapely
+import threading
+import copy
 import numpy as np
 
+from .decompose_ import decompose_polygon, route_transits
+from .optimize_ import optimize_angle
+from .instrument_ import Timer, current_recorder, logger
+from .preview_ import render_preview, save_preview
+from .waypoints_ import Waypoints
+
+# 规划流程的各个阶段: (方法名, 依赖的参数, 依赖的前序阶段, 输出的属性)
+# 参数或前序阶段的输出改变时重新执行该阶段，输出没有改变时后续阶段可以继续沿用（提前截止）
+SPEED_PARAMS = ("global_height", "camera_VFOV", "heading_overlap_ratio", "camera_shoot_time", "flight_speed")
+SPACING_PARAMS = ("global_height", "camera_HFOV", "side_overlap_ratio")
+CALCULATE_STAGES = (
+    ("calculate_centroid", ("wgs84_coords", "holes"), (), ("centroid_x", "centroid_y")),
+    # 形心不变时边界和禁飞区仍可能改变（如绕形心缩放），因此同样依赖坐标参数
+    ("convert_to_plane_coords", ("wgs84_coords", "holes"), ("calculate_centroid",), ("coords", "hole_coords")),
+    (
+        "optimize_angle",
+        ("angle", *SPACING_PARAMS, *SPEED_PARAMS, "start_dir"),
+        ("convert_to_plane_coords",),
+        ("angle",),
+    ),
+    (
+        "build_and_rotate_polygon",
+        ("angle",),
+        ("convert_to_plane_coords", "optimize_angle"),
+        ("point_list", "hole_lists"),
+    ),
+    ("find_min_bounding_rectangle", (), ("build_and_rotate_polygon",), ("min_x", "min_y", "max_x", "max_y")),
+    (
+        "calculate_waypoints_in_rectangle",
+        (*SPACING_PARAMS, *SPEED_PARAMS, "start_dir"),
+        ("find_min_bounding_rectangle",),
+        ("waypoints_list", "effective_flight_speed"),
+    ),
+    (
+        "adjust_waypoints_x_coordinates",
+        ("start_dir",),
+        ("build_and_rotate_polygon", "find_min_bounding_rectangle", "calculate_waypoints_in_rectangle"),
+        ("adjusted_segments", "transit"),
+    ),
+    ("apply_heading_offset", ("heading_offset",), ("adjust_waypoints_x_coordinates",), ("offset_adjusted_segments",)),
+    ("rotate_waypoints_back", (), ("apply_heading_offset", "optimize_angle"), ("re_points",)),
+    ("convert_to_wgs84", (), ("convert_to_plane_coords", "rotate_waypoints_back"), ("wgs84_waypoints",)),
+)
+
+
+def _equal(a, b) -> bool:
+    # 比较参数或阶段输出是否相同，支持嵌套的列表、元组、numpy数组和 Waypoints
+    if hasattr(a, "__array__") or hasattr(b, "__array__"):
+        return np.array_equal(a, b)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    return type(a) is type(b) and a == b
+
+
+# 横轴墨卡托投影缓存: 中心经纬度量化的小数位数以及缓存容量
+# 5 位即投影中心最多偏移约 0.5 米，实测航点随之偏移：半径 3 千米以内的区域不超过约 6 毫米，半径 10 千米约 3 厘米
+TMERC_CACHE_DECIMALS = 5
+TMERC_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=TMERC_CACHE_SIZE)
+def _build_tmerc_transformers(lon_0, lat_0):
+    # 根据中心经纬度定义横轴墨卡托投影的坐标系
+    mercator = CRS(proj="tmerc", lon_0=lon_0, lat_0=lat_0, ellps="WGS84")
+    wgs84 = CRS.from_epsg(4326)
+    wgs84_to_mct = Transformer.from_crs(wgs84, mercator, always_xy=True)
+    mct_to_wgs84 = Transformer.from_crs(mercator, wgs84, always_xy=True)
+    return mercator, wgs84_to_mct, mct_to_wgs84
+
+
+def get_tmerc_transformers(lon_0, lat_0):
+    """
+    获取以 (lon_0, lat_0) 为中心的横轴墨卡托投影及正反向 Transformer,
+    中心经纬度按 TMERC_CACHE_DECIMALS 量化, 相近的区域在进程内复用同一组对象
+    """
+    return _build_tmerc_transformers(
+        round(float(lon_0), TMERC_CACHE_DECIMALS), round(float(lat_0), TMERC_CACHE_DECIMALS)
+    )
+
+
+def tmerc_cache_info():
+    """返回投影缓存的命中/未命中统计 (hits, misses, maxsize, currsize)"""
+    return _build_tmerc_transformers.cache_info()
+
+
+def clear_tmerc_cache():
+    """清空投影缓存及其统计"""
+    _build_tmerc_transformers.cache_clear()
+
+
+# 后台预览图渲染线程池（首次使用时创建）
+PREVIEW_WORKERS = 2
+_preview_executor = None
+_preview_executor_lock = threading.Lock()
+
+
+def _get_preview_executor():
+    global _preview_executor
+    with _preview_executor_lock:
+        if _preview_executor is None:
+            _preview_executor = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix="preview")
+        return _preview_executor
+
 
 class Calculator:
     """
@@ -21,11 +126,11 @@ class Calculator:
 
     def __init__(
         self,
-        wgs84_coords,  # 边界点列表---经度纬度，需要按连线顺序输入，不能有交叉---单位: 度
+        wgs84_coords,  # 边界点列表或数组 (n, 2)---经度纬度，需要按连线顺序输入，不能有交叉---单位: 度
         global_height=15,  # 航线高度---单位: 米
         flight_speed=None,  # 飞行速度---单位: 米/秒  取值为None时默认最大速度
         angle=(0, 1),  # 航线方向角度---x轴正方向为0度,逆时针增加,范围从0-360---单位: 度
-        # 取值为None时自动按照第一点到第二点的方向
+        # 取值为None时自动按照第一点到第二点的方向, 取值为"auto"时自动选择飞行时间最短的方向
         heading_offset=0,  # 航向偏移---正数向外,负数向内---单位 :米
         camera_HFOV=52.8,  # 相机水平FOV---单位: 度
         camera_VFOV=40.9,  # 相机竖直FOV---单位: 度
@@ -34,7 +139,28 @@ class Calculator:
         start_dir="right",  # 起始飞行点---是在航向的右边还是左边，默认右边
         camera_shoot_time=1,  # 相机拍照间隔时间---单位: 秒
         view_size=(20, 8),  # 预览图大小---单位：英尺
+        holes=None,  # 区域内的禁飞区列表，每个禁飞区为一个边界点列表---经度纬度---单位: 度
     ):
+        # 记录输入参数，用于 update 修改参数后判断需要重新执行的阶段
+        self.inputs = dict(
+            wgs84_coords=wgs84_coords,
+            global_height=global_height,
+            flight_speed=flight_speed,
+            angle=angle,
+            heading_offset=heading_offset,
+            camera_HFOV=camera_HFOV,
+            camera_VFOV=camera_VFOV,
+            side_overlap_ratio=side_overlap_ratio,
+            heading_overlap_ratio=heading_overlap_ratio,
+            start_dir=start_dir,
+            camera_shoot_time=camera_shoot_time,
+            view_size=view_size,
+            holes=holes,
+        )
+        self._stage_inputs = {}  # 每个阶段上次执行时使用的参数
+        self.reused_stages = ()  # 上次 calculate 沿用的阶段
+        self.computed_stages = ()  # 上次 calculate 重新执行的阶段
+
         #############################################################
         ## 检查参数
         #############################################################
@@ -43,7 +169,11 @@ class Calculator:
         assert -1500 <= global_height <= 1500, "飞行高度错误"
         assert flight_speed is None or 0 < flight_speed <= 15, "飞行速度错误"
         assert (
-            isinstance(angle, list) or isinstance(angle, tuple) or isinstance(angle, int) or isinstance(angle, float)
+            isinstance(angle, list)
+            or isinstance(angle, tuple)
+            or isinstance(angle, int)
+            or isinstance(angle, float)
+            or angle == "auto"
         ), "航线方向参数错误"
         assert 0 < camera_HFOV < 180, "相机的水平FOV错误"
         assert 0 < camera_VFOV < 180, "相机的竖直FOV错误"
@@ -52,12 +182,17 @@ class Calculator:
         assert start_dir == "right" or start_dir == "left", "起始飞行点错误"
         assert camera_shoot_time >= 1, "相机拍照间隔时间错误"
         assert view_size[0] > 0 and view_size[1] > 0, "预览图大小错误"
+        assert holes is None or all(len(hole) >= 3 for hole in holes), "禁飞区边界点过少"
 
         #############################################################
         ## 定义参数
         #############################################################
         self.wgs84_coords = wgs84_coords
-        if isinstance(angle, int) or isinstance(angle, float):
+        self.holes = [] if holes is None else holes
+        self.auto_angle = angle == "auto"
+        if self.auto_angle:  # 在转换成平面坐标后自动选择
+            self.angle = None
+        elif isinstance(angle, int) or isinstance(angle, float):
             assert 0 <= angle < 360, "航线方向角度错误"
             self.angle = angle
         else:
@@ -92,67 +227,55 @@ class Calculator:
         self.camera_shoot_time = camera_shoot_time
         self.view_size = view_size
 
+    def update(self, **changes):
+        """
+        修改规划参数（参数名与构造函数相同）, 下次 calculate 只重新执行受影响的阶段
+        例如只修改 flight_speed、heading_offset 或 start_dir 时, 形心、投影、旋转和外接矩形都会沿用
+        """
+        unknown = set(changes) - set(self.inputs)
+        assert not unknown, f"未知参数: {', '.join(sorted(unknown))}"
+        inputs = {**self.inputs, **changes}
+        checked = Calculator(**inputs)  # 检查参数并计算派生值（如航线方向角度）
+        for name in changes:
+            if name != "angle":
+                setattr(self, name, getattr(checked, name))
+        # 以边界点索引或点位指定的航线方向由边界点计算，边界点改变时同样需要重新计算
+        if "angle" in changes or "wgs84_coords" in changes:
+            self.angle, self.auto_angle = checked.angle, checked.auto_angle
+        self.inputs = inputs
+
     #############################################################
     ## 定义可视化函数
     #############################################################
 
     # 航点列表和边界点列表（经纬度坐标）
-    def draw(self):
-        # 设定画图参数
-        way_points = self.wgs84_waypoints
-        polygon_points = self.wgs84_coords
-        wp_label = "Waypoints"
-        plg_label = "Polygon points"
-        wp_color = "green"
-        plg_color = "red"
-        wp_size = 0.001
-        plg_size = 50
-        title = "WGS84 Coordinate"
+    def draw(self, output_path=None, background=False, way_points=None):
+        """
+        绘制预览图, 需在 calculate 之后调用, 或通过way_points给定WGS84航点（如缓存的规划结果, 不需要重新规划）
+        output_path为None时弹出交互窗口; 否则使用非交互方式直接保存为文件（.png/.svg等）
+        background为True时在后台线程中保存文件, 立即返回 Future, 可继续进行下一次规划
+        """
+        if way_points is None:
+            assert hasattr(self, "wgs84_waypoints"), "请先进行航点规划"
+            way_points = self.wgs84_waypoints
+        # 拷贝当前结果，避免后台渲染期间参数被修改
+        way_points = np.array(way_points, dtype=np.float64)
+        polygon_points = np.array(self.wgs84_coords, dtype=np.float64)
+        holes = [np.array(hole, dtype=np.float64) for hole in self.holes]
+
+        if output_path is not None:
+            if background:
+                return _get_preview_executor().submit(
+                    save_preview, output_path, way_points, polygon_points, self.view_size, holes=holes
+                )
+            return save_preview(output_path, way_points, polygon_points, self.view_size, holes=holes)
+
+        assert not background, "交互窗口不支持后台显示"
+        import matplotlib.pyplot as plt
 
         # 创建一个图形对象
         fig, axs = plt.subplots(1, 1, figsize=self.view_size)
-        # 绘制航线
-        x_coords, y_coords = zip(*way_points)  # 拆分为 x 和 y 坐标
-        u = np.diff(x_coords)  # x方向的变化量
-        v = np.diff(y_coords)  # y方向的变化量
-        x_start = x_coords[:-1]
-        y_start = y_coords[:-1]
-        axs.quiver(
-            x_start,
-            y_start,
-            u,
-            v,
-            angles="xy",
-            scale_units="xy",
-            scale=1,
-            color=wp_color,
-            width=wp_size,  # 默认是0.005
-        )
-        # 绘制多边形
-        x_coords, y_coords = zip(*polygon_points)  # 拆分为 x 和 y 坐标
-        axs.scatter(x_coords, y_coords, c=plg_color, marker="o", label=plg_label, s=plg_size)
-        # 手动创建图例项
-        legend_elements = [
-            Line2D([0], [0], color=wp_color, lw=2, label=wp_label),  # 航点（quiver）
-            Line2D(
-                [0],
-                [0],
-                marker="o",
-                color="w",
-                markerfacecolor=plg_color,
-                markersize=10,
-                label=plg_label,
-            ),  # 多边形点
-        ]
-        # 添加图例到图形中
-        axs.legend(handles=legend_elements)
-        # 设置网格
-        axs.grid(True)
-        # 设置横纵坐标
-        axs.set_title(title)
-        axs.set_xlabel("Longitude")
-        axs.set_ylabel("Latitude")
-        axs.axis("equal")
+        render_preview(axs, way_points, polygon_points, holes)
         # 显示
         plt.tight_layout()
         plt.show()
@@ -163,8 +286,8 @@ class Calculator:
 
     def calculate_centroid(self):
         # 使用 shapely 创建一个多边形对象
-        polygon = Polygon(self.wgs84_coords)
-        assert polygon.is_valid, "输入的多边形不合法"  # 输入的点位没有交叉
+        polygon = Polygon(np.asarray(self.wgs84_coords, dtype=np.float64), [np.asarray(hole) for hole in self.holes])
+        assert polygon.is_valid, "输入的多边形不合法"  # 输入的点位没有交叉，禁飞区位于区域内部且互不重叠
         # 计算多边形的形心
         centroid = polygon.centroid
         self.centroid_x, self.centroid_y = centroid.x, centroid.y
@@ -174,14 +297,29 @@ class Calculator:
     #############################################################
 
     def convert_to_plane_coords(self):
-        # 定义 WGS84 地理坐标系 (EPSG:4326)
-        wgs84 = CRS.from_epsg(4326)
-        # 根据质心的纬度和经度来定义横轴墨卡托投影的坐标系
-        self.mercator = CRS(proj="tmerc", lon_0=self.centroid_x, lat_0=self.centroid_y, ellps="WGS84")
-        # 使用 Transformer 来执行坐标转换
-        wgs84_to_mct = Transformer.from_crs(wgs84, self.mercator, always_xy=True)
-        # 将经纬度坐标转换为平面坐标（横轴墨卡托）
-        self.coords = [(wgs84_to_mct.transform(point[0], point[1])) for point in self.wgs84_coords]
+        # 根据质心的纬度和经度获取横轴墨卡托投影的坐标系及 Transformer（进程内缓存）
+        self.mercator, self.wgs84_to_mct, self.mct_to_wgs84 = get_tmerc_transformers(self.centroid_x, self.centroid_y)
+        # 将经纬度坐标整体转换为平面坐标（横轴墨卡托）
+        # 禁飞区与边界点拼接后一起转换，再按各自的点数拆分
+        rings = [np.asarray(ring, dtype=np.float64) for ring in [self.wgs84_coords, *self.holes]]
+        coords = np.concatenate(rings)
+        x, y = self.wgs84_to_mct.transform(coords[:, 0], coords[:, 1])
+        plane_rings = np.split(np.column_stack([x, y]), np.cumsum([len(ring) for ring in rings])[:-1])
+        self.coords = plane_rings[0]
+        self.hole_coords = plane_rings[1:]
+
+    #############################################################
+    ## 自动选择航线方向
+    #############################################################
+
+    def optimize_angle(self):
+        # 与航点计算使用相同的航线间距和飞行速度，估计每个候选角度的飞行时间
+        lane_spacing = self.calculate_lane_spacing()
+        assert lane_spacing > 0, "单侧旁向重叠率过大"
+        flight_speed = self.flight_speed or min(15, self.calculate_recommended_speed())
+        self.angle, self.angle_curve = optimize_angle(
+            self.coords, lane_spacing, flight_speed, holes=self.hole_coords, return_curve=True, start_dir=self.start_dir
+        )
 
     #############################################################
     ## 构建平面多边形，进行旋转
@@ -189,18 +327,19 @@ class Calculator:
 
     def build_and_rotate_polygon(self):
         # 使用 Shapely 创建多边形对象
-        polygon = Polygon(self.coords)  # 会自动闭合多边形
+        polygon = Polygon(self.coords, self.hole_coords)  # 会自动闭合多边形
         # 使用 Shapely 的 rotate 函数进行旋转
         rotated_polygon = rotate(polygon, -self.angle, origin=(0, 0), use_radians=False)  # 逆时针旋转
-        # 去除封闭多边形的最后一个重复点位
-        self.point_list = list(rotated_polygon.exterior.coords)[:-1]
+        # 去除封闭多边形的最后一个重复点位，顶点保存为 (n, 2) 数组
+        self.point_list = shapely.get_coordinates(rotated_polygon.exterior)[:-1]
+        self.hole_lists = [shapely.get_coordinates(ring)[:-1] for ring in rotated_polygon.interiors]
 
     #############################################################
     ## 找到最小的外接矩形
     #############################################################
 
     def find_min_bounding_rectangle(self):
-        point_np = np.array(self.point_list, dtype=np.float64)  # n,2
+        point_np = np.asarray(self.point_list, dtype=np.float64)  # n,2
         self.min_x, self.min_y = point_np.min(axis=0)
         self.max_x, self.max_y = point_np.max(axis=0)
 
@@ -208,99 +347,74 @@ class Calculator:
     ## 在矩形中计算出各个航点位置
     #############################################################
 
-    def calculate_waypoints_in_rectangle(self):
+    def calculate_lane_spacing(self):
         # 相机缩减后的旁向视场范围 需要根据旁向重叠率计算出来
-        self.reduced_field_w = (
+        return (
             self.global_height
             * np.tan(self.camera_HFOV / 2 / 180 * np.pi)
             * 2
             * (1 - self.side_overlap_ratio / 100 * 2)
         )
-        self.recmd_fight_speed = (
+
+    def calculate_recommended_speed(self):
+        # 保证航向重叠率不低于指定值的 建议最大飞行速度，单位 米/秒
+        return (
             self.global_height
             * np.tan(self.camera_VFOV / 2 / 180 * np.pi)
             * (2 - self.heading_overlap_ratio / 100 * 2)
             / self.camera_shoot_time
-        )  # 保证航向重叠率不低于指定值的 建议最大飞行速度，单位 米/秒
+        )
+
+    def calculate_waypoints_in_rectangle(self):
+        # 相机缩减后的旁向视场范围 需要根据旁向重叠率计算出来
+        self.reduced_field_w = self.calculate_lane_spacing()
+        self.recmd_fight_speed = self.calculate_recommended_speed()
+        # 实际飞行速度作为本阶段的输出 effective_flight_speed，flight_speed 保持为输入值
         if self.flight_speed is not None:
+            self.effective_flight_speed = self.flight_speed
             if self.flight_speed > self.recmd_fight_speed:
-                print(
-                    f"建议飞行速度上限：{self.recmd_fight_speed:.2f} 米/秒, 当前飞行速度：{self.flight_speed:.2f} 米/秒, 请注意速度超出上限！\n"
+                logger.warning(
+                    "建议飞行速度上限：%.2f 米/秒, 当前飞行速度：%.2f 米/秒, 请注意速度超出上限！",
+                    self.recmd_fight_speed,
+                    self.flight_speed,
                 )
             else:
-                print(
-                    f"建议飞行速度上限：{self.recmd_fight_speed:.2f} 米/秒, 当前飞行速度：{self.flight_speed:.2f} 米/秒\n"
+                logger.info(
+                    "建议飞行速度上限：%.2f 米/秒, 当前飞行速度：%.2f 米/秒", self.recmd_fight_speed, self.flight_speed
                 )
         else:
-            self.flight_speed = 15 if self.recmd_fight_speed >= 15 else self.recmd_fight_speed
-            print(
-                f"建议飞行速度上限：{self.recmd_fight_speed:.2f} 米/秒, 飞行速度调整为：{self.flight_speed:.2f} 米/秒\n"
+            self.effective_flight_speed = 15 if self.recmd_fight_speed >= 15 else self.recmd_fight_speed
+            logger.info(
+                "建议飞行速度上限：%.2f 米/秒, 飞行速度调整为：%.2f 米/秒",
+                self.recmd_fight_speed,
+                self.effective_flight_speed,
             )
 
-        self.waypoints_list = []  # 航点存储
-        line_count = 0  # 记录有多少条长直航线
-        break_count = 0  # 超出界限两次跳出循环
+        assert self.reduced_field_w > 0, "单侧旁向重叠率过大"
+
+        # 航点存储 (2 * line_count, 2)，每两个点为一条航线的起点和终点
+        self.waypoints_list = self.generate_lanes(self.min_x, self.min_y, self.max_x, self.max_y, self.start_dir)
 
+    def generate_lanes(self, min_x, min_y, max_x, max_y, start_dir):
+        """在给定矩形中按旁向间距生成往返航线, 返回 (2 * 航线条数, 2) 的航点数组"""
         # 根据起始飞行点判断计算出航点位置
-        start_y = self.min_y + self.reduced_field_w / 2 - self.reduced_field_w
-        # 减去reduced_field_w 是因为第一个点会导致y值要加上reduced_field_w
-        end_y = self.max_y - self.reduced_field_w / 2
-        if self.start_dir != "right":  # 起始点在航向的左侧  交换起点和终点的y值
-            temp_y = start_y
-            start_y = end_y
-            end_y = temp_y
-
-        start_x = self.min_x
-        end_x = self.max_x
-
-        # 记录当前航点的y值
-        last_point_y = start_y
-
-        last_is_start = True  # 上一个点位是否在起始边  初始值是true
-        now_is_start = True  # 判定是否在起始边
-
-        # 当没有超出范围时，一直保持循环
-        while True:
-            if (last_point_y > end_y) if (self.start_dir == "right") else (last_point_y < end_y):
-                break_count += 1
-                if break_count >= 2:
-                    break
-            if now_is_start and last_is_start:  # 如果在起始边并且上一点也在起始边，说明下一点需要在终点边
-                point_x = start_x
-                if self.start_dir == "right":
-                    point_y = last_point_y + self.reduced_field_w
-                else:
-                    point_y = last_point_y - self.reduced_field_w
-                last_point_y = point_y
-                # 下一点需要进行切换边
-                last_is_start = now_is_start
-                now_is_start = False
-            elif not now_is_start and last_is_start:  # 在终点边
-                point_x = end_x
-                point_y = last_point_y
-                # 下一点不需要进行切换边
-                last_is_start = now_is_start
-                # 记录航线
-                line_count += 1
-            elif not now_is_start and not last_is_start:  # 向上走一格
-                point_x = end_x
-                if self.start_dir == "right":
-                    point_y = last_point_y + self.reduced_field_w
-                else:
-                    point_y = last_point_y - self.reduced_field_w
-                # 更当前的值
-                last_point_y = point_y
-                # 下一点需要进行切换边
-                last_is_start = now_is_start
-                now_is_start = True
-            elif now_is_start and not last_is_start:
-                point_x = start_x
-                point_y = last_point_y
-                # 下一点不需要进行切换边
-                last_is_start = now_is_start
-                # 记录航线
-                line_count += 1
-            self.waypoints_list.append([point_x, point_y])
+        start_y = min_y + self.reduced_field_w / 2 - self.reduced_field_w
+        # 减去reduced_field_w 是因为第一条航线的y值要加上reduced_field_w
+        end_y = max_y - self.reduced_field_w / 2
+        if start_dir != "right":  # 起始点在航向的左侧  交换起点和终点的y值
+            start_y, end_y = end_y, start_y
+
+        # 航线条数: 所有不超出终点y值的航线，再加上第一条超出的航线
+        line_count = int(np.floor((max_y - min_y) / self.reduced_field_w)) + 1
+        # 一次性计算所有航线的y值，避免逐条累加带来的浮点误差
+        step = self.reduced_field_w if start_dir == "right" else -self.reduced_field_w
+        lines_y = start_y + np.arange(1, line_count + 1) * step
+
+        # 航线往返飞行: 偶数条航线从起始边飞向终点边，奇数条航线反向
+        lines_x = np.empty((line_count, 2), dtype=np.float64)
+        lines_x[0::2] = (min_x, max_x)
+        lines_x[1::2] = (max_x, min_x)
+        return np.column_stack([lines_x.ravel(), np.repeat(lines_y, 2)])
 
     #############################################################
     ## 对航点的x坐标进行收缩修正
@@ -308,87 +422,230 @@ class Calculator:
 
     def adjust_waypoints_x_coordinates(self):
         # 创建多边形对象
-        polygon = Polygon(self.point_list)
-
-        self.adjusted_segments = []
-
-        # 遍历每一各航线，收缩航线
-        for i in range(0, len(self.waypoints_list), 2):
-            p1 = Point(self.waypoints_list[i])
-            p2 = Point(self.waypoints_list[i + 1])
-            line = LineString([p1, p2])
-
-            intersections = line.intersection(polygon)
-            # 相交、相离、包含返回line类型，相切返回点类型
-            # 相交和包含是一样的，都返回端点坐标，相离返回坐标数为0
-            if len(intersections.coords) >= 2 and isinstance(intersections, LineString):  # 相交
-                new_p1 = min(
-                    [Point(intersections.coords[0]), Point(intersections.coords[-1])],
-                    key=lambda x: p1.distance(x),
-                )
-                new_p2 = min(
-                    [Point(intersections.coords[0]), Point(intersections.coords[-1])],
-                    key=lambda x: p2.distance(x),
-                )
-            else:  # 相切或者相离，此时必读在尾边界，首边界一定相交
-                new_p1 = Point(self.adjusted_segments[-1][0], self.waypoints_list[i][1])
-                new_p2 = Point(self.adjusted_segments[-2][0], self.waypoints_list[i][1])
+        polygon = Polygon(self.point_list, self.hole_lists)
+        # 沿航线方向分解为若干单元，每个单元内的航线与单元只交于一段；凸多边形只有一个单元
+        self.cells = decompose_polygon(polygon)
+        if len(self.cells) == 1:
+            segments = self.clip_lanes(polygon, self.waypoints_list)
+            self.transit = np.zeros(len(segments), dtype=bool)
+        else:
+            segments = self.plan_cells(self.cells, self.waypoints_list[0::2, 1])
+            # 单元之间的连接段可能穿过禁飞区或区域外部，改为沿区域内的最短折线绕行
+            # transit 标记插入的连接航线（每两个绕行转折点为一条），不增加航向偏移
+            segments, self.transit = route_transits(polygon, segments)
+        self.adjusted_segments = segments.reshape(-1, 2)
 
-            self.adjusted_segments.append([new_p1.x, new_p1.y])
-            self.adjusted_segments.append([new_p2.x, new_p2.y])
+    #############################################################
+    ## 增加航向偏移
+    #############################################################
 
+    def apply_heading_offset(self):
         # 增加航向偏移  用于弥补无人机提前过弯
-        self.offset_adjusted_segments = []
-
-        for i in range(0, len(self.adjusted_segments), 2):  # 步长为2
-            if i % 4 == 0:  # 第一点是起始点,第二点是终止点
-                point1 = (self.adjusted_segments[i][0] - self.heading_offset, self.adjusted_segments[i][1])
-                point2 = (self.adjusted_segments[i + 1][0] + self.heading_offset, self.adjusted_segments[i + 1][1])
-                if point2[0] - point1[0] < 0:  # 如果偏移完后顺序颠倒，则直接省略该点
-                    continue
-            else:  # 第一点是终止点,第二点是起始点
-                point1 = (self.adjusted_segments[i][0] + self.heading_offset, self.adjusted_segments[i][1])
-                point2 = (self.adjusted_segments[i + 1][0] - self.heading_offset, self.adjusted_segments[i + 1][1])
-                if point1[0] - point2[0] < 0:  # 如果偏移完后顺序颠倒，则直接省略该点
-                    continue
-            self.offset_adjusted_segments.append(point1)
-            self.offset_adjusted_segments.append(point2)
+        # 每条航线第一点是起始点,第二点是终止点, 沿x轴正方向飞行时direction为1, 反方向为-1
+        segments = self.adjusted_segments.reshape(-1, 2, 2)
+        p1, p2 = segments[:, 0], segments[:, 1]
+        direction = np.where(p2[:, 0] >= p1[:, 0], 1.0, -1.0)
+        offset = np.where(self.transit, 0.0, direction * self.heading_offset)  # 绕行的连接航线不偏移
+        offset_p1 = p1.copy()
+        offset_p2 = p2.copy()
+        offset_p1[:, 0] -= offset
+        offset_p2[:, 0] += offset
+        # 如果偏移完后顺序颠倒，则直接省略该航线
+        keep = self.transit | (direction * (offset_p2[:, 0] - offset_p1[:, 0]) >= 0)
+        self.offset_adjusted_segments = np.stack([offset_p1[keep], offset_p2[keep]], axis=1).reshape(-1, 2)
+
+    def clip_lanes(self, polygon, waypoints_list):
+        """将外接矩形中的往返航线裁剪到多边形内, 返回 (航线条数, 2, 2) 的航线起点和终点"""
+        # 所有航线的起点和终点 (line_count, 2, 2)
+        lines_coords = np.asarray(waypoints_list, dtype=np.float64).reshape(-1, 2, 2)
+        p1, p2 = lines_coords[:, 0], lines_coords[:, 1]
+
+        # 一次性构建所有航线并与多边形求交
+        lines = shapely.linestrings(lines_coords)
+        intersections = shapely.intersection(lines, polygon)
+        # 相交、相离、包含返回line类型，相切返回点类型
+        # 相交和包含是一样的，都返回端点坐标，相离返回坐标数为0
+        type_id = shapely.get_type_id(intersections)
+        assert not np.isin(type_id, (5, 7)).any(), "航线与飞行区域的交线被分成多段"
+        valid = (type_id == 1) & (shapely.get_num_coordinates(intersections) >= 2)
+        assert valid[0], "首条航线与多边形不相交"
+
+        # 取交线的两个端点，分别找出距离航线起点和终点最近的端点
+        first = shapely.get_coordinates(shapely.get_point(intersections[valid], 0))
+        last = shapely.get_coordinates(shapely.get_point(intersections[valid], -1))
+
+        def nearest(target):
+            use_first = np.hypot(*(first - target).T) <= np.hypot(*(last - target).T)
+            return np.where(use_first[:, None], first, last)
+
+        new_p1 = np.empty_like(p1)
+        new_p2 = np.empty_like(p2)
+        new_p1[valid] = nearest(p1[valid])
+        new_p2[valid] = nearest(p2[valid])
+
+        # 相切或者相离，此时必定在尾边界，沿用最近一条相交航线的x值，并按往返方向交替交换起点和终点
+        invalid = np.flatnonzero(~valid)
+        if invalid.size:
+            last_valid = np.maximum.accumulate(np.where(valid, np.arange(valid.size), 0))[invalid]
+            swap = (invalid - last_valid) % 2 == 1
+            new_p1[invalid, 0] = np.where(swap, new_p2[last_valid, 0], new_p1[last_valid, 0])
+            new_p2[invalid, 0] = np.where(swap, new_p1[last_valid, 0], new_p2[last_valid, 0])
+            new_p1[invalid, 1] = p1[invalid, 1]
+            new_p2[invalid, 1] = p1[invalid, 1]
+
+        return np.stack([new_p1, new_p2], axis=1)
+
+    def plan_cells(self, cells, lines_y):
+        """
+        非凸多边形或带禁飞区时, 在每个单元内使用全局统一的航线y值进行往返飞行,
+        单元之间按贪心顺序连接: 每次选择起点距离当前位置最近的单元及其飞行方式,
+        返回 (航线条数, 2, 2) 的航线起点和终点
+        """
+        # 每个单元内的航线: (左端x, 右端x, y)，按y从小到大排列
+        rows_list = []
+        for cell in cells:
+            cell_min_x, cell_min_y, cell_max_x, cell_max_y = cell.bounds
+            ys = lines_y[(lines_y >= cell_min_y) & (lines_y < cell_max_y)]
+            if ys.size == 0:  # 单元高度小于航线间距且没有航线经过，在单元中间补一条航线
+                ys = np.array([(cell_min_y + cell_max_y) / 2])
+            ys = np.sort(ys)
+            lines = shapely.linestrings(
+                np.stack(
+                    [
+                        np.column_stack([np.full_like(ys, cell_min_x - 1), ys]),
+                        np.column_stack([np.full_like(ys, cell_max_x + 1), ys]),
+                    ],
+                    axis=1,
+                )
+            )
+            bounds = shapely.bounds(shapely.intersection(lines, cell))
+            hit = ~np.isnan(bounds[:, 0])
+            if hit.any():
+                rows_list.append(np.column_stack([bounds[hit, 0], bounds[hit, 2], ys[hit]]))
+        assert rows_list, "航线与多边形不相交"
+
+        # 每个单元有4种飞行方式: 自下而上或自上而下, 从左端或右端开始
+        # 各飞行方式的起点 (单元数, 4, 2)
+        entries = np.array(
+            [
+                [
+                    (rows[0, 0], rows[0, 2]),
+                    (rows[0, 1], rows[0, 2]),
+                    (rows[-1, 0], rows[-1, 2]),
+                    (rows[-1, 1], rows[-1, 2]),
+                ]
+                for rows in rows_list
+            ]
+        )
+        # 与凸多边形一致, 从外接矩形左下角（右侧起飞）或左上角（左侧起飞）开始
+        position = np.array([self.min_x, self.min_y if self.start_dir == "right" else self.max_y])
+        remaining = np.ones(len(rows_list), dtype=bool)
+        segments = []
+        for _ in range(len(rows_list)):
+            distance = np.hypot(*(entries - position).transpose(2, 0, 1))
+            distance[~remaining] = np.inf
+            index, variant = np.unravel_index(np.argmin(distance), distance.shape)
+            remaining[index] = False
+
+            rows = rows_list[index] if variant < 2 else rows_list[index][::-1]
+            # 往返飞行: 偶数条航线从起始端飞向另一端，奇数条航线反向
+            from_left = np.arange(len(rows)) % 2 == variant % 2
+            start_x = np.where(from_left, rows[:, 0], rows[:, 1])
+            end_x = np.where(from_left, rows[:, 1], rows[:, 0])
+            segment = np.stack([np.column_stack([start_x, rows[:, 2]]), np.column_stack([end_x, rows[:, 2]])], axis=1)
+            segments.append(segment)
+            position = segment[-1, 1]
+        return np.concatenate(segments)
 
     #############################################################
     ## 将所有航点旋转回原平面坐标系
     #############################################################
 
     def rotate_waypoints_back(self):
-        # 使用 Shapely 创建点位
-        multi_point = MultiPoint([Point(x, y) for x, y in self.offset_adjusted_segments])
-        # 使用 Shapely 的 rotate 函数进行旋转
-        re_multi_point = rotate(multi_point, self.angle, origin=(0, 0), use_radians=False)  # 逆时针旋转
-        # 提取旋转后的点位坐标
-        self.re_points = [(point.x, point.y) for point in re_multi_point.geoms]
+        # 绕原点逆时针旋转，与 shapely.affinity.rotate 使用相同的公式，整体对数组计算
+        theta = self.angle * np.pi / 180.0
+        cos, sin = np.cos(theta), np.sin(theta)
+        # 与 shapely 一致，消除 90 度整数倍时三角函数的舍入误差
+        cos = 0.0 if abs(cos) < 2.5e-16 else cos
+        sin = 0.0 if abs(sin) < 2.5e-16 else sin
+        x, y = self.offset_adjusted_segments[:, 0], self.offset_adjusted_segments[:, 1]
+        self.re_points = np.column_stack([cos * x - sin * y, sin * x + cos * y])
 
     #############################################################
     ## 转换成WGS84坐标
     #############################################################
 
     def convert_to_wgs84(self):
-        mct_to_wgs84 = Transformer.from_crs(self.mercator, CRS.from_epsg(4326), always_xy=True)
-        self.wgs84_waypoints = [(mct_to_wgs84.transform(x, y)) for x, y in self.re_points]
+        # 将平面坐标整体转换回经纬度坐标
+        points = np.asarray(self.re_points, dtype=np.float64).reshape(-1, 2)
+        lng, lat = self.mct_to_wgs84.transform(points[:, 0], points[:, 1])
+        self.wgs84_waypoints = Waypoints(np.column_stack([lng, lat]))
 
     #############################################################
     ## 总流程调用
     #############################################################
 
-    def calculate(self):
-        self.calculate_centroid()
-        self.convert_to_plane_coords()
-        self.build_and_rotate_polygon()
-        self.find_min_bounding_rectangle()
-        self.calculate_waypoints_in_rectangle()
-        self.adjust_waypoints_x_coordinates()
-        self.rotate_waypoints_back()
-        self.convert_to_wgs84()
-        self.draw()
-        return self.wgs84_waypoints, self.flight_speed
+    def counters(self) -> dict:
+        """规划结果的统计: 输入顶点数、禁飞区数、分解的单元数、航线条数、裁剪前后的航点数以及绕行插入的航点数"""
+        return {
+            "vertices": len(self.wgs84_coords) + sum(len(hole) for hole in self.holes),
+            "holes": len(self.holes),
+            "cells": len(self.cells),
+            "lanes": len(self.waypoints_list) // 2,
+            "waypoints_before_clip": len(self.waypoints_list),
+            "waypoints_after_clip": len(self.offset_adjusted_segments),
+            "transit_waypoints": 2 * int(self.transit.sum()),
+        }
+
+    def calculate(self, draw=False):
+        """
+        依次执行各个阶段, 只重新执行参数或前序阶段输出改变的阶段, 其余阶段沿用上次的结果
+        本次沿用和重新执行的阶段分别记录在 reused_stages 和 computed_stages 中
+        返回 (航点, 实际飞行速度), 实际飞行速度同时保存在 effective_flight_speed 中, flight_speed 始终为输入值
+        在 instrument 上下文中调用时, 输出一条包含各阶段耗时和 counters() 的记录
+        """
+        recorder = current_recorder()
+        timer = Timer() if recorder is not None else None
+        changed = set()  # 输出改变的阶段
+        reused, computed = [], []
+        for stage, params, depends, outputs in CALCULATE_STAGES:
+            if stage == "optimize_angle" and not self.auto_angle:
+                self._stage_inputs.pop(stage, None)  # 手动指定角度时不执行，之后重新启用时需要重新计算
+                continue
+            inputs = {name: self.inputs[name] for name in params}
+            last_inputs = self._stage_inputs.get(stage)
+            if (
+                last_inputs is not None
+                and not changed.intersection(depends)
+                and all(_equal(value, last_inputs[name]) for name, value in inputs.items())
+            ):
+                reused.append(stage)
+                continue
+
+            previous = [getattr(self, name, None) for name in outputs]
+            self._stage_inputs.pop(stage, None)  # 执行失败时下次重新执行
+            if timer is not None:
+                timer.skip()
+            getattr(self, stage)()
+            if timer is not None:
+                timer.lap(stage)
+            self._stage_inputs[stage] = copy.deepcopy(inputs)
+            computed.append(stage)
+            if not all(_equal(old, getattr(self, name)) for old, name in zip(previous, outputs)):
+                changed.add(stage)
+
+        self.reused_stages, self.computed_stages = tuple(reused), tuple(computed)
+        if recorder is not None:
+            recorder.emit(
+                "calculate",
+                stages=timer.steps,
+                total=sum(timer.steps.values()),
+                reused=reused,
+                counters=self.counters(),
+            )
+        if draw:  # 默认不绘图，规划完成后可调用 draw 显示或导出预览图
+            self.draw()
+        return self.wgs84_waypoints, self.effective_flight_speed
 
 
 if __name__ == "__main__":
@@ -413,5 +670,7 @@ if __name__ == "__main__":
         camera_shoot_time=1,  # 相机拍照间隔时间---单位: 秒
         view_size=(12, 6),  # 预览图大小---单位：英尺
     )
-    waypoint_coords_wgs84 = calc.calculate()
-    print(waypoint_coords_wgs84)
+    waypoint_coords_wgs84, flight_speed = calc.calculate()
+    with np.printoptions(precision=15):  # 15 位小数显示，不修改全局设置
+        print(np.asarray(waypoint_coords_wgs84))
+    calc.draw()  # 显示预览图
@@ -1,10 +1,200 @@
 import xml.etree.ElementTree as ET
+from xml.dom import minidom
 import os
-from typing import List, Tuple
-from time import time
-import xml.dom.minidom as minidom
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple, Union
+from functools import lru_cache
+from time import time, localtime
 import zipfile
-import shutil
+from uuid import uuid4
+import io
+import numpy as np
+
+from .instrument_ import Timer, current_recorder, logger
+from .waypoints_ import Waypoints, as_waypoints
+
+# 模板文件夹位于项目根目录，按本文件位置定位，不依赖当前工作目录
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template")
+KML_TEMPLATE_PATH = os.path.join(TEMPLATE_FOLDER, "kml_template.kml")
+WPML_TEMPLATE_PATH = os.path.join(TEMPLATE_FOLDER, "wpml_template.wpml")
+
+# 航点插入位置的占位标签
+PLACEMARK_SLOT = "PlacemarkSlot"
+# 编译模板时的替换标记，形如 @@name@@
+SLOT_MARK = "@@{}@@"
+# 每次写入流的Placemark数量
+PLACEMARK_CHUNK = 1000
+
+# 命名空间声明
+NAMESPACES = {"wpml": "http://www.dji.com/wpmz/1.0.6", "kml": "http://www.opengis.net/kml/2.2"}
+
+# kml文件的点位参数
+KML_POINT_PARAM = {
+    "wpml:ellipsoidHeight": SLOT_MARK.format("height"),
+    "wpml:height": SLOT_MARK.format("height"),
+    "wpml:useGlobalHeight": SLOT_MARK.format("use_global_height"),
+    "wpml:useGlobalSpeed": "1",
+    "wpml:useGlobalHeadingParam": "1",
+    "wpml:useGlobalTurnParam": "1",
+    "wpml:useStraightLine": "0",
+    "wpml:isRisky": "0",
+}
+
+# wpml文件的点位参数
+WPML_POINT_PARAM = {
+    "wpml:executeHeight": SLOT_MARK.format("height"),
+    "wpml:waypointSpeed": SLOT_MARK.format("speed"),
+    "wpml:waypointHeadingParam": {
+        "wpml:waypointHeadingMode": "followWayline",
+        "wpml:waypointHeadingAngle": "0",
+        "wpml:waypointPoiPoint": "0.000000,0.000000,0.000000",
+        "wpml:waypointHeadingAngleEnable": "0",
+        "wpml:waypointHeadingPoiIndex": "0",
+    },
+    "wpml:waypointTurnParam": {
+        "wpml:waypointTurnMode": "coordinateTurn",
+        "wpml:waypointTurnDampingDist": "0",
+    },
+    "wpml:useStraightLine": "1",
+    "wpml:waypointGimbalHeadingParam": {
+        "wpml:waypointGimbalPitchAngle": "0",
+        "wpml:waypointGimbalYawAngle": "0",
+    },
+    "wpml:isRisky": "0",
+    "wpml:waypointWorkType": "0",
+}
+
+# kml/wpml模板中需要替换的标签及对应的参数名
+KML_HEADER_FIELDS = (
+    ("createTime", "create_time"),
+    ("updateTime", "update_time"),
+    ("takeOffSecurityHeight", "takeoff_height"),
+    ("globalHeight", "global_height"),
+    ("autoFlightSpeed", "flight_speed"),
+)
+WPML_HEADER_FIELDS = (
+    ("takeOffSecurityHeight", "takeoff_height"),
+    ("autoFlightSpeed", "flight_speed"),
+)
+
+
+class CompiledTemplate(NamedTuple):
+    """编译后的模板: 头部、单个Placemark、尾部片段, 以及Placemark之间的分隔符"""
+
+    head: str
+    placemark: str
+    tail: str
+    separator: str
+
+    def fill(self, fragment: str, values: dict) -> str:
+        """将片段中的 @@name@@ 标记替换为参数值"""
+        for name, value in values.items():
+            fragment = fragment.replace(SLOT_MARK.format(name), str(value))
+        return fragment
+
+    def render(self, stream: BinaryIO, values: dict, waypoints: Waypoints):
+        """
+        按模板将整个文件写入二进制流, 每个航点只进行一次字符串格式化;
+        航点按PLACEMARK_CHUNK分块从数组中取出, 不为每个航点创建元组, 逐点高度、速度列存在时替代全局值
+        """
+        # 将Placemark片段转换为格式化字符串, 航点序号和经纬度依次为 {0} {1} {2}, 逐点数据列依次排在其后
+        placemark = self.placemark.replace("{", "{{").replace("}", "}}")
+        placemark = placemark.replace(SLOT_MARK.format("index"), "{0}")
+        placemark = placemark.replace(SLOT_MARK.format("lng"), "{1}")
+        placemark = placemark.replace(SLOT_MARK.format("lat"), "{2}")
+        columns = []
+        for name, column in (("height", waypoints.heights), ("speed", waypoints.speeds)):
+            if column is not None:
+                placemark = placemark.replace(SLOT_MARK.format(name), f"{{{3 + len(columns)}}}")
+                columns.append(column)
+        placemark = self.fill(placemark, values)
+        following = self.separator + placemark
+
+        stream.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        stream.write(self.fill(self.head, values).encode("utf-8"))
+        for start in range(0, len(waypoints), PLACEMARK_CHUNK):
+            stop = start + PLACEMARK_CHUNK
+            # tolist 一次性转换为Python浮点数, 输出格式与逐个转换相同
+            rows = zip(
+                range(start, min(stop, len(waypoints))),
+                *waypoints.coords[start:stop].T.tolist(),
+                *(column[start:stop].tolist() for column in columns),
+            )
+            if start == 0:
+                stream.write(placemark.format(*next(rows)).encode("utf-8"))
+            stream.write("".join(following.format(*row) for row in rows).encode("utf-8"))
+        stream.write(self.fill(self.tail, values).encode("utf-8"))
+
+
+def compile_template(path: str, header_fields, point_param: dict, before: Optional[str], pretty: bool):
+    """
+    解析模板文件, 将需要替换的标签内容设为 @@name@@ 标记, 并在航点插入位置拆分为头部和尾部;
+    同时生成一个带标记的Placemark片段。before为None时Placemark添加到Folder末尾, 否则添加在该标签之前
+    """
+    # 注册命名空间前缀
+    ET.register_namespace("wpml", NAMESPACES["wpml"])
+    ET.register_namespace("", NAMESPACES["kml"])
+    # 解析XML文件
+    root = ET.parse(path).getroot()
+    for tag, name in header_fields:
+        element = root.find(f".//wpml:{tag}", NAMESPACES)
+        assert element is not None, "模板错误"
+        element.text = SLOT_MARK.format(name)
+
+    folder_element = root.find(".//kml:Folder", NAMESPACES)
+    assert folder_element is not None, "模板错误"
+    if before is None:
+        index = len(folder_element)
+    else:
+        before_element = folder_element.find(f".//wpml:{before}", NAMESPACES)
+        assert before_element is not None, "模板错误"
+        index = list(folder_element).index(before_element)
+
+    # 在航点插入位置放置占位标签，序列化后以其为界拆分为头部和尾部
+    folder_element.insert(index, ET.Element(PLACEMARK_SLOT))
+    if pretty:
+        ET.indent(root, space="  ")
+    head, tail = ET.tostring(root, encoding="unicode").split(f"<{PLACEMARK_SLOT} />")
+    # Placemark之间的分隔与占位标签前的缩进一致
+    separator = head[len(head.rstrip()) :] if pretty else ""
+
+    # 带标记的Placemark片段
+    placemark = ET.Element("Placemark")
+    point = ET.SubElement(placemark, "Point")
+    coord_element = ET.SubElement(point, "coordinates")
+    coord_element.text = f"{SLOT_MARK.format('lng')},{SLOT_MARK.format('lat')}"
+    # 创建点位索引
+    wpml_index = ET.SubElement(placemark, "wpml:index")
+    wpml_index.text = SLOT_MARK.format("index")
+    # 创建其它标签元素
+    for name, value in point_param.items():
+        element = ET.SubElement(placemark, name)
+        if isinstance(value, dict):  # 嵌套参数
+            for name_, value_ in value.items():
+                element_ = ET.SubElement(element, name_)
+                element_.text = value_
+        else:
+            element.text = value
+    if pretty:
+        ET.indent(placemark, space="  ", level=len(separator.strip("\n")) // 2)
+
+    return CompiledTemplate(head, ET.tostring(placemark, encoding="unicode"), tail, separator)
+
+
+@lru_cache(maxsize=16)
+def _compile_kml_template(path: str, mtime: float, pretty: bool) -> CompiledTemplate:
+    # Placemark添加在payloadParam之前
+    return compile_template(path, KML_HEADER_FIELDS, KML_POINT_PARAM, "payloadParam", pretty)
+
+
+@lru_cache(maxsize=16)
+def _compile_wpml_template(path: str, mtime: float, pretty: bool) -> CompiledTemplate:
+    # Placemark添加到Folder末尾
+    return compile_template(path, WPML_HEADER_FIELDS, WPML_POINT_PARAM, None, pretty)
+
+
+def template_cache_info():
+    """返回kml和wpml模板缓存的命中/未命中统计"""
+    return {"kml": _compile_kml_template.cache_info(), "wpml": _compile_wpml_template.cache_info()}
 
 
 class KmzCreator:
@@ -13,22 +203,23 @@ class KmzCreator:
         takeoff_height: float,  # 起飞高度---单位：米
         global_height: float,  # 飞行高度---单位：米
         flight_speed: float,  # 飞行速度---单位：米/秒
-        coordinates: List[Tuple[float, float]],  # 目标坐标系下的经纬坐标---单位:度
+        coordinates: Union[Waypoints, np.ndarray, List[Tuple[float, float]]],  # 目标坐标系下的经纬坐标---单位:度
     ) -> None:
+        """coordinates为 Waypoints 时, 其逐点高度、速度列分别替代航点的全局高度和全局速度"""
         super().__init__()
-        self.kml_template_path = "template/kml_template.kml"  # 模板文件的路径
-        self.kml_output_path = "wpmz/template.kml"
+        self.kml_template_path = KML_TEMPLATE_PATH  # 模板文件的路径
+        self.kml_output_path = "wpmz/template.kml"  # kmz压缩包内的文件路径
 
-        self.wpml_template_path = "template/wpml_template.wpml"  # 模板文件的路径
-        self.wpml_output_path = "wpmz/waylines.wpml"
+        self.wpml_template_path = WPML_TEMPLATE_PATH  # 模板文件的路径
+        self.wpml_output_path = "wpmz/waylines.wpml"  # kmz压缩包内的文件路径
 
         self.takeoff_height = takeoff_height
         self.global_height = global_height
         self.flight_speed = flight_speed
-        self.coordinates = coordinates
+        self.coordinates = as_waypoints(coordinates)
 
-    def prettify_xml(self, elem):
-        """格式化XML 添加缩进和换行 并去除多余的空行"""
+    def prettify_xml(self, elem) -> bytes:
+        """格式化XML 添加缩进和换行 并去除多余的空行（兼容旧接口, 导出时不再使用）"""
         rough_string = ET.tostring(elem, "utf-8")
         reparsed = minidom.parseString(rough_string)
         # 格式化输出并指定编码
@@ -36,202 +227,150 @@ class KmzCreator:
         # 去除多余的空行
         return b"\n".join([line for line in pretty_xml.splitlines() if line.strip()])
 
-    def create_kml(self):
-        print("正在导出kml文件...")
+    def write_file(self, path: str, create, pretty: bool = True):
+        """将create生成的内容写入文件 目录不存在时创建（兼容旧接口的缓存文件）"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            create(f, pretty)
+
+    def create_kml(self, stream: Optional[BinaryIO] = None, pretty: bool = True):
+        """将kml文件写入二进制流; stream为None时按旧接口写入kml_output_path文件"""
+        if stream is None:
+            return self.write_file(self.kml_output_path, self.create_kml, pretty)
+        logger.debug("正在导出kml文件...")
         # 参数检查
         assert os.path.exists(self.kml_template_path), "模板文件不存在"
         assert 2 <= self.takeoff_height <= 1500, "起飞高度错误"
         assert -1500 <= self.global_height <= 1500, "飞行高度错误"
         assert 0 < self.flight_speed <= 15, "飞行速度错误"
         assert len(self.coordinates) >= 2, "点位坐标错误"
-        # 点位参数
-        point_param = {
-            "wpml:ellipsoidHeight": str(self.global_height),
-            "wpml:height": str(self.global_height),
-            "wpml:useGlobalHeight": "1",
-            "wpml:useGlobalSpeed": "1",
-            "wpml:useGlobalHeadingParam": "1",
-            "wpml:useGlobalTurnParam": "1",
-            "wpml:useStraightLine": "0",
-            "wpml:isRisky": "0",
-        }
-        # 解析XML文件
-        tree = ET.parse(self.kml_template_path)
-        root = tree.getroot()
-        # 命名空间声明
-        namespaces = {"wpml": "http://www.dji.com/wpmz/1.0.6", "kml": "http://www.opengis.net/kml/2.2"}
-        # 注册命名空间前缀
-        ET.register_namespace("wpml", namespaces["wpml"])
-        ET.register_namespace("", namespaces["kml"])
+        heights = self.coordinates.heights
+        assert heights is None or (np.abs(heights) <= 1500).all(), "航点高度错误"
+        # 模板每个进程只编译一次，模板文件修改后重新编译
+        template = _compile_kml_template(self.kml_template_path, os.path.getmtime(self.kml_template_path), pretty)
         # 修改文件创建时间
         _time = round(time() * 1000)
-        create_time = root.find(".//wpml:createTime", namespaces)
-        assert create_time is not None, "模板错误"
-        create_time.text = str(_time)
-        update_time = root.find(".//wpml:updateTime", namespaces)
-        assert update_time is not None, "模板错误"
-        update_time.text = str(_time + 1)
-        # 修改起飞安全高度
-        takeoff_height_element = root.find(".//wpml:takeOffSecurityHeight", namespaces)
-        assert takeoff_height_element is not None, "模板错误"
-        takeoff_height_element.text = str(self.takeoff_height)
-        # 修改全局飞行高度
-        global_height_element = root.find(".//wpml:globalHeight", namespaces)
-        assert global_height_element is not None, "模板错误"
-        global_height_element.text = str(self.global_height)
-        # 修改航线飞行速度
-        flight_speed_element = root.find(".//wpml:autoFlightSpeed", namespaces)
-        assert flight_speed_element is not None, "模板错误"
-        flight_speed_element.text = str(self.flight_speed)
-
-        folder_element = root.find(".//kml:Folder", namespaces)
-        assert folder_element is not None, "模板错误"
-        # 添加Placemark
-        for i, coord in enumerate(self.coordinates):
-            new_placemark = ET.Element("Placemark")
-            point = ET.SubElement(new_placemark, "Point")
-            coord_element = ET.SubElement(point, "coordinates")
-            coord_element.text = f"{coord[0]},{coord[1]}"
-            # 创建点位索引
-            wpml_index = ET.SubElement(new_placemark, "wpml:index")
-            wpml_index.text = str(i)
-            # 创建其它标签
-            for name, value in point_param.items():
-                element = ET.SubElement(new_placemark, name)
-                element.text = value
-            # 将Placemark添加到Folder
-            payload_param = folder_element.find(".//wpml:payloadParam", namespaces)
-            folder_element.insert(list(folder_element).index(payload_param), new_placemark)
-        # 获取文件路径的目录部分
-        directory = os.path.dirname(self.kml_output_path)
-        # 检查目录是否存在，如果不存在则创建
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-        # 使用minidom格式化并保存XML
-        xml_string = self.prettify_xml(root)
-        # 将格式化后的XML字符串写入文件
-        with open(self.kml_output_path, "wb") as f:
-            f.write(xml_string)
-        print("kml文件已成功导出!")
-
-    def create_wpml(self):
-        print("正在导出wpml文件...")
+        values = {
+            "create_time": _time,
+            "update_time": _time + 1,
+            "takeoff_height": self.takeoff_height,
+            "global_height": self.global_height,
+            "flight_speed": self.flight_speed,
+            "height": self.global_height,
+            "use_global_height": 1 if heights is None else 0,
+        }
+        template.render(stream, values, self.coordinates)
+        logger.debug("kml文件已成功导出!")
+
+    def create_wpml(self, stream: Optional[BinaryIO] = None, pretty: bool = True):
+        """将wpml文件写入二进制流; stream为None时按旧接口写入wpml_output_path文件"""
+        if stream is None:
+            return self.write_file(self.wpml_output_path, self.create_wpml, pretty)
+        logger.debug("正在导出wpml文件...")
         # 参数检查
         assert os.path.exists(self.wpml_template_path), "模板文件不存在"
         assert 2 <= self.takeoff_height <= 1500, "起飞高度错误"
         assert -1500 <= self.global_height <= 1500, "飞行高度错误"
         assert 1 <= self.flight_speed <= 15, "飞行速度错误"
         assert len(self.coordinates) >= 2, "点位坐标错误"
-        # 点位参数
-        point_param = {
-            "wpml:executeHeight": str(self.global_height),
-            "wpml:waypointSpeed": str(self.flight_speed),
-            "wpml:waypointHeadingParam": {
-                "wpml:waypointHeadingMode": "followWayline",
-                "wpml:waypointHeadingAngle": "0",
-                "wpml:waypointPoiPoint": "0.000000,0.000000,0.000000",
-                "wpml:waypointHeadingAngleEnable": "0",
-                "wpml:waypointHeadingPoiIndex": "0",
-            },
-            "wpml:waypointTurnParam": {
-                "wpml:waypointTurnMode": "coordinateTurn",
-                "wpml:waypointTurnDampingDist": "0",
-            },
-            "wpml:useStraightLine": "1",
-            "wpml:waypointGimbalHeadingParam": {
-                "wpml:waypointGimbalPitchAngle": "0",
-                "wpml:waypointGimbalYawAngle": "0",
-            },
-            "wpml:isRisky": "0",
-            "wpml:waypointWorkType": "0",
+        heights, speeds = self.coordinates.heights, self.coordinates.speeds
+        assert heights is None or (np.abs(heights) <= 1500).all(), "航点高度错误"
+        assert speeds is None or ((1 <= speeds) & (speeds <= 15)).all(), "航点速度错误"
+        # 模板每个进程只编译一次，模板文件修改后重新编译
+        template = _compile_wpml_template(self.wpml_template_path, os.path.getmtime(self.wpml_template_path), pretty)
+        values = {
+            "takeoff_height": self.takeoff_height,
+            "global_height": self.global_height,
+            "flight_speed": self.flight_speed,
+            "height": self.global_height,
+            "speed": self.flight_speed,
         }
-        # 解析XML文件
-        tree = ET.parse(self.wpml_template_path)
-        root = tree.getroot()
-        # 命名空间声明
-        namespaces = {"wpml": "http://www.dji.com/wpmz/1.0.6", "kml": "http://www.opengis.net/kml/2.2"}
-        # 注册命名空间前缀
-        ET.register_namespace("wpml", namespaces["wpml"])
-        ET.register_namespace("", namespaces["kml"])
-        # 修改起飞安全高度
-        takeoff_height_element = root.find(".//wpml:takeOffSecurityHeight", namespaces)
-        assert takeoff_height_element is not None, "模板错误"
-        takeoff_height_element.text = str(self.takeoff_height)
-        # 修改航线飞行速度
-        flight_speed_element = root.find(".//wpml:autoFlightSpeed", namespaces)
-        assert flight_speed_element is not None, "模板错误"
-        flight_speed_element.text = str(self.flight_speed)
-
-        folder_element = root.find(".//kml:Folder", namespaces)
-        assert folder_element is not None, "模板错误"
-        # 添加Placemark
-        for i, coord in enumerate(self.coordinates):
-            new_placemark = ET.Element("Placemark")
-            point = ET.SubElement(new_placemark, "Point")
-            coord_element = ET.SubElement(point, "coordinates")
-            coord_element.text = f"{coord[0]},{coord[1]}"
-            # 创建点位索引
-            wpml_index = ET.SubElement(new_placemark, "wpml:index")
-            wpml_index.text = str(i)
-            # 创建其它标签元素
-            for name, value in point_param.items():
-                element = ET.SubElement(new_placemark, name)
-                if isinstance(value, dict):  # 嵌套参数
-                    for name_, value_ in value.items():
-                        element_ = ET.SubElement(element, name_)
-                        element_.text = value_
-                else:
-                    element.text = value
-            # 将Placemark添加到Folder
-            folder_element.append(new_placemark)
-        # 获取文件路径的目录部分
-        directory = os.path.dirname(self.wpml_output_path)
-        # 检查目录是否存在，如果不存在则创建
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-        # 使用minidom格式化并保存XML
-        xml_string = self.prettify_xml(root)
-        # 将格式化后的XML字符串写入文件
-        with open(self.wpml_output_path, "wb") as f:
-            f.write(xml_string)
-        print("wpml文件已成功导出!")
+        template.render(stream, values, self.coordinates)
+        logger.debug("wpml文件已成功导出!")
+
+    def write(self, output: Union[str, BinaryIO], pretty: bool = True):
+        """
+        直接将kml和wpml文件流式写入kmz压缩包 不生成缓存文件
+        output可以是文件路径 也可以是任意可写的二进制文件对象（如io.BytesIO）
+        在 instrument 上下文中调用时, 输出一条包含kml、wpml（渲染并压缩）和zip（写入目录并关闭）耗时及字节数的记录
+        """
+        logger.info("正在导出kmz文件...")
+        recorder = current_recorder()
+        timer = Timer() if recorder is not None else None
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zipf:
+            with zipf.open(self.zip_info(self.kml_output_path), "w") as f:
+                self.create_kml(f, pretty)
+            if timer is not None:
+                timer.lap("kml")
+            with zipf.open(self.zip_info(self.wpml_output_path), "w") as f:
+                self.create_wpml(f, pretty)
+            if timer is not None:
+                timer.lap("wpml")
+            infos = zipf.infolist()
+        if timer is not None:
+            timer.lap("zip")
+            recorder.emit(
+                "export",
+                steps=timer.steps,
+                total=sum(timer.steps.values()),
+                counters={
+                    "waypoints": len(self.coordinates),
+                    "kml_bytes": infos[0].file_size,  # 压缩前
+                    "wpml_bytes": infos[1].file_size,
+                    "kmz_bytes": sum(info.compress_size for info in infos),  # 压缩后（不含zip目录）
+                },
+            )
+        logger.info("kmz文件已成功导出!")
+
+    def zip_info(self, arcname: str) -> zipfile.ZipInfo:
+        """压缩包内文件的信息 使用当前时间作为修改时间"""
+        info = zipfile.ZipInfo(arcname, date_time=localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+    def to_bytes(self, pretty: bool = True) -> bytes:
+        """生成kmz文件的字节数据"""
+        buffer = io.BytesIO()
+        self.write(buffer, pretty)
+        return buffer.getvalue()
 
     def zip_file(self, kmz_output_path: str = "output/file.kmz"):
-        print(f"正在导出kmz文件...")
-        # 检查文件
+        """兼容旧接口: 将create_kml()和create_wpml()生成的缓存文件打包为kmz 新代码应使用create或write"""
         assert os.path.exists(self.wpml_output_path) and os.path.exists(self.kml_output_path), "目标文件不存在"
         assert os.path.splitext(kmz_output_path)[-1] == ".kmz", "输出文件格式错误"
-        # 确保输出ZIP文件名是绝对路径或相对于当前工作目录
-        if not os.path.isabs(kmz_output_path):
-            kmz_output_path = os.path.join(os.getcwd(), kmz_output_path)
+        directory = os.path.dirname(kmz_output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with zipfile.ZipFile(kmz_output_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for path in (self.kml_output_path, self.wpml_output_path):
+                # 在ZIP中统一存放在wpmz目录下
+                zipf.write(path, os.path.join("wpmz", os.path.basename(path)))
+        return kmz_output_path
+
+    def create(self, kmz_output_path: str = "output/file.kmz", remove_temp: bool = True, pretty: bool = True):
+        """
+        原子地写入kmz文件并返回文件路径
+        remove_temp仅为兼容旧接口保留: 不再生成缓存文件, 该参数被忽略
+        """
+        assert os.path.splitext(kmz_output_path)[-1] == ".kmz", "输出文件格式错误"
         # 获取文件路径的目录部分
         directory = os.path.dirname(kmz_output_path)
         # 检查目录是否存在，如果不存在则创建
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-        # 创建一个 ZipFile 对象，并设置模式为 'w' 表示写入
-        with zipfile.ZipFile(kmz_output_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            # 遍历文件夹中的所有文件和子文件夹
-            for root, dirs, files in os.walk("wpmz"):
-                # 遍历当前目录下的所有文件
-                for file in files:
-                    # 获取文件的完整路径
-                    file_path = os.path.join(root, file)
-                    # 计算文件在ZIP中的相对路径
-                    arcname = os.path.relpath(file_path, start="")
-                    # 将文件添加到ZIP文件中
-                    zipf.write(file_path, arcname)
-        print(f"kmz文件已成功导出!")
-
-    def create(self, kmz_output_path: str = "output/file.kmz", remove_temp: bool = True):
-        self.create_kml()
-        self.create_wpml()
-        self.zip_file(kmz_output_path)
-        if remove_temp:  # 删除生成文件的父文件夹及其内容
-            parent_folder = os.path.dirname(self.kml_output_path)
-            if os.path.exists(parent_folder):
-                shutil.rmtree(parent_folder)
-            print(f"已删除缓存文件!")
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        # 先写入同目录下的临时文件，完成后再重命名，保证不会出现写了一半的kmz文件
+        temp_path = f"{kmz_output_path}.{uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "xb") as f:
+                self.write(f, pretty)
+            os.replace(temp_path, kmz_output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return kmz_output_path
 
 
 if __name__ == "__main__":
@@ -247,4 +386,4 @@ if __name__ == "__main__":
     ]  # 这里是目标坐标系下的经纬度坐标
 
     kmz = KmzCreator(takeoff_height, global_height, flight_speed, coordinates)
-    kmz.create("output/file.kmz", True)
+    kmz.create("output/file.kmz")
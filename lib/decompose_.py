@@ -0,0 +1,260 @@
+from bisect import bisect_right
+from heapq import heappop, heappush
+from typing import List, Tuple
+from shapely.geometry import Polygon
+from shapely.geometry.polygon import orient
+import shapely
+import numpy as np
+
+"""
+牛耕式（boustrophedon）单元分解: 航线沿x轴方向, 沿y轴方向依次排列,
+将任意简单多边形（可带洞）分解为若干单元, 每个单元内任意一条水平航线与单元只交于一段;
+单元之间的连接段离开区域（穿过禁飞区或凹处的区域外部）时, 沿区域内的最短折线绕行
+"""
+
+# 面积小于该值的单元（平方米）视为退化单元并丢弃
+MIN_CELL_AREA = 1e-6
+# 判断连接段是否位于区域内时的容差，连接段可以沿边界飞行---单位: 米
+TRANSIT_TOLERANCE = 1e-3
+# 绕行搜索时每批判断可见性的候选顶点数
+TRANSIT_BATCH = 8
+
+
+class _Cell:
+    """扫描过程中的单元: 左右两条边界链以及当前正在延伸的左右边 (起点索引, 终点索引)"""
+
+    def __init__(self, left_chain, left_edge, right_chain, right_edge):
+        self.left_chain = left_chain
+        self.left_edge = left_edge
+        self.right_chain = right_chain
+        self.right_edge = right_edge
+
+
+def _x_at(points: np.ndarray, edge, y: float) -> float:
+    # 计算边在给定y值处的x坐标
+    a, b = points[edge[0]], points[edge[1]]
+    dy = b[1] - a[1]
+    if dy == 0:
+        return a[0]
+    t = min(max((y - a[1]) / dy, 0.0), 1.0)
+    return a[0] + (b[0] - a[0]) * t
+
+
+def _to_polygons(cell: _Cell) -> List[Polygon]:
+    # 左链自下而上，右链自上而下，组成单元多边形
+    polygon = Polygon(cell.left_chain + cell.right_chain[::-1])
+    if not polygon.is_valid:
+        # 边界链上的水平边会在单元底部或顶部形成退化的尖刺，修复后只保留面状部分
+        polygon = shapely.make_valid(polygon).buffer(0)
+    return [part for part in shapely.get_parts(polygon) if part.area > MIN_CELL_AREA]
+
+
+def decompose_polygon(polygon: Polygon) -> List[Polygon]:
+    """
+    使用水平扫描线自下而上扫描多边形顶点, 在分裂点（开口向下的凹顶点）和合并点（开口向上的凹顶点）处
+    切分单元。顶点排序 O(n log n), 每个事件通过字典或二分查找定位所在单元。
+    多边形本身已经是y单调的（没有分裂点和合并点且没有洞）时直接返回 [polygon]
+    """
+    # 外环逆时针、内环顺时针，此时多边形内部始终位于边的左侧
+    oriented = orient(polygon.simplify(0), sign=1.0)
+    rings = [np.asarray(oriented.exterior.coords, dtype=np.float64)[:-1]]
+    rings += [np.asarray(ring.coords, dtype=np.float64)[:-1] for ring in oriented.interiors]
+
+    # 所有顶点及其在所在环中的前一个、后一个顶点索引
+    points = np.concatenate(rings)
+    prev_index = np.concatenate([offset + (np.arange(len(r)) - 1) % len(r) for offset, r in _offsets(rings)])
+    next_index = np.concatenate([offset + (np.arange(len(r)) + 1) % len(r) for offset, r in _offsets(rings)])
+
+    # 按 (y, x) 的字典序确定扫描顺序，避免水平边带来的歧义
+    order = np.lexsort((points[:, 0], points[:, 1]))
+    rank = np.empty(len(points), dtype=np.int64)
+    rank[order] = np.arange(len(points))
+    prev_above = rank[prev_index] > rank
+    next_above = rank[next_index] > rank
+    # 叉积大于0为凸顶点，小于0为凹顶点
+    d1 = points - points[prev_index]
+    d2 = points[next_index] - points
+    convex = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0] > 0
+
+    start = prev_above & next_above  # 局部最低点
+    end = ~prev_above & ~next_above  # 局部最高点
+    if len(rings) == 1 and not (start & ~convex).any() and not (end & ~convex).any():
+        return [polygon]
+
+    cells = []
+    active = []  # 按x坐标从左到右排列的活动单元
+    left_owner = {}  # 顶点索引 -> 左边界延伸到该顶点的单元
+    right_owner = {}  # 顶点索引 -> 右边界延伸到该顶点的单元
+
+    def close(cell, y, left_point=None, right_point=None):
+        cell.left_chain.append(left_point or (_x_at(points, cell.left_edge, y), y))
+        cell.right_chain.append(right_point or (_x_at(points, cell.right_edge, y), y))
+        cells.extend(_to_polygons(cell))
+
+    def register(cell):
+        left_owner[cell.left_edge[1]] = cell
+        right_owner[cell.right_edge[1]] = cell
+
+    for v in order:
+        x, y = points[v]
+        p, n = prev_index[v], next_index[v]
+        vertex = (x, y)
+
+        if start[v] and convex[v]:  # 开始点: 新建单元
+            cell = _Cell([vertex], (v, p), [vertex], (v, n))
+            index = bisect_right(active, x, key=lambda c: _x_at(points, c.left_edge, y))
+            active.insert(index, cell)
+            register(cell)
+
+        elif start[v]:  # 分裂点: 所在单元结束，分裂为左右两个新单元
+            index = bisect_right(active, x, key=lambda c: _x_at(points, c.left_edge, y)) - 1
+            assert index >= 0, "单元分解失败"
+            cell = active[index]
+            left_point = (_x_at(points, cell.left_edge, y), y)
+            right_point = (_x_at(points, cell.right_edge, y), y)
+            close(cell, y, left_point, right_point)
+            left_cell = _Cell([left_point], cell.left_edge, [vertex], (v, n))
+            right_cell = _Cell([vertex], (v, p), [right_point], cell.right_edge)
+            active[index : index + 1] = [left_cell, right_cell]
+            register(left_cell)
+            register(right_cell)
+
+        elif end[v] and convex[v]:  # 结束点: 单元结束
+            cell = left_owner.pop(v)
+            right_owner.pop(v)
+            close(cell, y, vertex, vertex)
+            active.remove(cell)
+
+        elif end[v]:  # 合并点: 左右两个单元结束，合并为一个新单元
+            left_cell = right_owner.pop(v)  # 右边界延伸到该点的是左侧单元
+            right_cell = left_owner.pop(v)  # 左边界延伸到该点的是右侧单元
+            left_point = (_x_at(points, left_cell.left_edge, y), y)
+            right_point = (_x_at(points, right_cell.right_edge, y), y)
+            close(left_cell, y, left_point, vertex)
+            close(right_cell, y, vertex, right_point)
+            cell = _Cell([left_point], left_cell.left_edge, [right_point], right_cell.right_edge)
+            index = active.index(left_cell)
+            active[index : index + 2] = [cell]
+            register(cell)
+
+        elif v in left_owner:  # 左边界上的普通顶点: 沿环的反方向向上延伸
+            cell = left_owner.pop(v)
+            cell.left_chain.append(vertex)
+            cell.left_edge = (v, p)
+            left_owner[p] = cell
+
+        else:  # 右边界上的普通顶点: 沿环的方向向上延伸
+            cell = right_owner.pop(v)
+            cell.right_chain.append(vertex)
+            cell.right_edge = (v, n)
+            right_owner[n] = cell
+
+    return cells
+
+
+def _offsets(rings):
+    # 依次返回每个环在顶点数组中的起始位置及该环
+    offset = 0
+    for ring in rings:
+        yield offset, ring
+        offset += len(ring)
+
+
+def reflex_vertices(polygon: Polygon) -> np.ndarray:
+    """区域的凹顶点（外环的凹顶点和禁飞区的凸顶点）, 区域内的最短路径只在这些顶点处转折"""
+    oriented = orient(polygon.simplify(0), sign=1.0)
+    rings = [np.asarray(ring.coords, dtype=np.float64)[:-1] for ring in [oriented.exterior, *oriented.interiors]]
+    points = np.concatenate(rings)
+    prev_point = np.concatenate([np.roll(ring, 1, axis=0) for ring in rings])
+    next_point = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings])
+    # 外环逆时针、内环顺时针，区域内部始终位于边的左侧，叉积小于0为区域的凹顶点
+    d1, d2 = points - prev_point, next_point - points
+    return points[d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0] < 0]
+
+
+def route_inside(area, start, end, nodes: np.ndarray) -> np.ndarray:
+    """
+    在区域内从 start 到 end 的最短折线: 以 nodes（区域的凹顶点）为候选转折点, 在可见图上进行A*搜索;
+    展开顶点时按经过该顶点的估计总长度从小到大、每次判断 TRANSIT_BATCH 个候选顶点是否可见, 其余候选顶点
+    留待估计总长度最小时再判断, 通常只需判断少量线段; 返回途经的转折点 (m, 2), 不含起点和终点
+    area 为加上容差并已 prepare 的区域
+    """
+    points = np.vstack([np.asarray(start, dtype=np.float64), np.asarray(end, dtype=np.float64), nodes])
+    goal = 1
+    remain = np.hypot(*(points - points[goal]).T)  # 到终点的直线距离（启发函数）
+    distance = np.full(len(points), np.inf)
+    distance[0] = 0.0
+    parent = np.full(len(points), -1)
+    closed = np.zeros(len(points), dtype=bool)
+    pending = {}  # 已展开的顶点 -> (按估计总长度排序的候选顶点, 估计总长度)
+    heap = [(remain[0], 0, -1)]  # (估计总长度, 顶点, 下一批候选顶点的位置)，位置为-1时表示展开该顶点
+    while heap:
+        _, u, position = heappop(heap)
+        if position < 0:
+            if closed[u]:
+                continue
+            if u == goal:
+                break
+            closed[u] = True
+            candidates = np.flatnonzero(~closed)
+            estimate = distance[u] + np.hypot(*(points[candidates] - points[u]).T) + remain[candidates]
+            order = np.argsort(estimate)
+            pending[u] = (candidates[order], estimate[order])
+            position = 0
+        candidates, estimate = pending[u]
+        batch = candidates[position : position + TRANSIT_BATCH]
+        batch = batch[~closed[batch]]
+        lines = shapely.linestrings(np.stack([np.broadcast_to(points[u], (len(batch), 2)), points[batch]], axis=1))
+        visible = batch[shapely.covers(area, lines)]
+        new_distance = distance[u] + np.hypot(*(points[visible] - points[u]).T)
+        better = new_distance < distance[visible]
+        for v, d in zip(visible[better], new_distance[better]):
+            distance[v], parent[v] = d, u
+            heappush(heap, (d + remain[v], v, -1))
+        position += TRANSIT_BATCH
+        if position < len(candidates):
+            heappush(heap, (estimate[position], u, position))
+    assert np.isfinite(distance[goal]), "单元之间的连接段无法在区域内绕行"
+
+    path = []
+    v = parent[goal]
+    while v > 0:
+        path.append(v)
+        v = parent[v]
+    return points[path[::-1]].reshape(-1, 2)
+
+
+def route_transits(polygon: Polygon, segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    检查相邻航线之间的连接段（航线 i 终点到航线 i+1 起点）, 离开区域的连接段沿区域内的最短折线绕行
+    绕行的转折点两两组成连接航线插入到航线之间（转折点为奇数个时在最长的一段中点处补一个点）,
+    返回 (航线, 是否为连接航线) 即 (L', 2, 2) 和 (L',)
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+    transit = np.zeros(len(segments), dtype=bool)
+    if len(segments) < 2:
+        return segments, transit
+    area = polygon.buffer(TRANSIT_TOLERANCE, join_style="mitre")  # 尖角连接，顶点数与原区域相同
+    shapely.prepare(area)
+    links = np.stack([segments[:-1, 1], segments[1:, 0]], axis=1)
+    outside = np.flatnonzero(~shapely.covers(area, shapely.linestrings(links)))
+    if outside.size == 0:
+        return segments, transit
+
+    nodes = reflex_vertices(polygon)
+    parts, flags = [], []
+    start = 0
+    for i in outside:
+        parts.append(segments[start : i + 1])
+        flags.append(transit[start : i + 1])
+        via = route_inside(area, links[i, 0], links[i, 1], nodes)
+        if len(via) % 2 == 1:  # 补一个点使转折点成对，取最长一段的中点（仍在区域内）
+            path = np.vstack([links[i, :1], via, links[i, 1:]])
+            longest = int(np.argmax(np.hypot(*np.diff(path, axis=0).T)))
+            via = np.insert(via, longest, (path[longest] + path[longest + 1]) / 2, axis=0)
+        parts.append(via.reshape(-1, 2, 2))
+        flags.append(np.ones(len(via) // 2, dtype=bool))
+        start = i + 1
+    parts.append(segments[start:])
+    flags.append(transit[start:])
+    return np.concatenate(parts), np.concatenate(flags)
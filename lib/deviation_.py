@@ -0,0 +1,144 @@
+from typing import NamedTuple, Optional
+import numpy as np
+import shapely
+
+from .batch_ import convert_coords
+from .calculate_ import Calculator, get_tmerc_transformers
+from .reader_ import read_kmz
+
+"""
+规划航点与实际拍照位置的偏差统计: 将两者投影到与 Calculator 相同的横轴墨卡托平面,
+通过 STRtree 空间索引为每张照片找到最近的航段（相邻两个航点之间的线段）, 按航段和整个任务统计偏差
+"""
+
+# 建立空间索引时将航段切分成不超过该长度的小段，避免长航线的外接矩形大量重叠---单位: 米
+INDEX_PIECE_LENGTH = 25.0
+
+
+class DeviationReport(NamedTuple):
+    # 航段i为第i个到第i+1个航点之间的线段，完整的蛇形航线中偶数序号为航线，奇数序号为航线之间的连接段
+    lane: np.ndarray  # 每张照片匹配的航段序号 (n,)
+    distance: np.ndarray  # 每张照片到航段的距离 (n,)---单位: 米
+    cross_track: np.ndarray  # 每张照片的横向偏差，沿飞行方向左侧为正 (n,)---单位: 米
+    lane_count: np.ndarray  # 每个航段匹配的照片数 (L,)，L为航点数减1
+    lane_mean: np.ndarray  # 每个航段的平均距离，没有照片时为nan (L,)---单位: 米
+    lane_rms: np.ndarray  # 每个航段的均方根距离 (L,)---单位: 米
+    lane_p95: np.ndarray  # 每个航段的95%分位距离 (L,)---单位: 米
+    lane_max: np.ndarray  # 每个航段的最大距离 (L,)---单位: 米
+    mean: float  # 整个任务的平均距离---单位: 米
+    rms: float  # 整个任务的均方根距离---单位: 米
+    p95: float  # 整个任务的95%分位距离---单位: 米
+    max: float  # 整个任务的最大距离---单位: 米
+
+
+def read_kmz_waypoints(kmz_path: str, coord_system: str = "wgs84") -> np.ndarray:
+    """读取kmz文件中 waylines.wpml 的航点坐标, 并转换为WGS84经纬度 (n, 2)"""
+    return convert_coords(read_kmz(kmz_path).waypoints, coord_system, "wgs84")
+
+
+def _percentile_by_group(group: np.ndarray, values: np.ndarray, count: np.ndarray, q: float) -> np.ndarray:
+    # 按组计算分位数（取不小于q的最近序位），没有数据的组为nan
+    order = np.lexsort((values, group))
+    start = np.cumsum(count) - count
+    rank = start + np.maximum(np.ceil(q * count).astype(np.int64) - 1, 0)
+    result = np.full(len(count), np.nan)
+    has = count > 0
+    result[has] = values[order][rank[has]]
+    return result
+
+
+def deviation_report(
+    planned,  # 规划航点: Calculator 或按飞行顺序排列的 WGS84 经纬度数组 (n, 2)，航点数量可以是奇数（如删除了最后一个航点）
+    photos: np.ndarray,  # 照片拍摄位置的WGS84经纬度 (n, 2)
+    center: Optional[tuple] = None,  # 投影中心经纬度，取值为None时使用 Calculator 的形心或航点的平均值
+) -> DeviationReport:
+    """
+    为每张照片找到实际飞行路线（依次连接各航点的折线）上最近的航段并计算偏差,
+    统计每个航段及整个任务的平均值、均方根、95%分位值和最大值
+    航段切分成小段后使用 shapely.STRtree 批量查询最近航段, 1万张照片对1万个航点耗时约几十到几百毫秒
+    """
+    if isinstance(planned, Calculator):
+        assert hasattr(planned, "wgs84_waypoints"), "请先进行航点规划"
+        if center is None:
+            center = (planned.centroid_x, planned.centroid_y)
+        planned = planned.wgs84_waypoints
+    planned = np.asarray(planned, dtype=np.float64).reshape(-1, 2)
+    photos = np.asarray(photos, dtype=np.float64).reshape(-1, 2)
+    assert len(planned) >= 2, "规划航点数量错误"
+    assert len(photos) >= 1, "没有照片位置"
+    if center is None:
+        center = planned.mean(axis=0)
+
+    # 与 Calculator.convert_to_plane_coords 相同的横轴墨卡托投影
+    _, wgs84_to_mct, _ = get_tmerc_transformers(center[0], center[1])
+    planned_xy = np.column_stack(wgs84_to_mct.transform(planned[:, 0], planned[:, 1]))
+    planned_xy = np.stack([planned_xy[:-1], planned_xy[1:]], axis=1)  # 相邻航点之间的航段 (n-1, 2, 2)
+    photo_xy = np.column_stack(wgs84_to_mct.transform(photos[:, 0], photos[:, 1]))
+
+    # 航段切分成小段后建立空间索引，批量查询每张照片最近的小段及其所属航段
+    start, end = planned_xy[:, 0], planned_xy[:, 1]
+    pieces = np.maximum(np.ceil(np.hypot(*(end - start).T) / INDEX_PIECE_LENGTH), 1).astype(np.int64)
+    piece_lane = np.repeat(np.arange(len(planned_xy)), pieces)
+    piece_first = np.cumsum(pieces) - pieces
+    t0 = (np.arange(pieces.sum()) - np.repeat(piece_first, pieces)) / pieces[piece_lane]
+    t1 = t0 + 1 / pieces[piece_lane]
+    delta = (end - start)[piece_lane]
+    piece_xy = np.stack([start[piece_lane] + delta * t0[:, None], start[piece_lane] + delta * t1[:, None]], axis=1)
+    tree = shapely.STRtree(shapely.linestrings(piece_xy))
+    (photo_index, piece), distance = tree.query_nearest(
+        shapely.points(photo_xy), return_distance=True, all_matches=False
+    )
+    order = np.argsort(photo_index)
+    lane, distance = piece_lane[piece[order]], distance[order]
+
+    # 横向偏差: 照片相对航段方向的有符号垂直距离
+    start, end = planned_xy[lane, 0], planned_xy[lane, 1]
+    direction = end - start
+    length = np.hypot(*direction.T)
+    offset = photo_xy - start
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cross_track = np.where(
+            length > 0, (direction[:, 0] * offset[:, 1] - direction[:, 1] * offset[:, 0]) / length, distance
+        )
+
+    # 按航段统计
+    lane_total = len(planned_xy)
+    lane_count = np.bincount(lane, minlength=lane_total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lane_mean = np.bincount(lane, distance, lane_total) / lane_count
+        lane_rms = np.sqrt(np.bincount(lane, distance**2, lane_total) / lane_count)
+    lane_max = np.full(lane_total, np.nan)
+    np.fmax.at(lane_max, lane, distance)
+    lane_p95 = _percentile_by_group(lane, distance, lane_count, 0.95)
+
+    return DeviationReport(
+        lane,
+        distance,
+        cross_track,
+        lane_count,
+        lane_mean,
+        lane_rms,
+        lane_p95,
+        lane_max,
+        float(distance.mean()),
+        float(np.sqrt((distance**2).mean())),
+        float(
+            _percentile_by_group(np.zeros(len(distance), dtype=np.int64), distance, np.array([len(distance)]), 0.95)[0]
+        ),
+        float(distance.max()),
+    )
+
+
+def format_deviation_report(report: DeviationReport) -> str:
+    """生成每个航段及整个任务的偏差摘要"""
+    lines = [
+        f"照片 {len(report.distance)} 张, 航段 {len(report.lane_count)} 个",
+        f"整体偏差: 平均 {report.mean:.2f} 米, 均方根 {report.rms:.2f} 米, "
+        f"95%分位 {report.p95:.2f} 米, 最大 {report.max:.2f} 米",
+    ]
+    for i in np.flatnonzero(report.lane_count):
+        lines.append(
+            f"航段 {i + 1}: 照片 {report.lane_count[i]} 张, 平均 {report.lane_mean[i]:.2f} 米, "
+            f"均方根 {report.lane_rms[i]:.2f} 米, 95%分位 {report.lane_p95[i]:.2f} 米, 最大 {report.lane_max[i]:.2f} 米"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,123 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional, Union
+import asyncio
+import os
+
+from .create_ import KmzCreator
+from .instrument_ import bind_context, current_recorder, instrument
+
+
+def export_kmz(kmz: KmzCreator, output_path: Optional[str] = None, pretty: bool = True) -> Union[str, bytes]:
+    """
+    导出单个kmz: output_path为None时返回kmz文件的字节数据, 否则原子地写入文件并返回文件路径
+    不使用任何共享的缓存文件夹, 可在多个线程或进程中同时调用
+    """
+    if output_path is None:
+        return kmz.to_bytes(pretty)
+    return kmz.create(output_path, pretty=pretty)
+
+
+def _export_recorded(kmz: KmzCreator, output_path: Optional[str], pretty: bool, fields: dict):
+    """
+    在进程池中导出并记录: 上下文变量不能传到其它进程, 按提交者记录器的公共字段重新进入 instrument,
+    返回 (导出结果, 记录列表), 记录由提交者转发给自己的sink
+    """
+    records: List[dict] = []
+    with instrument(records.append, **fields):
+        result = export_kmz(kmz, output_path, pretty)
+    return result, records
+
+
+class ExportService:
+    """
+    asyncio 导出服务: XML渲染和zip压缩在执行器（默认线程池）中进行, 不阻塞事件循环
+    待处理任务放在有界队列中, 队列已满时 submit 会等待, 从而对上游形成背压
+
+    使用示例:
+        async with ExportService(max_workers=4, max_queue=16) as service:
+            path = await service.export(kmz, "output/a.kmz")
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,  # 同时导出的任务数，取值为None时使用CPU核数
+        max_queue: int = 16,  # 等待队列长度
+        executor: Optional[Executor] = None,  # 自定义执行器（如进程池），取值为None时创建线程池
+        pretty: bool = True,  # 是否格式化XML
+    ) -> None:
+        assert max_workers is None or max_workers >= 1, "导出任务数错误"
+        assert max_queue >= 1, "等待队列长度错误"
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.pretty = pretty
+        self._own_executor = executor is None
+        self._executor = executor
+        self._queue = None
+        self._workers = []
+
+    async def start(self):
+        if self._workers:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="kmz-export")
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def close(self):
+        """等待队列中的任务全部完成后关闭服务"""
+        if not self._workers:
+            return
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._own_executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            export, kmz, output_path, future, recorder = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    if recorder is None:
+                        result = await loop.run_in_executor(self._executor, export, kmz, output_path, self.pretty)
+                    else:
+                        result, records = await loop.run_in_executor(
+                            self._executor, _export_recorded, kmz, output_path, self.pretty, recorder.fields
+                        )
+                        for record in records:
+                            recorder.sink(record)
+                    if not future.cancelled():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def submit(self, kmz: KmzCreator, output_path: Optional[str] = None) -> asyncio.Future:
+        """提交导出任务, 队列已满时等待; 返回的 Future 结果为文件路径或kmz字节数据"""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        if isinstance(self._executor, ThreadPoolExecutor):
+            # 在线程池中沿用提交者的上下文（运行记录）
+            await self._queue.put((bind_context(export_kmz), kmz, output_path, future, None))
+        else:
+            # 进程池等执行器需要序列化任务, 只能提交模块级函数, 运行记录的公共字段显式传递
+            await self._queue.put((export_kmz, kmz, output_path, future, current_recorder()))
+        return future
+
+    async def export(self, kmz: KmzCreator, output_path: Optional[str] = None) -> Union[str, bytes]:
+        """提交导出任务并等待完成"""
+        return await (await self.submit(kmz, output_path))
@@ -0,0 +1,171 @@
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Union
+import xml.etree.ElementTree as ET
+import zipfile
+import os
+import numpy as np
+
+from .batch_ import BatchPlanner, BatchResult, convert_coords
+
+"""
+批量读取kml/kmz边界文件: 流式解析所有Placemark中的Polygon（外环和内环）及名称,
+去掉重复的闭合点和退化的环, 以numpy数组的形式批量交给 Calculator 规划
+"""
+
+KML_NAMESPACE = "http://www.opengis.net/kml/2.2"
+# 根据文档名称、描述中的关键字判断坐标系，均未出现时按KML标准使用WGS84
+COORD_SYSTEM_KEYWORDS = (
+    ("gcj02", ("GCJ", "高德", "火星")),
+    ("cgcs2000", ("CGCS", "天地图", "2000国家")),
+    ("wgs84", ("WGS",)),
+)
+# 面积小于该值（平方度）的环视为退化环
+MIN_RING_AREA = 1e-14
+
+
+class Area(NamedTuple):
+    name: str  # Placemark名称，没有名称时为序号
+    exterior: np.ndarray  # 外环经纬度 (n, 2)，不含重复的闭合点---单位: 度
+    holes: List[np.ndarray]  # 内环（禁飞区）经纬度列表
+    coord_system: str  # 坐标系：'wgs84','cgcs2000','gcj02'
+
+    def to_wgs84(self) -> "Area":
+        """转换为WGS84坐标"""
+        return Area(
+            self.name,
+            convert_coords(self.exterior, self.coord_system, "wgs84"),
+            [convert_coords(hole, self.coord_system, "wgs84") for hole in self.holes],
+            "wgs84",
+        )
+
+
+def _tag(name: str) -> str:
+    return f"{{{KML_NAMESPACE}}}{name}"
+
+
+def parse_coordinates(text: Optional[str]) -> np.ndarray:
+    """解析kml的coordinates文本（以空白分隔的 经度,纬度[,高度]），只保留经纬度 (n, 2)"""
+    tuples = (text or "").split()
+    if not tuples:
+        return np.empty((0, 2), dtype=np.float64)
+    dims = tuples[0].count(",") + 1
+    values = ",".join(tuples).split(",")
+    if len(values) == dims * len(tuples):  # 所有点的维数相同时整体转换
+        return np.array(values, dtype=np.float64).reshape(-1, dims)[:, :2]
+    return np.array([item.split(",")[:2] for item in tuples], dtype=np.float64)
+
+
+def clean_ring(ring: np.ndarray) -> Optional[np.ndarray]:
+    """去掉重复的闭合点和连续重复点, 顶点少于3个或面积为0的环返回None"""
+    if len(ring) and np.array_equal(ring[0], ring[-1]):
+        ring = ring[:-1]
+    if len(ring) > 1:
+        keep = np.concatenate([[True], np.any(ring[1:] != ring[:-1], axis=1)])
+        ring = ring[keep]
+    if len(ring) < 3:
+        return None
+    # 鞋带公式计算面积
+    x, y = ring[:, 0], ring[:, 1]
+    area = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+    return ring if area > MIN_RING_AREA else None
+
+
+def detect_coord_system(text: str) -> str:
+    """根据文本中的关键字判断坐标系"""
+    upper = text.upper()
+    for coord_system, keywords in COORD_SYSTEM_KEYWORDS:
+        if any(keyword in upper for keyword in keywords):
+            return coord_system
+    return "wgs84"
+
+
+@contextmanager
+def _open_kml(source: Union[str, BinaryIO]):
+    # kmz压缩包中取第一个kml文件，其它情况按kml文件打开
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zipf:
+            names = [name for name in zipf.namelist() if name.lower().endswith(".kml")]
+            assert names, "kmz文件中没有kml文件"
+            with zipf.open(names[0]) as stream:
+                yield stream
+    elif isinstance(source, str):
+        with open(source, "rb") as stream:
+            yield stream
+    else:
+        source.seek(0)
+        yield source
+
+
+def iter_areas(source: Union[str, BinaryIO], coord_system: Optional[str] = None) -> Iterator[Area]:
+    """
+    流式解析kml/kmz文件, 依次返回每个Polygon（MultiGeometry中的每个Polygon单独返回）
+    coord_system为None时根据Placemark之前出现的文档名称、描述中的关键字判断坐标系
+    每个Placemark解析完成后立即从树中移除, 不会构建整个文档的DOM
+    """
+    assert coord_system in [None, "wgs84", "cgcs2000", "gcj02"], "输入坐标系统错误"
+    placemark_tag, polygon_tag = _tag("Placemark"), _tag("Polygon")
+    name_tag, description_tag = _tag("name"), _tag("description")
+    outer_path = f"{{{KML_NAMESPACE}}}outerBoundaryIs/{{{KML_NAMESPACE}}}LinearRing/{{{KML_NAMESPACE}}}coordinates"
+    inner_path = f"{{{KML_NAMESPACE}}}innerBoundaryIs/{{{KML_NAMESPACE}}}LinearRing/{{{KML_NAMESPACE}}}coordinates"
+
+    hints = []  # Placemark之前的文档名称和描述
+    parents = []
+    count = 0
+    with _open_kml(source) as stream:
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.tag in (name_tag, description_tag) and count == 0 and element.text:
+                hints.append(element.text)
+            if element.tag != placemark_tag:
+                continue
+
+            if coord_system is None:
+                coord_system = detect_coord_system(" ".join(hints))
+            name = (element.findtext(name_tag) or "").strip()
+            for polygon in element.iter(polygon_tag):
+                exterior = clean_ring(parse_coordinates(polygon.findtext(outer_path)))
+                if exterior is None:  # 外环退化，丢弃整个多边形
+                    continue
+                holes = [clean_ring(parse_coordinates(ring.text)) for ring in polygon.iterfind(inner_path)]
+                yield Area(name or str(count), exterior, [hole for hole in holes if hole is not None], coord_system)
+                count += 1
+            # 从父元素中移除已处理的Placemark，保持内存占用恒定
+            if parents:
+                parents[-1].remove(element)
+            else:
+                element.clear()
+
+
+def load_areas(paths: Union[str, List[str]], coord_system: Optional[str] = None) -> List[Area]:
+    """读取一个或多个kml/kmz文件（也可以是包含这些文件的文件夹）中的所有多边形"""
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith((".kml", ".kmz"))
+            )
+        else:
+            files.append(path)
+    areas = []
+    for file in files:
+        areas.extend(iter_areas(file, coord_system))
+    return areas
+
+
+def plan_areas(areas: List[Area], params: Optional[dict] = None, **planner_options) -> Iterator[BatchResult]:
+    """
+    将多边形统一转换为WGS84坐标后交给 BatchPlanner 批量规划, 结果的 index 对应 areas 中的序号
+    params为所有多边形共用的 Calculator 参数, planner_options 传给 BatchPlanner（进程数、输出文件夹等）
+    """
+    params = params or {}
+    planner = BatchPlanner(input_coord_system="wgs84", **planner_options)
+    jobs = []
+    for area in areas:
+        wgs84_area = area.to_wgs84()
+        jobs.append((wgs84_area.exterior, {**params, "holes": list(wgs84_area.holes)}))
+    return planner.run(jobs, ordered=True)
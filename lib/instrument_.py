@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from time import perf_counter, time
+from typing import Callable, List, Optional, Union
+import threading
+import logging
+import json
+
+"""
+可选的运行记录: 在 instrument 上下文中, Calculator.calculate 记录每个阶段的耗时和航线、航点数量,
+KmzCreator.write 记录kml、wpml和压缩的耗时及字节数, 每次调用产生一条结构化记录（dict）, 交给回调函数或写入JSON行文件;
+未启用时每次调用只多一次上下文变量查询。控制台信息统一通过 logger（名称为 kmz）输出
+"""
+
+logger = logging.getLogger("kmz")
+
+_recorder: ContextVar = ContextVar("kmz_recorder", default=None)
+
+
+class Recorder:
+    """将记录补充公共字段后交给sink"""
+
+    def __init__(self, sink: Callable[[dict], None], fields: dict) -> None:
+        self.sink = sink
+        self.fields = fields
+
+    def emit(self, event: str, **data):
+        self.sink({"event": event, "time": time(), **self.fields, **data})
+
+
+class Timer:
+    """依次记录各个步骤的耗时---单位: 秒"""
+
+    def __init__(self) -> None:
+        self.steps = {}
+        self._start = perf_counter()
+
+    def lap(self, name: str):
+        now = perf_counter()
+        self.steps[name] = self.steps.get(name, 0.0) + now - self._start
+        self._start = now
+
+    def skip(self):
+        # 不计入任何步骤的时间
+        self._start = perf_counter()
+
+
+def current_recorder() -> Optional[Recorder]:
+    """当前上下文中的记录器，未启用时为None"""
+    return _recorder.get()
+
+
+def jsonl_sink(path: str) -> Callable[[dict], None]:
+    """返回将记录追加到JSON行文件的sink，每条记录一行，可在多个线程中使用"""
+    lock = threading.Lock()
+
+    def sink(record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=float) + "\n"
+        with lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    return sink
+
+
+@contextmanager
+def instrument(sink: Union[None, str, Callable[[dict], None]] = None, **fields):
+    """
+    在该上下文中启用运行记录, sink为回调函数或JSON行文件路径, 取值为None时记录保存在返回的列表中;
+    fields为添加到每条记录中的公共字段（如任务序号）, 嵌套使用时合并外层的字段并沿用外层的sink
+
+    使用示例:
+        with instrument("records.jsonl", field="A区"):
+            calc.calculate()
+        with instrument() as records:
+            kmz.create("output/a.kmz")
+    """
+    parent = _recorder.get()
+    records: List[dict] = []
+    if sink is None:
+        sink = parent.sink if parent is not None else records.append
+    elif isinstance(sink, str):
+        sink = jsonl_sink(sink)
+    if parent is not None:
+        fields = {**parent.fields, **fields}
+    token = _recorder.set(Recorder(sink, fields))
+    try:
+        yield records
+    finally:
+        _recorder.reset(token)
+
+
+def bind_context(func: Callable) -> Callable:
+    """
+    在其它线程中执行时沿用当前上下文的记录器（线程池不会自动传递上下文变量）
+    在提交任务的线程中调用, 每个任务单独调用一次（同一个上下文不能同时在多个线程中进入）
+    """
+    context = copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
@@ -0,0 +1,167 @@
+from typing import NamedTuple, Optional, Sequence, Tuple, Union
+from shapely.geometry import Polygon
+from shapely.geometry.polygon import orient
+import numpy as np
+
+"""
+航线方向自动优化: 对一组候选角度同时旋转多边形顶点, 一次性估计每个角度下的
+航线条数、总航程、转弯次数和飞行时间, 选出飞行时间最短的航线方向
+"""
+
+# 候选角度间隔---单位: 度
+ANGLE_STEP = 0.5
+# 每次转弯（减速、转向、加速）额外耗时的估计值---单位: 秒
+TURN_TIME = 3.0
+
+
+class AngleCurve(NamedTuple):
+    angles: np.ndarray  # 候选角度---单位: 度
+    lane_count: np.ndarray  # 与区域相交的航线条数
+    path_length: np.ndarray  # 总航程（航线长度 + 航线之间的连接段），无法规划的角度为inf---单位: 米
+    turn_count: np.ndarray  # 转弯次数
+    flight_time: np.ndarray  # 估计飞行时间---单位: 秒
+
+
+def _rotate(points, angles):
+    # 与 Calculator 一致: 多边形绕原点旋转 -angle 后航线沿x轴方向, 返回 (k, V) 的x和y坐标
+    rad = np.radians(angles)[:, None]
+    cos, sin = np.cos(rad), np.sin(rad)
+    return cos * points[:, 0] + sin * points[:, 1], -sin * points[:, 0] + cos * points[:, 1]
+
+
+def _single_cell(ring, angles):
+    """
+    与 decompose_polygon 的判断相同: 旋转后的外环（没有禁飞区）没有凹的局部最低点和局部最高点时只有一个单元,
+    此时 Calculator 使用 clip_lanes 裁剪航线; 返回每个候选角度是否只有一个单元 (k,)
+    """
+    d1 = ring - np.roll(ring, 1, axis=0)
+    d2 = np.roll(ring, -1, axis=0) - ring
+    convex = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0] > 0  # 旋转不改变凹凸
+    px, py = _rotate(ring, angles)
+
+    def above(shift):
+        # 相邻顶点在扫描顺序（按y再按x）中是否位于该顶点之后
+        ox, oy = np.roll(px, shift, axis=1), np.roll(py, shift, axis=1)
+        return (oy > py) | ((oy == py) & (ox > px))
+
+    prev_above, next_above = above(1), above(-1)
+    extreme = (prev_above & next_above) | (~prev_above & ~next_above)
+    return ~(extreme & ~convex).any(axis=1)
+
+
+def _score_angles(points, edges, angles, lane_spacing, single=None, from_top=False):
+    # 对所有候选角度计算各项代价, points为顶点 (V, 2), edges为每条边起点和终点的顶点索引 (E, 2)
+    # single为每个角度是否只有一个单元 (k,), from_top为True时航线从上边界开始排列（左侧起飞）
+    px, py = _rotate(points, angles)
+    if from_top:  # 沿y方向翻转后与从下边界开始排列相同，环的方向随之反转
+        py = -py
+
+    # 与 Calculator.generate_lanes 相同的航线y值: base + j * lane_spacing, j = 0 .. line_count - 1
+    # 从上边界开始排列时, generate_lanes 的第一条航线距上边界1.5个航线间距
+    min_y, max_y = py.min(axis=1), py.max(axis=1)
+    line_count = np.floor((max_y - min_y) / lane_spacing).astype(np.int64) + 1
+    base = min_y + lane_spacing / 2 + (lane_spacing if from_top else 0.0)
+
+    # 每条边穿过的航线是一段连续的序号 [j0, j1)，半开区间保证相邻两条边在共同顶点处不重复计数
+    ay, by = py[:, edges[:, 0]], py[:, edges[:, 1]]
+
+    def index(y):
+        return np.clip(np.ceil((y - base[:, None]) / lane_spacing), 0, line_count[:, None]).astype(np.int64)
+
+    j0, j1 = index(np.minimum(ay, by)), index(np.maximum(ay, by))
+    counts = (j1 - j0).ravel()
+
+    # 只展开实际存在的 (角度, 边, 航线) 交点，总数约为 角度数 x 航线条数 x 2
+    k_index, e_index = np.divmod(np.repeat(np.arange(counts.size), counts), len(edges))
+    j = j0.ravel().repeat(counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    y = base[k_index] + j * lane_spacing
+    a_x, a_y = px[k_index, edges[e_index, 0]], ay[k_index, e_index]
+    b_x, b_y = px[k_index, edges[e_index, 1]], by[k_index, e_index]
+    x = a_x + (y - a_y) * (b_x - a_x) / (b_y - a_y)
+
+    # 外环逆时针、内环顺时针: 向上的边是区域右边界，向下的边是区域左边界（翻转后相反）
+    up = (b_y > a_y) != from_top
+    max_lines = int(line_count.max())
+    lane_id = k_index * max_lines + j
+    size = len(angles) * max_lines
+    chord = np.bincount(lane_id, np.where(up, x, -x), size).reshape(-1, max_lines)
+    segments = np.bincount(lane_id, up, size).reshape(-1, max_lines)
+    left = np.full(size, np.inf)
+    right = np.full(size, -np.inf)
+    np.minimum.at(left, lane_id, x)
+    np.maximum.at(right, lane_id, x)
+    left, right = left.reshape(-1, max_lines), right.reshape(-1, max_lines)
+
+    # 往返飞行: 偶数条航线在右端结束，奇数条航线在左端结束，连接段为相邻两条航线同一侧端点的连线
+    hit = segments > 0
+    linked = hit[:, :-1] & hit[:, 1:]
+    even = np.arange(max_lines - 1) % 2 == 0
+    with np.errstate(invalid="ignore"):  # 不相交的航线端点为无穷大
+        side = np.where(even, right[:, :-1] - right[:, 1:], left[:, :-1] - left[:, 1:])
+    link = np.hypot(lane_spacing, np.where(linked, side, 0.0)) * linked
+
+    lane_count = hit.sum(axis=1)
+    path_length = chord.sum(axis=1) + link.sum(axis=1)
+    turn_count = np.maximum(2 * (segments.sum(axis=1) - 1), 0).astype(np.int64)
+
+    # 与 Calculator.clip_lanes 一致: 只有一个单元时，超出区域的末尾航线仍然飞行（保证边界附近的覆盖），
+    # 沿用最后一条相交航线的端点x值，每条的连接段为一个航线间距，并增加两次转弯
+    if single is not None:
+        rows = np.arange(len(angles))
+        last_hit = np.where(hit, np.arange(max_lines), -1).max(axis=1)
+        extra = np.where(single & (last_hit >= 0), line_count - 1 - last_hit, 0)
+        lane_count = lane_count + extra
+        path_length = path_length + extra * (chord[rows, np.maximum(last_hit, 0)] + lane_spacing)
+        turn_count = turn_count + 2 * extra
+        # 首条航线与区域不相交时 clip_lanes 无法规划，不选择该角度
+        path_length = np.where(single & ~hit[:, 0], np.inf, path_length)
+    return lane_count, path_length, turn_count
+
+
+def optimize_angle(
+    coords: np.ndarray,  # 平面坐标下的多边形顶点 (n, 2)---单位: 米
+    lane_spacing: float,  # 航线间距---单位: 米
+    flight_speed: float,  # 飞行速度---单位: 米/秒
+    holes: Optional[Sequence[np.ndarray]] = None,  # 禁飞区顶点列表
+    step: float = ANGLE_STEP,  # 候选角度间隔---单位: 度
+    turn_time: float = TURN_TIME,  # 每次转弯的额外耗时---单位: 秒
+    return_curve: bool = False,  # 是否同时返回所有候选角度的代价
+    start_dir: str = "right",  # 起始飞行点，与 Calculator 相同，决定航线从下边界还是上边界开始排列
+) -> Union[float, Tuple[float, AngleCurve]]:
+    """
+    在 [0, 180) 范围内按 step 间隔评估候选航线方向（航线往返飞行, 相差180度的方向等价）,
+    返回估计飞行时间最短的角度; 飞行时间 = 总航程 / 飞行速度 + 转弯次数 * 每次转弯耗时
+    评估的航线与 Calculator 实际生成的航线相同, 包括只有一个单元时超出区域的最后一条航线
+    """
+    assert lane_spacing > 0, "航线间距错误"
+    assert flight_speed > 0, "飞行速度错误"
+    assert 0 < step <= 180, "候选角度间隔错误"
+    assert start_dir == "right" or start_dir == "left", "起始飞行点错误"
+
+    # 外环逆时针、内环顺时针，旋转不改变环的方向
+    polygon = orient(Polygon(coords, holes or []), sign=1.0)
+    rings = [np.asarray(polygon.exterior.coords, dtype=np.float64)[:-1]]
+    rings += [np.asarray(ring.coords, dtype=np.float64)[:-1] for ring in polygon.interiors]
+    points = np.concatenate(rings)
+    offsets = np.cumsum([0] + [len(ring) for ring in rings[:-1]])
+    edges = np.concatenate(
+        [np.column_stack([o + np.arange(len(r)), o + (np.arange(len(r)) + 1) % len(r)]) for o, r in zip(offsets, rings)]
+    )
+    # 以顶点均值为原点旋转，减小大坐标值带来的舍入误差
+    center = points.mean(axis=0)
+    points = points - center
+
+    angles = np.arange(0, 180, step, dtype=np.float64)
+    single = None
+    if not holes:  # 有禁飞区时总是分解为多个单元
+        ring = np.asarray(orient(polygon.simplify(0), sign=1.0).exterior.coords, dtype=np.float64)[:-1] - center
+        single = _single_cell(ring, angles)
+    lane_count, path_length, turn_count = _score_angles(
+        points, edges, angles, lane_spacing, single, from_top=start_dir != "right"
+    )
+    flight_time = path_length / flight_speed + turn_count * turn_time
+
+    best = float(angles[np.argmin(flight_time)])
+    if return_curve:
+        return best, AngleCurve(angles, lane_count, path_length, turn_count, flight_time)
+    return best
@@ -0,0 +1,143 @@
+from typing import Optional, Sequence
+import os
+import numpy as np
+
+"""
+航线预览图: 所有航线和连接段作为一个 LineCollection 绘制, 航段数量较多时按输出图像的像素大小抽稀
+（端点落在相同像素网格中的航段只保留一条）, 绘制的航段数只与图像尺寸有关, 渲染耗时基本不随航点数量增加;
+可选叠加边界和禁飞区, 直接以非交互方式保存为 png（栅格）或 svg（矢量）等文件
+"""
+
+# 航段数量超过该值时按像素抽稀，不超过时原样绘制
+PREVIEW_MAX_SEGMENTS = 5000
+# 抽稀网格相对像素的大小，小于1时保留更多细节
+PREVIEW_GRID = 0.5
+# 边界顶点数量不超过该值时绘制顶点标记
+PREVIEW_MAX_MARKERS = 500
+
+
+def decimate_segments(segments: np.ndarray, cell: float, origin: np.ndarray) -> np.ndarray:
+    """
+    按网格抽稀航段 (m, 2, 2): 将端点量化到边长为cell的网格中, 起点和终点所在网格都相同的航段（不区分方向）只保留第一条,
+    返回保留的原始航段, 保持原有顺序
+    """
+    cells = np.floor((segments - origin) / cell).astype(np.int64).reshape(-1, 4)
+    # 起点和终点交换后视为同一航段
+    swap = (cells[:, 0] > cells[:, 2]) | ((cells[:, 0] == cells[:, 2]) & (cells[:, 1] > cells[:, 3]))
+    cells[swap] = cells[swap][:, [2, 3, 0, 1]]
+    cells -= cells.min(axis=0)
+    base = int(cells.max()) + 1
+    if base < 1 << 15:  # 4个网格序号合并为一个整数，比按行去重快得多
+        keys = ((cells[:, 0] * base + cells[:, 1]) * base + cells[:, 2]) * base + cells[:, 3]
+        _, first = np.unique(keys, return_index=True)
+    else:
+        _, first = np.unique(cells, axis=0, return_index=True)
+    return segments[np.sort(first)]
+
+
+def render_preview(
+    axs,
+    way_points,  # 按飞行顺序排列的航点经纬度 (n, 2)
+    polygon_points,  # 边界顶点经纬度 (m, 2)
+    holes: Sequence = (),  # 禁飞区顶点经纬度列表
+    overlay: bool = True,  # 是否叠加边界和禁飞区
+    max_segments: Optional[int] = PREVIEW_MAX_SEGMENTS,  # 航段数量超过该值时按像素抽稀，取值为None时不抽稀
+):
+    """在给定的坐标轴上绘制航线、起点和终点, 以及边界和禁飞区（经纬度坐标）"""
+    # matplotlib 仅在绘图时导入，纯规划流程不会加载
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+
+    # 设定画图参数
+    wp_label = "Waypoints"
+    plg_label = "Polygon points"
+    hole_label = "No-fly zone"
+    wp_color = "green"
+    link_color = "yellowgreen"
+    plg_color = "red"
+    hole_color = "gray"
+    plg_size = 50
+    title = "WGS84 Coordinate"
+
+    way_points = np.asarray(way_points, dtype=np.float64).reshape(-1, 2)
+    polygon_points = np.asarray(polygon_points, dtype=np.float64).reshape(-1, 2)
+    holes = [np.asarray(hole, dtype=np.float64).reshape(-1, 2) for hole in holes]
+
+    # 相邻航点之间的航段 (n-1, 2, 2)，偶数序号为航线，奇数序号为航线之间的连接段
+    segments = np.stack([way_points[:-1], way_points[1:]], axis=1)
+    lanes, links = segments[0::2], segments[1::2]
+    width = 1.0
+    if max_segments is not None and len(segments) > max_segments:
+        # 按坐标轴的像素大小抽稀（等比例坐标轴，取两个方向中每像素对应的较大经纬度跨度）
+        points = np.concatenate([way_points, polygon_points]) if overlay else way_points
+        origin = points.min(axis=0)
+        extent = np.maximum(points.max(axis=0) - origin, 1e-12)
+        bbox = axs.get_window_extent()
+        cell = max(extent[0] / max(bbox.width, 1.0), extent[1] / max(bbox.height, 1.0)) * PREVIEW_GRID
+        lanes = decimate_segments(lanes, cell, origin)
+        links = decimate_segments(links, cell, origin)
+        width = 0.5  # 航线间距接近像素大小，使用细线
+
+    axs.add_collection(LineCollection(links, colors=link_color, linewidths=0.6 * width))
+    axs.add_collection(LineCollection(lanes, colors=wp_color, linewidths=width))
+    # 起点和终点，显示在最上层
+    axs.plot(*way_points[0], marker="^", color=wp_color, markersize=10, linestyle="none", zorder=4)
+    axs.plot(*way_points[-1], marker="s", color=wp_color, markersize=8, linestyle="none", zorder=4)
+    legend_elements = [
+        Line2D([0], [0], color=wp_color, lw=2, label=wp_label),
+        Line2D([0], [0], marker="^", color="w", markerfacecolor=wp_color, markersize=10, label="Start"),
+        Line2D([0], [0], marker="s", color="w", markerfacecolor=wp_color, markersize=8, label="End"),
+    ]
+
+    if overlay:
+        # 绘制多边形边界，顶点较少时同时绘制顶点；边界和禁飞区显示在航线之上
+        ring = np.concatenate([polygon_points, polygon_points[:1]])
+        axs.plot(ring[:, 0], ring[:, 1], color=plg_color, linewidth=1.0, zorder=3)
+        if len(polygon_points) <= PREVIEW_MAX_MARKERS:
+            axs.scatter(polygon_points[:, 0], polygon_points[:, 1], c=plg_color, marker="o", s=plg_size, zorder=3)
+        legend_elements.append(
+            Line2D([0], [0], marker="o", color=plg_color, markerfacecolor=plg_color, markersize=10, label=plg_label)
+        )
+        for hole in holes:
+            axs.fill(
+                hole[:, 0], hole[:, 1], facecolor=hole_color, edgecolor=hole_color, alpha=0.6, hatch="//", zorder=3
+            )
+        if holes:
+            legend_elements.append(Patch(facecolor=hole_color, edgecolor=hole_color, alpha=0.6, label=hole_label))
+
+    # 添加图例到图形中
+    axs.legend(handles=legend_elements)
+    # 设置网格
+    axs.grid(True)
+    # 设置横纵坐标
+    axs.set_title(title)
+    axs.set_xlabel("Longitude")
+    axs.set_ylabel("Latitude")
+    axs.autoscale_view()
+    axs.axis("equal")
+
+
+def save_preview(
+    output_path,
+    way_points,
+    polygon_points,
+    view_size=(20, 8),
+    dpi=100,
+    holes: Sequence = (),
+    overlay: bool = True,
+    max_segments: Optional[int] = PREVIEW_MAX_SEGMENTS,
+):
+    """使用非交互方式将预览图保存为文件, 格式由后缀决定（.png 为栅格图, .svg/.pdf 为矢量图）"""
+    # 直接使用 Figure 对象而不经过 pyplot，不依赖 GUI 后端，可在多个线程中同时渲染
+    from matplotlib.figure import Figure
+
+    directory = os.path.dirname(output_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    fig = Figure(figsize=view_size, dpi=dpi)
+    axs = fig.add_subplot(1, 1, 1)
+    render_preview(axs, way_points, polygon_points, holes, overlay, max_segments)
+    fig.tight_layout()
+    fig.savefig(output_path)
+    return output_path
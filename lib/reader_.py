@@ -0,0 +1,147 @@
+from array import array
+from typing import BinaryIO, NamedTuple, Optional, Union
+import xml.etree.ElementTree as ET
+import zipfile
+import numpy as np
+
+from .create_ import NAMESPACES
+
+"""
+kmz航线文件读取: 流式解析 wpmz/waylines.wpml 和 wpmz/template.kml,
+每解析完一个Placemark立即从树中移除, 内存占用与航点数量无关（航点数组本身除外）
+"""
+
+# kmz压缩包内的文件路径
+WAYLINES_ARCNAME = "wpmz/waylines.wpml"
+TEMPLATE_ARCNAME = "wpmz/template.kml"
+
+# 任务级参数: 标签名 -> 参数名, 只读取Placemark之外第一次出现的值
+WPML_MISSION_FIELDS = {
+    "wpml:takeOffSecurityHeight": "takeoff_height",
+    "wpml:autoFlightSpeed": "flight_speed",
+    "wpml:executeHeightMode": "height_mode",
+    "wpml:finishAction": "finish_action",
+}
+KML_MISSION_FIELDS = {
+    "wpml:globalHeight": "global_height",
+    "wpml:globalWaypointTurnMode": "turn_mode",
+    "wpml:waypointHeadingMode": "heading_mode",
+    "wpml:coordinateMode": "coordinate_mode",
+}
+
+
+def _qualify(name: str) -> str:
+    # 标签名转换为带命名空间的完整标签名，kml标签不带前缀
+    prefix, _, local = name.rpartition(":")
+    return f"{{{NAMESPACES[prefix or 'kml']}}}{local}"
+
+
+PLACEMARK_TAG = _qualify("Placemark")
+FOLDER_TAG = _qualify("Folder")
+WPML_FIELDS = {_qualify(tag): name for tag, name in WPML_MISSION_FIELDS.items()}
+KML_FIELDS = {_qualify(tag): name for tag, name in KML_MISSION_FIELDS.items()}
+
+
+class KmzMission(NamedTuple):
+    waypoints: np.ndarray  # 航点经纬度 (n, 2)---单位: 度
+    heights: np.ndarray  # 每个航点的执行高度 (n,)，缺失时为nan---单位: 米
+    speeds: np.ndarray  # 每个航点的飞行速度 (n,)，缺失时为nan---单位: 米/秒
+    takeoff_height: Optional[float]  # 起飞高度---单位: 米
+    global_height: Optional[float]  # 航线高度---单位: 米
+    flight_speed: Optional[float]  # 全局飞行速度---单位: 米/秒
+    turn_mode: Optional[str]  # 航点转弯模式
+    heading_mode: Optional[str]  # 偏航角模式
+    height_mode: Optional[str]  # 高度模式
+    finish_action: Optional[str]  # 航线结束动作
+    coordinate_mode: Optional[str]  # 坐标系
+
+
+def _number(text: Optional[str]) -> Optional[float]:
+    return None if text is None or not text.strip() else float(text)
+
+
+def parse_waylines(stream: BinaryIO, on_placemark=None, fields: Optional[dict] = None) -> dict:
+    """
+    使用 iterparse 流式解析kml/wpml文件, 每个Placemark解析完成后调用 on_placemark(element) 并立即移除,
+    返回 fields（完整标签名 -> 参数名）中各任务级参数第一次出现时的文本;
+    on_placemark为None时, 所有任务参数都读取到后不再解析文件的剩余部分
+    """
+    fields = fields or {}
+    values = {}
+    folder = None
+    placemark_depth = 0
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag == PLACEMARK_TAG:
+                placemark_depth += 1
+            elif tag == FOLDER_TAG:
+                folder = element
+        elif tag == PLACEMARK_TAG:
+            placemark_depth -= 1
+            if on_placemark is not None:
+                on_placemark(element)
+            # 从Folder中移除已处理的Placemark，保持内存占用恒定
+            if folder is not None:
+                folder.remove(element)
+            else:
+                element.clear()
+        elif placemark_depth == 0 and tag in fields and fields[tag] not in values:
+            values[fields[tag]] = element.text.strip() if element.text else None
+            if on_placemark is None and len(values) == len(fields):  # 只读取任务参数时提前结束
+                break
+    return values
+
+
+def read_kmz(kmz: Union[str, BinaryIO]) -> KmzMission:
+    """
+    读取kmz航线文件, 返回航点坐标数组及任务参数; kmz可以是文件路径或二进制文件对象
+    航点来自 waylines.wpml, template.kml 不存在时全局高度取第一个航点的执行高度
+    """
+    lng, lat = array("d"), array("d")
+    heights, speeds = array("d"), array("d")
+    placemark_turn_mode = []
+
+    def on_placemark(placemark):
+        coords = placemark.findtext("kml:Point/kml:coordinates", None, NAMESPACES)
+        if coords is None:  # 不是航点
+            return
+        lon_lat = coords.strip().split(",")
+        lng.append(float(lon_lat[0]))
+        lat.append(float(lon_lat[1]))
+        height = _number(placemark.findtext("wpml:executeHeight", None, NAMESPACES))
+        speed = _number(placemark.findtext("wpml:waypointSpeed", None, NAMESPACES))
+        heights.append(np.nan if height is None else height)
+        speeds.append(np.nan if speed is None else speed)
+        if not placemark_turn_mode:
+            turn_mode = placemark.findtext("wpml:waypointTurnParam/wpml:waypointTurnMode", None, NAMESPACES)
+            if turn_mode:
+                placemark_turn_mode.append(turn_mode.strip())
+
+    with zipfile.ZipFile(kmz) as zipf:
+        names = set(zipf.namelist())
+        assert WAYLINES_ARCNAME in names, "kmz文件中没有waylines.wpml"
+        with zipf.open(WAYLINES_ARCNAME) as stream:
+            mission = parse_waylines(stream, on_placemark, WPML_FIELDS)
+        if TEMPLATE_ARCNAME in names:
+            with zipf.open(TEMPLATE_ARCNAME) as stream:
+                mission.update(parse_waylines(stream, None, KML_FIELDS))
+    assert len(lng), "kmz文件中没有航点"
+
+    heights = np.frombuffer(heights, dtype=np.float64)
+    global_height = _number(mission.get("global_height"))
+    if global_height is None and not np.isnan(heights[0]):
+        global_height = float(heights[0])
+    return KmzMission(
+        waypoints=np.column_stack([np.frombuffer(lng, dtype=np.float64), np.frombuffer(lat, dtype=np.float64)]),
+        heights=heights,
+        speeds=np.frombuffer(speeds, dtype=np.float64),
+        takeoff_height=_number(mission.get("takeoff_height")),
+        global_height=global_height,
+        flight_speed=_number(mission.get("flight_speed")),
+        turn_mode=mission.get("turn_mode") or (placemark_turn_mode[0] if placemark_turn_mode else None),
+        heading_mode=mission.get("heading_mode"),
+        height_mode=mission.get("height_mode"),
+        finish_action=mission.get("finish_action"),
+        coordinate_mode=mission.get("coordinate_mode"),
+    )
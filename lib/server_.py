@@ -0,0 +1,377 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from time import perf_counter, time
+from typing import NamedTuple, Optional
+import urllib.request
+import urllib.error
+import threading
+import argparse
+import logging
+import json
+import os
+import numpy as np
+
+from .batch_ import _job_key, convert_coords
+from .calculate_ import Calculator
+from .create_ import KmzCreator
+from .cache_ import PlanCache, write_atomic
+from .instrument_ import Timer, logger
+
+"""
+常驻的航点规划服务: 进程池中的工作进程启动时完成 numpy、shapely、pyproj 的导入和 PROJ 数据库、模板的初始化,
+之后每个请求只进行规划和导出, 投影缓存在请求之间复用; 只监听本机地址, 通过HTTP接收JSON格式的规划任务
+    POST /plan      任务JSON, 返回kmz文件的字节数据; 指定 output_name 时写入输出文件夹并返回JSON
+    GET  /metrics   请求数、失败数、缓存命中数, 以及最近请求的排队、规划、导出和总耗时统计
+    GET  /health    服务状态
+启动方式: python -m lib.server_ --port 8765 --workers 2 --output-dir output --cache-dir cache
+"""
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 请求体大小上限---单位: 字节
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+# 耗时统计使用的最近请求数量
+METRICS_WINDOW = 1000
+KMZ_CONTENT_TYPE = "application/vnd.google-earth.kmz"
+# 任务JSON的字段
+JOB_FIELDS = ("coords", "params", "input_coord_system", "output_coord_system", "takeoff_height", "output_name")
+# 工作进程启动时用于预热的小区域
+WARM_UP_COORDS = [[112.9, 28.1], [112.901, 28.1], [112.901, 28.101], [112.9, 28.101]]
+
+
+class PlanReply(NamedTuple):
+    kmz: Optional[bytes]  # kmz文件的字节数据，写入文件时为None
+    path: Optional[str]  # 写入的kmz文件路径，返回字节数据时为None
+    waypoints: int  # 航点数量
+    flight_speed: float  # 实际飞行速度---单位: 米/秒
+    timing: dict  # 各步骤耗时 queue/plan/export/total---单位: 秒
+    cached: bool = False  # 是否来自缓存
+
+
+def _warm_up():
+    # 工作进程的初始化函数: 完成一次完整的规划和导出, 初始化PROJ数据库、编译模板
+    calc = Calculator(WARM_UP_COORDS, global_height=20)
+    waypoints, flight_speed = calc.calculate(draw=False)
+    KmzCreator(20, calc.global_height, flight_speed, waypoints).to_bytes()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _plan_request(
+    job: dict, submitted: float, output_path: Optional[str], cache: Optional[PlanCache], key
+) -> PlanReply:
+    """在工作进程中执行单个任务: 转换坐标、规划航点、生成kmz, 并写入文件和缓存"""
+    queue = max(time() - submitted, 0.0)  # 不同进程之间使用系统时间
+    timer = Timer()
+    coords = convert_coords(np.array(job["coords"], dtype=np.float64), job["input_coord_system"], "wgs84")
+    params = dict(job["params"])
+    if params.get("holes"):  # 禁飞区与边界使用相同的坐标系
+        params["holes"] = [
+            convert_coords(np.array(hole, dtype=np.float64), job["input_coord_system"], "wgs84")
+            for hole in params["holes"]
+        ]
+    calc = Calculator(wgs84_coords=coords, **params)
+    waypoints, flight_speed = calc.calculate(draw=False)
+    target_coords = convert_coords(waypoints, "wgs84", job["output_coord_system"])
+    timer.lap("plan")
+
+    data = KmzCreator(job["takeoff_height"], calc.global_height, flight_speed, target_coords).to_bytes()
+    if cache is not None:
+        cache.put(key, target_coords, flight_speed, data)
+    if output_path is not None:
+        write_atomic(output_path, data)
+    timer.lap("export")
+    return PlanReply(
+        None if output_path is not None else data,
+        output_path,
+        len(target_coords),
+        flight_speed,
+        {"queue": queue, **timer.steps},
+    )
+
+
+def parse_job(job) -> dict:
+    """检查任务JSON并补充默认值, 格式错误时抛出AssertionError"""
+    assert isinstance(job, dict), "任务格式错误"
+    unknown = set(job) - set(JOB_FIELDS)
+    assert not unknown, f"未知的任务字段: {', '.join(sorted(unknown))}"
+    assert isinstance(job.get("coords"), list) and len(job["coords"]) >= 3, "边界点坐标错误"
+    params = job.get("params", {})
+    assert isinstance(params, dict), "规划参数错误"
+    assert not {"wgs84_coords", "draw"} & set(params), "规划参数错误"
+    job = {
+        "coords": job["coords"],
+        "params": params,
+        "input_coord_system": job.get("input_coord_system", "wgs84"),
+        "output_coord_system": job.get("output_coord_system", "wgs84"),
+        "takeoff_height": job.get("takeoff_height", 20),
+        "output_name": job.get("output_name"),
+    }
+    assert job["input_coord_system"] in ["wgs84", "cgcs2000", "gcj02"], "输入坐标系统错误"
+    assert job["output_coord_system"] in ["wgs84", "cgcs2000", "gcj02"], "输出坐标系统错误"
+    name = job["output_name"]
+    assert name is None or (
+        isinstance(name, str) and name.endswith(".kmz") and os.path.basename(name) == name and name != ".kmz"
+    ), "输出文件名错误"
+    return job
+
+
+class LatencyMetrics:
+    """线程安全的请求计数和最近 window 个成功请求的耗时统计"""
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.timings = deque(maxlen=window)
+        self.started = time()
+
+    def add(self, reply: Optional[PlanReply]):
+        with self.lock:
+            self.requests += 1
+            if reply is None:
+                self.errors += 1
+                return
+            self.cache_hits += reply.cached
+            self.timings.append(reply.timing)
+
+    def summary(self) -> dict:
+        with self.lock:
+            timings = list(self.timings)
+            summary = {
+                "uptime": time() - self.started,
+                "requests": self.requests,
+                "errors": self.errors,
+                "cache_hits": self.cache_hits,
+                "window": len(timings),
+            }
+        for step in ("queue", "plan", "export", "total"):
+            values = np.array([timing[step] for timing in timings if step in timing])
+            if len(values):
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                summary[step] = {
+                    "mean": float(values.mean()),
+                    "p50": float(p50),
+                    "p95": float(p95),
+                    "p99": float(p99),
+                    "max": float(values.max()),
+                }
+        return summary
+
+
+class PlanningServer:
+    """
+    常驻的规划服务, 工作进程在启动时预热, 之后一直保留; start 之后也可以在进程内直接调用 plan
+
+    使用示例:
+        with PlanningServer(port=8765, max_workers=2, output_dir="output") as server:
+            server.serve_forever()
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,  # 监听地址，默认只接受本机请求
+        port: int = DEFAULT_PORT,  # 监听端口，取值为0时自动选择
+        max_workers: int = 2,  # 工作进程数
+        output_dir: Optional[str] = None,  # 任务指定 output_name 时kmz文件的输出文件夹，取值为None时只返回字节数据
+        cache: Optional[PlanCache] = None,  # 规划结果缓存，取值为None时不使用缓存
+    ) -> None:
+        assert max_workers >= 1, "进程数错误"
+        assert 0 <= port <= 65535, "端口错误"
+
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.output_dir = output_dir
+        self.cache = cache
+        self.metrics = LatencyMetrics()
+        self.executor = None
+        self.httpd = None
+
+    def start(self) -> "PlanningServer":
+        """启动并预热所有工作进程，然后开始监听（不处理请求，处理请求见 serve_forever）"""
+        start = perf_counter()
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_up)
+        # 同时提交与进程数相同的任务，使所有工作进程立即启动并完成预热
+        wait([self.executor.submit(_ping) for _ in range(self.max_workers)])
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _PlanningHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.planner = self
+        self.port = self.httpd.server_address[1]
+        logger.info(
+            "规划服务已启动: http://%s:%d, 工作进程 %d 个, 预热耗时 %.2f 秒",
+            self.host,
+            self.port,
+            self.max_workers,
+            perf_counter() - start,
+        )
+        return self
+
+    def serve_forever(self):
+        if self.httpd is None:
+            self.start()
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """停止处理请求（在其它线程中调用）"""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+
+    def close(self):
+        if self.httpd is not None:
+            self.httpd.server_close()
+            self.httpd = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def plan(self, job) -> PlanReply:
+        """检查并执行单个任务, 命中缓存时不提交到工作进程; 任务或参数错误时抛出AssertionError"""
+        start = perf_counter()
+        reply = None
+        try:
+            job = parse_job(job)
+            output_path = None
+            if job["output_name"] is not None:
+                assert self.output_dir is not None, "服务未设置输出文件夹"
+                output_path = os.path.join(self.output_dir, job["output_name"])
+            key = None
+            if self.cache is not None:
+                key = _job_key(job["coords"], job["params"], job)
+                entry = self.cache.get(key)
+                if entry is not None:
+                    if output_path is not None:
+                        write_atomic(output_path, entry.kmz)
+                    timing = {"queue": 0.0, "total": perf_counter() - start}
+                    reply = PlanReply(
+                        None if output_path is not None else entry.kmz,
+                        output_path,
+                        len(entry.waypoints),
+                        entry.flight_speed,
+                        timing,
+                        True,
+                    )
+                    return reply
+            future = self.executor.submit(_plan_request, job, time(), output_path, self.cache, key)
+            reply = future.result()
+            reply.timing["total"] = perf_counter() - start
+            return reply
+        finally:
+            self.metrics.add(reply)
+
+
+class _PlanningHandler(BaseHTTPRequestHandler):
+    server_version = "KmzPlanner/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: dict, headers: Optional[dict] = None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "workers": self.server.planner.max_workers})
+        elif self.path == "/metrics":
+            self._send_json(200, self.server.planner.metrics.summary())
+        else:
+            self._send_json(404, {"error": "路径不存在"})
+
+    def do_POST(self):
+        if self.path != "/plan":
+            self._send_json(404, {"error": "路径不存在"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if not 0 < length <= MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self._send_json(413 if length else 411, {"error": "请求体为空或过大"})
+            return
+        try:
+            job = json.loads(self.rfile.read(length))
+            reply = self.server.planner.plan(job)
+        except (AssertionError, ValueError, TypeError) as e:  # 任务格式或参数错误
+            self._send_json(400, {"error": str(e) or type(e).__name__})
+            return
+        except Exception as e:
+            logger.exception("规划任务失败")
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        # 各步骤耗时通过标准的 Server-Timing 头返回---单位: 毫秒
+        headers = {
+            "Server-Timing": ", ".join(f"{step};dur={value * 1000:.3f}" for step, value in reply.timing.items()),
+            "X-Waypoints": str(reply.waypoints),
+            "X-Flight-Speed": repr(reply.flight_speed),
+            "X-Cache": "hit" if reply.cached else "miss",
+        }
+        if reply.kmz is not None:
+            self._send(200, reply.kmz, KMZ_CONTENT_TYPE, headers)
+        else:
+            data = reply._asdict()
+            del data["kmz"]
+            self._send_json(200, data, headers)
+
+
+def request_plan(job: dict, url: str = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout: float = 60):
+    """
+    向规划服务提交任务: 返回kmz文件的字节数据, 任务指定 output_name 时返回服务端的结果字典（含文件路径）
+    请求失败时抛出RuntimeError, 错误信息为服务端返回的内容
+    """
+    request = urllib.request.Request(
+        url.rstrip("/") + "/plan",
+        data=json.dumps(job).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            if response.headers.get_content_type() == KMZ_CONTENT_TYPE:
+                return body
+            return json.loads(body)
+    except urllib.error.HTTPError as e:
+        message = e.read().decode("utf-8", "replace")
+        try:
+            message = json.loads(message)["error"]
+        except (ValueError, KeyError, TypeError):
+            pass
+        raise RuntimeError(f"规划服务返回错误 {e.code}: {message}") from None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="常驻的航点规划服务")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址，默认只接受本机请求")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--workers", type=int, default=2, help="工作进程数")
+    parser.add_argument("--output-dir", default=None, help="kmz输出文件夹")
+    parser.add_argument("--cache-dir", default=None, help="规划结果缓存文件夹，不设置时不使用缓存")
+    parser.add_argument("--log-level", default="INFO", help="日志级别")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(message)s")
+    cache = PlanCache(args.cache_dir) if args.cache_dir else None
+    with PlanningServer(args.host, args.port, args.workers, args.output_dir, cache) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("规划服务已停止")
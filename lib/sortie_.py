@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import os
+import numpy as np
+
+from .batch_ import convert_coords
+from .calculate_ import Calculator
+from .create_ import KmzCreator
+from .export_ import export_kmz
+from .instrument_ import bind_context
+from .optimize_ import TURN_TIME
+
+"""
+按电池续航拆分架次: 在航线边界处切分规划好的往返航线,
+每个架次包含从起降点飞往首个航点以及从最后一个航点返回起降点的航程
+"""
+
+
+class Sortie(NamedTuple):
+    index: int  # 架次序号，从0开始
+    lanes: Tuple[int, int]  # 包含的航线序号范围 [起始, 结束)
+    waypoints: np.ndarray  # 航点经纬度 (n, 2)---WGS84坐标
+    distance: float  # 估计总航程（含往返起降点）---单位: 米
+    flight_time: float  # 估计飞行时间（含往返起降点）---单位: 秒
+
+
+def split_sorties(
+    calc: Calculator,  # 已完成 calculate 的规划器
+    home: Sequence[float],  # 起降点经纬度---WGS84坐标---单位: 度
+    max_flight_time: Optional[float] = None,  # 单架次飞行时间上限---单位: 秒
+    max_distance: Optional[float] = None,  # 单架次航程上限---单位: 米
+    turn_time: float = TURN_TIME,  # 每次转弯的额外耗时---单位: 秒
+) -> List[Sortie]:
+    """
+    按顺序贪心地切分航线: 每个架次尽可能多地包含后续航线, 直到加上返航航程后超出预算
+    航线保持原有的飞行顺序和方向, 各架次首尾相接即为完整的航线
+    """
+    assert hasattr(calc, "re_points"), "请先进行航点规划"
+    assert max_flight_time is not None or max_distance is not None, "请设置飞行时间或航程上限"
+    assert max_flight_time is None or max_flight_time > 0, "飞行时间上限错误"
+    assert max_distance is None or max_distance > 0, "航程上限错误"
+
+    # 在规划使用的平面坐标系中计算航程, 每两个航点为一条航线的起点和终点 (L, 2, 2)
+    lanes = np.asarray(calc.re_points, dtype=np.float64).reshape(-1, 2, 2)
+    assert len(lanes), "没有可飞行的航线"
+    home_xy = np.array(calc.wgs84_to_mct.transform(home[0], home[1]), dtype=np.float64)
+    speed = calc.effective_flight_speed
+
+    lane_length = np.hypot(*(lanes[:, 1] - lanes[:, 0]).T)
+    link_length = np.hypot(*(lanes[1:, 0] - lanes[:-1, 1]).T)  # 航线 i 终点到航线 i+1 起点
+    to_first = np.hypot(*(lanes[:, 0] - home_xy).T)  # 起降点到各条航线起点
+    to_home = np.hypot(*(lanes[:, 1] - home_xy).T)  # 各条航线终点到起降点
+    # 航线和连接段的累计航程, along[i] 为第 0 条航线起点到第 i 条航线终点
+    along = np.cumsum(lane_length + np.concatenate([[0.0], link_length]))
+
+    sorties = []
+    start = 0
+    while start < len(lanes):
+        # 以 start 为首条航线时，结束于之后每一条航线的架次航程、飞行时间
+        before = along[start] - lane_length[start]
+        distance = to_first[start] + along[start:] - before + to_home[start:]
+        turns = 2 * np.arange(1, len(lanes) - start + 1)  # 每条航线的两端各转弯一次
+        flight_time = distance / speed + turns * turn_time
+        fits = np.ones(len(distance), dtype=bool)
+        if max_distance is not None:
+            fits &= distance <= max_distance
+        if max_flight_time is not None:
+            fits &= flight_time <= max_flight_time
+        assert fits[0], f"第 {start + 1} 条航线单独飞行已超出续航预算"
+        # 取满足预算的最长前缀
+        count = len(fits) if fits.all() else int(np.argmin(fits))
+        stop = start + count
+        waypoints = np.asarray(calc.wgs84_waypoints[2 * start : 2 * stop])
+        sorties.append(
+            Sortie(len(sorties), (start, stop), waypoints, float(distance[count - 1]), float(flight_time[count - 1]))
+        )
+        start = stop
+    return sorties
+
+
+def _write_sortie(path, takeoff_height, global_height, flight_speed, waypoints, coord_system):
+    coords = convert_coords(waypoints, "wgs84", coord_system)
+    kmz = KmzCreator(takeoff_height, global_height, flight_speed, coords)
+    return export_kmz(kmz, path)
+
+
+def export_sorties(
+    sorties: Sequence[Sortie],
+    output_path: str,  # 输出文件路径，各架次文件名为 原文件名_架次序号.kmz
+    takeoff_height: float,  # 起飞高度---单位: 米
+    global_height: float,  # 航线高度---单位: 米
+    flight_speed: float,  # 飞行速度---单位: 米/秒
+    output_coord_system: str = "wgs84",  # 输出坐标系：'wgs84','cgcs2000','gcj02'
+    max_workers: Optional[int] = None,  # 同时导出的架次数，取值为None时使用CPU核数
+) -> List[str]:
+    """在线程池中并行转换坐标并导出每个架次的kmz文件, 按架次顺序返回文件路径"""
+    root, ext = os.path.splitext(output_path)
+    paths = [f"{root}_{sortie.index + 1}{ext or '.kmz'}" for sortie in sorties]
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        futures = [
+            executor.submit(
+                bind_context(_write_sortie),
+                path,
+                takeoff_height,
+                global_height,
+                flight_speed,
+                sortie.waypoints,
+                output_coord_system,
+            )
+            for path, sortie in zip(paths, sorties)
+        ]
+        return [future.result() for future in futures]
+
+
+def sortie_summary(sorties: Sequence[Sortie]) -> str:
+    """生成各架次航线数量、航程和估计飞行时间的摘要"""
+    lines = [f"共 {len(sorties)} 个架次"]
+    for sortie in sorties:
+        lines.append(
+            f"架次 {sortie.index + 1}: 航线 {sortie.lanes[0] + 1}-{sortie.lanes[1]}, 航点 {len(sortie.waypoints)} 个, "
+            f"航程 {sortie.distance:.0f} 米, 估计飞行时间 {sortie.flight_time / 60:.1f} 分钟"
+        )
+    total = sum(sortie.flight_time for sortie in sorties)
+    lines.append(f"总估计飞行时间 {total / 60:.1f} 分钟")
+    return "\n".join(lines)
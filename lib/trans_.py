@@ -1,7 +1,40 @@
+from functools import wraps
+from typing import Tuple
 import numpy as np
 
-# 设置 numpy 的浮点数输出精度
-np.set_printoptions(precision=15)  # 设置为 15 位小数显示
+from .waypoints_ import Waypoints
+
+# WGS84 椭球参数
+A_WGS84 = 6378137.0
+F_WGS84 = 1 / 298.257223563
+E2_WGS84 = 2 * F_WGS84 - F_WGS84**2
+
+# CGCS2000 椭球参数
+A_CGCS2000 = 6378137.0
+F_CGCS2000 = 1 / 298.257222101
+E2_CGCS2000 = 2 * F_CGCS2000 - F_CGCS2000**2
+
+# 地心坐标转大地坐标时, Bowring 初值之后的固定迭代次数
+GEODETIC_ITERATIONS = 2
+
+# GCJ-02 迭代反算的默认收敛容差（单位: 度, 约 0.01 毫米）与最大迭代次数
+GCJ02_INVERSE_TOL = 1e-10
+GCJ02_INVERSE_MAX_ITER = 20
+
+
+def keep_waypoints(method):
+    """输入为 Waypoints 时直接使用其坐标数组（不复制），并以保留逐点数据列的 Waypoints 返回结果"""
+
+    @wraps(method)
+    def wrapper(self, coords, *args, **kwargs):
+        if not isinstance(coords, Waypoints):
+            return method(self, coords, *args, **kwargs)
+        result = method(self, coords.coords, *args, **kwargs)
+        if isinstance(result, tuple):  # (坐标, 其它结果...)
+            return (coords.with_coords(result[0]), *result[1:])
+        return coords.with_coords(result)
+
+    return wrapper
 
 
 class CoordinateTransformer:
@@ -25,9 +58,13 @@ class CoordinateTransformer:
         return ret
 
     # GCJ-02 坐标转换为 WGS-84
-    def gcj02_to_wgs84(self, coords: np.ndarray) -> np.ndarray:
+    @keep_waypoints
+    def gcj02_to_wgs84(self, coords: np.ndarray, precise: bool = False) -> np.ndarray:
         # 检查输入数据的数据类型
         assert coords.dtype == np.float64, "经纬度数据类型应为float64"
+        # 精确模式: 迭代反算, 默认容差与迭代上限
+        if precise:
+            return self.gcj02_to_wgs84_iterative(coords)[0]
 
         lng, lat = coords[:, 0], coords[:, 1]
         dlng = self.lng_transform(lng - 105.0, lat - 35.0)
@@ -47,7 +84,47 @@ class CoordinateTransformer:
         # 返回转换后的坐标
         return np.vstack([lng * 2 - mglng, lat * 2 - mglat]).T
 
+    # GCJ-02 坐标迭代反算为 WGS-84（高精度）
+    @keep_waypoints
+    def gcj02_to_wgs84_iterative(
+        self,
+        coords: np.ndarray,
+        tol: float = GCJ02_INVERSE_TOL,  # 收敛容差---单位: 度
+        max_iter: int = GCJ02_INVERSE_MAX_ITER,  # 最大迭代次数
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        以单步近似解为初值, 对所有点整体做不动点迭代 w = w - (wgs84_to_gcj02(w) - gcj02),
+        已收敛的点不再参与后续迭代。返回 (WGS84 坐标, 每个点的残差),
+        残差为 wgs84_to_gcj02(结果) 与输入坐标在经度、纬度上的最大绝对差---单位: 度
+        """
+        # 检查输入数据的数据类型
+        assert coords.dtype == np.float64, "经纬度数据类型应为float64"
+        assert tol > 0, "收敛容差错误"
+        assert max_iter >= 1, "最大迭代次数错误"
+
+        wgs84_coords = self.gcj02_to_wgs84(coords)  # 初值
+        residual = np.zeros(coords.shape[0], dtype=np.float64)
+        active = np.arange(coords.shape[0])  # 尚未收敛的点位索引
+
+        for i in range(max_iter + 1):
+            if active.size == 0:
+                break
+            # 正算回 GCJ-02 并计算偏差
+            diff = self.wgs84_to_gcj02(wgs84_coords[active]) - coords[active]
+            err = np.abs(diff).max(axis=1)
+            residual[active] = err
+            # 迭代次数用尽后只记录残差, 不再修正
+            if i == max_iter:
+                break
+            # 剔除已收敛的点位
+            keep = err > tol
+            active = active[keep]
+            wgs84_coords[active] -= diff[keep]
+
+        return wgs84_coords, residual
+
     # WGS-84 坐标转换为 GCJ-02
+    @keep_waypoints
     def wgs84_to_gcj02(self, coords: np.ndarray) -> np.ndarray:
         # 检查输入数据的数据类型
         assert coords.dtype == np.float64, "经纬度数据类型应为float64"
@@ -71,20 +148,11 @@ class CoordinateTransformer:
         return np.vstack([mglng, mglat]).T
 
     # WGS-84 坐标转换为 CGCS2000
+    @keep_waypoints
     def wgs84_to_cgcs2000(self, coords: np.ndarray) -> np.ndarray:
         # 检查输入数据的数据类型
         assert coords.dtype == np.float64, "经纬度数据类型应为float64"
 
-        # WGS84 椭球参数
-        a_wgs84 = 6378137.0
-        f_wgs84 = 1 / 298.257223563
-        e2_wgs84 = 2 * f_wgs84 - f_wgs84**2
-
-        # CGCS2000 椭球参数
-        a_cgcs2000 = 6378137.0
-        f_cgcs2000 = 1 / 298.257222101
-        e2_cgcs2000 = 2 * f_cgcs2000 - f_cgcs2000**2
-
         # 七参数
         tx = -0.00016  # 米
         ty = 0.00026
@@ -94,43 +162,16 @@ class CoordinateTransformer:
         rz = 0.0
         ds = 0.0  # ppm
 
-        # 角度转换为弧度，尺度转换为无量纲
-        rx_rad = rx * np.pi / (180 * 3600)
-        ry_rad = ry * np.pi / (180 * 3600)
-        rz_rad = rz * np.pi / (180 * 3600)
-        s = ds * 1e-6
-
-        # 假设高程为 0
-        h = 0.0
-
-        output_coords = np.zeros_like(coords)
-        for i in range(coords.shape[0]):
-            lon, lat = coords[i, 0], coords[i, 1]
-            # 转换为地心直角坐标系
-            X, Y, Z = self.geodetic_to_geocentric(lon, lat, h, a_wgs84, e2_wgs84)
-            # 进行七参数转换
-            X2, Y2, Z2 = self.helmert_transformation(X, Y, Z, tx, ty, tz, rx_rad, ry_rad, rz_rad, s)
-            # 转换回大地坐标系
-            lon2, lat2, h2 = self.geocentric_to_geodetic(X2, Y2, Z2, a_cgcs2000, e2_cgcs2000)
-            output_coords[i, 0] = lon2
-            output_coords[i, 1] = lat2
-        return output_coords
+        return self.datum_transformation(
+            coords, A_WGS84, E2_WGS84, A_CGCS2000, E2_CGCS2000, (tx, ty, tz, rx, ry, rz, ds)
+        )
 
     # CGCS2000 坐标转换为 WGS-84
+    @keep_waypoints
     def cgcs2000_to_wgs84(self, coords: np.ndarray) -> np.ndarray:
         # 检查输入数据的数据类型
         assert coords.dtype == np.float64, "经纬度数据类型应为float64"
 
-        # CGCS2000 椭球参数
-        a_cgcs2000 = 6378137.0
-        f_cgcs2000 = 1 / 298.257222101
-        e2_cgcs2000 = 2 * f_cgcs2000 - f_cgcs2000**2
-
-        # WGS84 椭球参数
-        a_wgs84 = 6378137.0
-        f_wgs84 = 1 / 298.257223563
-        e2_wgs84 = 2 * f_wgs84 - f_wgs84**2
-
         # 七参数的反向
         tx = 0.00016  # 米
         ty = -0.00026
@@ -140,6 +181,13 @@ class CoordinateTransformer:
         rz = 0.0
         ds = 0.0  # ppm
 
+        return self.datum_transformation(
+            coords, A_CGCS2000, E2_CGCS2000, A_WGS84, E2_WGS84, (tx, ty, tz, rx, ry, rz, ds)
+        )
+
+    # 整体数组的七参数基准转换: 大地坐标 -> 地心直角坐标 -> 七参数 -> 大地坐标
+    def datum_transformation(self, coords, a_src, e2_src, a_dst, e2_dst, params) -> np.ndarray:
+        tx, ty, tz, rx, ry, rz, ds = params
         # 角度转换为弧度，尺度转换为无量纲
         rx_rad = rx * np.pi / (180 * 3600)
         ry_rad = ry * np.pi / (180 * 3600)
@@ -149,39 +197,52 @@ class CoordinateTransformer:
         # 假设高程为 0
         h = 0.0
 
-        output_coords = np.zeros_like(coords)
-        for i in range(coords.shape[0]):
-            lon, lat = coords[i, 0], coords[i, 1]
-            # 转换为地心直角坐标系
-            X, Y, Z = self.geodetic_to_geocentric(lon, lat, h, a_cgcs2000, e2_cgcs2000)
-            # 进行七参数转换
-            X2, Y2, Z2 = self.helmert_transformation(X, Y, Z, tx, ty, tz, rx_rad, ry_rad, rz_rad, s)
-            # 转换回大地坐标系
-            lon2, lat2, h2 = self.geocentric_to_geodetic(X2, Y2, Z2, a_wgs84, e2_wgs84)
-            output_coords[i, 0] = lon2
-            output_coords[i, 1] = lat2
+        lon, lat = coords[:, 0], coords[:, 1]
+        # 转换为地心直角坐标系
+        X, Y, Z = self.geodetic_to_geocentric(lon, lat, h, a_src, e2_src)
+        # 进行七参数转换
+        X2, Y2, Z2 = self.helmert_transformation(X, Y, Z, tx, ty, tz, rx_rad, ry_rad, rz_rad, s)
+        # 转换回大地坐标系
+        lon2, lat2, _ = self.geocentric_to_geodetic(X2, Y2, Z2, a_dst, e2_dst)
+
+        output_coords = np.empty_like(coords)
+        output_coords[:, 0] = lon2
+        output_coords[:, 1] = lat2
         return output_coords
 
-    # 地理坐标转换为地心直角坐标
+    # 地理坐标转换为地心直角坐标（支持标量和数组）
     def geodetic_to_geocentric(self, lon, lat, h, a, e2):
         lon_rad = np.deg2rad(lon)
         lat_rad = np.deg2rad(lat)
-        N = a / np.sqrt(1 - e2 * np.sin(lat_rad) ** 2)
-        X = (N + h) * np.cos(lat_rad) * np.cos(lon_rad)
-        Y = (N + h) * np.cos(lat_rad) * np.sin(lon_rad)
-        Z = (N * (1 - e2) + h) * np.sin(lat_rad)
+        sin_lat = np.sin(lat_rad)
+        cos_lat = np.cos(lat_rad)
+        N = a / np.sqrt(1 - e2 * sin_lat**2)
+        X = (N + h) * cos_lat * np.cos(lon_rad)
+        Y = (N + h) * cos_lat * np.sin(lon_rad)
+        Z = (N * (1 - e2) + h) * sin_lat
         return X, Y, Z
 
-    # 地心直角坐标转换为地理坐标
-    def geocentric_to_geodetic(self, X, Y, Z, a, e2):
+    # 地心直角坐标转换为地理坐标（支持标量和数组）
+    def geocentric_to_geodetic(self, X, Y, Z, a, e2, iterations=GEODETIC_ITERATIONS):
+        """
+        纬度求解不再使用逐点的 while 循环, 而是先用 Bowring 闭式解得到初值,
+        再对整个数组做固定次数的不动点迭代 lat = atan2(Z, p(1 - e2 N / (N + h)))。
+        误差界: 对 -1 km < h < 10 km 的点, Bowring 初值的纬度误差小于 1e-12 rad (亚微米级),
+        迭代 1 次后纬度误差降至 float64 舍入误差 (约 1e-15 rad), 默认迭代 2 次使高程误差小于 1e-8 米。
+        """
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64)
+        Z = np.asarray(Z, dtype=np.float64)
         # 计算经度
         lon = np.arctan2(Y, X)
-        # 迭代计算纬度
-        p = np.sqrt(X**2 + Y**2)
-        lat = np.arctan2(Z, p * (1 - e2))
-        lat_prev = 0.0
-        while np.abs(lat - lat_prev) > 1e-12:
-            lat_prev = lat
+        p = np.hypot(X, Y)
+        # Bowring 闭式初值
+        b = a * np.sqrt(1 - e2)
+        ep2 = e2 / (1 - e2)
+        theta = np.arctan2(Z * a, p * b)
+        lat = np.arctan2(Z + ep2 * b * np.sin(theta) ** 3, p - e2 * a * np.cos(theta) ** 3)
+        # 固定次数迭代
+        for _ in range(iterations):
             N = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
             h = p / np.cos(lat) - N
             lat = np.arctan2(Z, p * (1 - e2 * N / (N + h)))
@@ -193,7 +254,7 @@ class CoordinateTransformer:
         lon_deg = np.rad2deg(lon)
         return lon_deg, lat_deg, h
 
-    # 七参数转换
+    # 七参数转换（支持标量和数组）
     def helmert_transformation(self, X, Y, Z, tx, ty, tz, rx, ry, rz, s):
         X2 = tx + (1 + s) * (X - rz * Y + ry * Z)
         Y2 = ty + (1 + s) * (rz * X + Y - rx * Z)
@@ -201,6 +262,7 @@ class CoordinateTransformer:
         return X2, Y2, Z2
 
     # GCJ-02 坐标转换为 CGCS2000
+    @keep_waypoints
     def gcj02_to_cgcs2000(self, coords: np.ndarray) -> np.ndarray:
         # 首先将 GCJ-02 转换为 WGS-84，然后再转换为 CGCS2000
         coords_wgs84 = self.gcj02_to_wgs84(coords)
@@ -208,6 +270,7 @@ class CoordinateTransformer:
         return coords_cgcs2000
 
     # CGCS2000 坐标转换为 GCJ-02
+    @keep_waypoints
     def cgcs2000_to_gcj02(self, coords: np.ndarray) -> np.ndarray:
         # 首先将 CGCS2000 转换为 WGS-84，然后再转换为 GCJ-02
         coords_wgs84 = self.cgcs2000_to_wgs84(coords)
@@ -230,4 +293,5 @@ if __name__ == "__main__":
     )
 
     coords = trans.gcj02_to_wgs84(coords_)
-    print(f"84坐标系下的经纬度: \n{coords}")
+    with np.printoptions(precision=15):  # 15 位小数显示，不修改全局设置
+        print(f"84坐标系下的经纬度: \n{coords}")
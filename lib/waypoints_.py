@@ -0,0 +1,91 @@
+from typing import Optional
+import numpy as np
+
+"""
+航点容器: 经纬度保存在一个连续的float64数组 (n, 2) 中, 可选的逐点高度、速度列 (n,),
+在坐标转换、Calculator 和 KmzCreator 之间传递时不再转换为列表、元组或 shapely 点对象
+"""
+
+
+def _column(values, n: int) -> Optional[np.ndarray]:
+    # 可选的逐点数据列，已是float64数组时不复制
+    if values is None:
+        return None
+    column = np.asarray(values, dtype=np.float64).reshape(-1)
+    assert len(column) == n, "逐点数据的长度与航点数量不一致"
+    return column
+
+
+class Waypoints:
+    """
+    航点容器, 实现了 __array__, 可以直接传给 np.asarray（不复制）以及接受数组的函数
+    整数索引返回单个航点的经纬度, 切片和索引数组返回新的 Waypoints（切片共享内存）
+    """
+
+    __slots__ = ("coords", "heights", "speeds")
+
+    def __init__(
+        self,
+        coords,  # 经纬度 (n, 2)---单位: 度，已是连续的float64数组时不复制
+        heights=None,  # 每个航点的执行高度 (n,)，取值为None时使用全局高度---单位: 米
+        speeds=None,  # 每个航点的飞行速度 (n,)，取值为None时使用全局速度---单位: 米/秒
+    ) -> None:
+        if isinstance(coords, Waypoints):
+            heights = coords.heights if heights is None else heights
+            speeds = coords.speeds if speeds is None else speeds
+            coords = coords.coords
+        self.coords = np.ascontiguousarray(np.asarray(coords, dtype=np.float64).reshape(-1, 2))
+        self.heights = _column(heights, len(self.coords))
+        self.speeds = _column(speeds, len(self.coords))
+
+    @property
+    def lng(self) -> np.ndarray:
+        return self.coords[:, 0]
+
+    @property
+    def lat(self) -> np.ndarray:
+        return self.coords[:, 1]
+
+    @property
+    def shape(self):
+        return self.coords.shape
+
+    @property
+    def dtype(self):
+        return self.coords.dtype
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.coords.dtype:
+            return self.coords.copy() if copy else self.coords
+        return self.coords.astype(dtype)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer, tuple)):  # 单个航点或二维索引，返回数组
+            return self.coords[key]
+        return Waypoints(
+            self.coords[key],
+            None if self.heights is None else self.heights[key],
+            None if self.speeds is None else self.speeds[key],
+        )
+
+    def __iter__(self):
+        return iter(self.coords)
+
+    def __repr__(self) -> str:
+        columns = [name for name in ("heights", "speeds") if getattr(self, name) is not None]
+        return f"Waypoints({len(self)} 个航点{', ' + ', '.join(columns) if columns else ''})"
+
+    def with_coords(self, coords) -> "Waypoints":
+        """替换经纬度（如坐标转换后），保留逐点数据列"""
+        return Waypoints(coords, self.heights, self.speeds)
+
+    def tolist(self) -> list:
+        return self.coords.tolist()
+
+
+def as_waypoints(points) -> Waypoints:
+    """将 Waypoints、数组或经纬度列表转换为 Waypoints，已是 Waypoints 时直接返回"""
+    return points if isinstance(points, Waypoints) else Waypoints(points)
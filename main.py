@@ -1,16 +1,21 @@
 from lib import *
+import logging
+import numpy as np
 
 #############################################################
 ## 参数
 #############################################################
 
 input_coord_system = "wgs84"  # 根据输入坐标的坐标系进行选择：'wgs84','cgcs2000','gcj02'
+gcj02_precise = False  # 输入为GCJ02坐标时是否使用迭代反算（高精度，输出与单步近似相差1-2米），默认False为单步近似
 input_coords = [
     [112.944666091529, 28.1851235963937],
     [112.945041600791, 28.1851718761559],
     [112.94482702407, 28.1865451671716],
     [112.944416646091, 28.1863681413766],
 ]  # 飞行区域的经纬度坐标---单位：度
+input_holes = []  # 飞行区域内的禁飞区（每个为一组经纬度坐标，与输入坐标的坐标系相同）---单位：度
+input_area_file = None  # 飞行区域的kml/kmz文件路径，设置后使用文件中的第一个多边形（含内环禁飞区）代替上述坐标
 
 takeoff_height = 20  # 起飞高度---单位: 米
 global_height = 20  # 航线高度---单位: 米
@@ -24,6 +29,7 @@ angle = (0, 1)
 3. angle = 
 ((112.944666091529, 28.1851235963937),(112.94482702407, 28.1865451671716))
 # 航线方向点位---航线方向的起点经纬度坐标和终点经纬度坐标
+4. angle = "auto"  # 自动选择航线方向---每隔0.5度估计一次飞行时间，选择飞行时间最短的方向
 """
 heading_offset = 0  # 航向偏移---正数向外,负数向内---单位 :米
 camera_HFOV = 52.8  # 相机水平FOV---单位: 度
@@ -33,34 +39,56 @@ heading_overlap_ratio = 15  # 单侧航向重叠率---单位: 百分比
 start_dir = "right"  # 起始飞行点---是在航向的右边还是左边，默认右边
 camera_shoot_time = 1  # 相机拍照间隔时间---单位: 秒
 view_size = (12, 6)  # 预览图大小---单位：英尺
+preview_path = None  # 预览图输出路径（.png/.svg），取值为None时弹出预览窗口
 
 output_path = r"output/waypoints.kmz"  # 输出文件路径
+max_flight_time = None  # 单架次飞行时间上限---单位: 分钟  取值为None时不限制
+max_flight_distance = None  # 单架次航程上限---单位: 米  取值为None时不限制
+home_point = None  # 起降点经纬度（与输入坐标的坐标系相同），设置了上述上限时必须填写---单位：度
+# 设置了上限时按航线拆分为多个架次, 除完整航线外每个架次另外输出一个kmz文件: 输出文件名_架次序号.kmz
 output_coord_system = "wgs84"  # 根据目标坐标的坐标系进行选择：'wgs84','cgcs2000','gcj02'
+# 规划结果缓存文件夹，设置后（如 "cache"）输入和参数都没有变化时直接使用缓存的航点和kmz文件
+cache_dir = None  # 取值为None时不使用缓存，也不创建缓存文件夹
+show_preview = True  # 是否显示或导出预览图，命中缓存时直接使用缓存的航点绘制，不重新规划
+log_level = "INFO"  # 控制台信息的级别：'DEBUG','INFO','WARNING'，DEBUG时显示kml和wpml文件的导出过程
 
 #############################################################
 #############################################################
 
 if __name__ == "__main__":
+    logging.basicConfig(level=log_level, format="%(message)s")
+
     #############################################################
     ## 将输入坐标(WGS84、CGCS2000、GCJ02)转换至WGS84坐标
     #############################################################
 
     assert input_coord_system in ["wgs84", "cgcs2000", "gcj02"], "输入坐标系统错误"
+    if input_area_file is not None:
+        area = next(iter_areas(input_area_file, input_coord_system), None)
+        assert area is not None, "文件中没有多边形"
+        input_coords, input_holes = area.exterior, area.holes
     trans = CoordinateTransformer()
-    coords_ = np.array(input_coords, dtype=np.float64)
-    if input_coord_system == "wgs84":
-        wgs84_coords = coords_.tolist()
-    elif input_coord_system == "cgcs2000":
-        wgs84_coords = trans.cgcs2000_to_wgs84(coords_).tolist()
-    else:  # 'gcj02'
-        wgs84_coords = trans.gcj02_to_wgs84(coords_).tolist()
+    # 边界和禁飞区一起转换，再按顶点数量拆分
+    coords_ = np.concatenate([np.array(ring, dtype=np.float64).reshape(-1, 2) for ring in [input_coords, *input_holes]])
+    if input_coord_system == "cgcs2000":
+        coords_ = trans.cgcs2000_to_wgs84(coords_)
+    elif input_coord_system == "gcj02":
+        coords_ = trans.gcj02_to_wgs84(coords_, precise=gcj02_precise)
+    rings_ = np.split(coords_, np.cumsum([len(ring) for ring in [input_coords, *input_holes]])[:-1])
+    wgs84_coords, wgs84_holes = rings_[0], rings_[1:]
+    if home_point is not None:
+        home_ = np.array([home_point], dtype=np.float64)
+        if input_coord_system == "cgcs2000":
+            home_ = trans.cgcs2000_to_wgs84(home_)
+        elif input_coord_system == "gcj02":
+            home_ = trans.gcj02_to_wgs84(home_, precise=gcj02_precise)
+        wgs84_home = home_[0].tolist()
 
     #############################################################
     ## 根据WGS84坐标以及给定参数进行航点规划
     #############################################################
 
-    calc = Calculator(
-        wgs84_coords=wgs84_coords,
+    calc_params = dict(
         global_height=global_height,
         flight_speed=flight_speed,
         angle=angle,
@@ -73,25 +101,89 @@ if __name__ == "__main__":
         camera_shoot_time=camera_shoot_time,
         view_size=view_size,
     )
-    waypoint_coords_wgs84, flight_speed = calc.calculate()
+    calc = Calculator(wgs84_coords=wgs84_coords, holes=wgs84_holes, **calc_params)
+
+    # 缓存键包含输入坐标（含禁飞区）、坐标系、所有规划参数、起飞高度以及模板文件内容
+    cache_entry = None
+    if cache_dir is not None:
+        cache = PlanCache(cache_dir)
+        cache_key = plan_key(
+            [input_coords, *input_holes],
+            dict(
+                calc_params,
+                input_coord_system=input_coord_system,
+                gcj02_precise=gcj02_precise,
+                output_coord_system=output_coord_system,
+                takeoff_height=takeoff_height,
+            ),
+        )
+        cache_entry = cache.get(cache_key)
+
+    if cache_entry is None:
+        waypoints_wgs84, flight_speed = calc.calculate()
+
+        #############################################################
+        ## 将输出WGS84坐标转换至目标坐标(WGS84、CGCS2000、GCJ02)
+        #############################################################
+
+        assert output_coord_system in ["wgs84", "cgcs2000", "gcj02"], "输出坐标系统错误"
+        trans = CoordinateTransformer()
+        # 航点保持为 Waypoints（连续的float64数组），转换和导出过程中不再转换为列表
+        if output_coord_system == "wgs84":
+            target_coords = waypoints_wgs84
+        elif output_coord_system == "cgcs2000":
+            target_coords = trans.wgs84_to_cgcs2000(waypoints_wgs84)
+        else:  # 'gcj02'
+            target_coords = trans.wgs84_to_gcj02(waypoints_wgs84)
+
+        #############################################################
+        ## 生成KMZ文件
+        #############################################################
+
+        kmz = KmzCreator(takeoff_height, global_height, flight_speed, target_coords)
+        if cache_dir is None:
+            kmz.create(output_path)
+        else:  # 同时写入缓存
+            kmz_data = kmz.to_bytes()
+            write_atomic(output_path, kmz_data)
+            cache.put(cache_key, target_coords, flight_speed, kmz_data)
+    else:
+        logger.info("输入和参数没有变化, 使用缓存的规划结果")
+        target_coords, flight_speed = Waypoints(cache_entry.waypoints), cache_entry.flight_speed
+        write_atomic(output_path, cache_entry.kmz)
+    if cache_dir is not None:
+        stats = cache.stats()
+        logger.info(
+            "缓存: 命中 %d 次, 未命中 %d 次, 共 %d 个, %.2f MB",
+            stats.hits,
+            stats.misses,
+            stats.entries,
+            stats.size / 1e6,
+        )
 
     #############################################################
-    ## 将输出WGS84坐标转换至目标坐标(WGS84、CGCS2000、GCJ02)
+    ## 按续航拆分架次, 并行生成每个架次的KMZ文件
     #############################################################
 
-    assert output_coord_system in ["wgs84", "cgcs2000", "gcj02"], "输出坐标系统错误"
-    trans = CoordinateTransformer()
-    coords = np.array(waypoint_coords_wgs84, dtype=np.float64)
-    if output_coord_system == "wgs84":
-        target_coords = coords.tolist()
-    elif output_coord_system == "cgcs2000":
-        target_coords = trans.wgs84_to_cgcs2000(coords).tolist()
-    else:  # 'gcj02'
-        target_coords = trans.wgs84_to_gcj02(coords).tolist()
+    if max_flight_time is not None or max_flight_distance is not None:
+        assert home_point is not None, "请设置起降点"
+        if cache_entry is not None:  # 命中缓存时拆分架次需要完整的规划结果
+            calc.calculate()
+        sorties = split_sorties(
+            calc,
+            wgs84_home,
+            max_flight_time=None if max_flight_time is None else max_flight_time * 60,
+            max_distance=max_flight_distance,
+        )
+        logger.info(sortie_summary(sorties))
+        export_sorties(sorties, output_path, takeoff_height, global_height, flight_speed, output_coord_system)
 
     #############################################################
-    ## 生成KMZ文件
+    ## 显示或导出预览图
     #############################################################
 
-    kmz = KmzCreator(takeoff_height, global_height, flight_speed, target_coords)
-    kmz.create(output_path, remove_temp=True)
+    if show_preview:
+        if hasattr(calc, "wgs84_waypoints"):
+            calc.draw(preview_path)
+        else:  # 命中缓存: 将缓存的目标坐标系航点转换回WGS84后绘制
+            calc.draw(preview_path, way_points=convert_coords(target_coords, output_coord_system, "wgs84"))
@@ -0,0 +1,32 @@
+import os
+import sys
+
+# 将项目根目录添加到系统路径, 便于直接运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import numpy as np
+from lib.deviation_ import read_kmz_waypoints, deviation_report, format_deviation_report
+from extrat_img_info import scan_images
+
+"""
+统计规划航点与实际拍照位置的偏差: 航点来自kmz文件, 拍照位置来自照片的EXIF信息
+运行方式: python utils/deviation_report.py 航线.kmz 图片文件夹 [--coord-system wgs84]
+"""
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="统计规划航点与实际拍照位置的偏差")
+    parser.add_argument("kmz", help="规划航线的kmz文件")
+    parser.add_argument("folder", help="包含图片的文件夹")
+    parser.add_argument(
+        "--coord-system", default="wgs84", choices=["wgs84", "cgcs2000", "gcj02"], help="kmz文件中航点的坐标系"
+    )
+    parser.add_argument("--index", default=None, help="图片索引文件路径，默认保存在图片文件夹中")
+    parser.add_argument("--workers", type=int, default=None, help="读取图片的线程数")
+    args = parser.parse_args()
+
+    planned = read_kmz_waypoints(args.kmz, args.coord_system)
+    records = [record for record in scan_images(args.folder, args.index, args.workers) if record.lon is not None]
+    assert records, "图片中没有GPS信息"
+    photos = np.array([(record.lon, record.lat) for record in records], dtype=np.float64)
+    print(format_deviation_report(deviation_report(planned, photos)))
@@ -1,11 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional
+import argparse
 import exifread
+import json
 import os
-import glob
+import io
 
 """
 用于提取jpg图像中的经度、纬度、高度信息
+只读取文件开头的 EXIF（APP1）段, 在线程池中并行解析, 结果写入 JSON lines 索引文件;
+再次运行时跳过路径、大小和修改时间都没有变化的文件
+
+运行方式: python utils/extrat_img_info.py [图片文件夹] [--index 索引文件] [--workers 线程数]
 """
 
+# 图片文件扩展名（不区分大小写）
+IMAGE_EXTENSIONS = (".jpg", ".jpeg")
+# 默认索引文件名，保存在图片文件夹中
+INDEX_FILENAME = "gps_index.jsonl"
+# JPEG 标记: 图像开始、EXIF所在的APP1段、扫描数据开始、图像结束
+JPEG_SOI = b"\xff\xd8"
+JPEG_APP1 = 0xE1
+JPEG_SOS = 0xDA
+JPEG_EOI = 0xD9
+EXIF_HEADER = b"Exif\x00\x00"
+
+
+class ImageRecord(NamedTuple):
+    path: str  # 图片路径
+    size: int  # 文件大小---单位: 字节
+    mtime: float  # 修改时间戳
+    lon: Optional[float]  # 经度，没有GPS信息时为None---单位: 度
+    lat: Optional[float]  # 纬度---单位: 度
+    alt: Optional[float]  # 高度---单位: 米
+
 
 def convert_to_degrees(value):
     """
@@ -19,38 +47,140 @@ def convert_to_degrees(value):
     return d + (m / 60.0) + (s / 3600.0)
 
 
-# 指定包含图片的文件夹
-folder = "data/gd"  # 请将此路径替换为您的变量文件夹路径
-
-# 仅遍历文件夹中的 .jpg 图片文件
-jpg_files = glob.glob(os.path.join(folder, "*.jpg"))
-# 如果需要同时检查大写扩展名的文件，请取消注释以下行
-# jpg_files += glob.glob(os.path.join(folder, '*.JPG'))
-
-for filepath in jpg_files:
-    with open(filepath, "rb") as f:
-        tags = exifread.process_file(f)
-        # 检查是否存在GPS信息
-        if "GPS GPSLatitude" in tags and "GPS GPSLongitude" in tags:
-            # 提取GPS纬度和经度参考方向
-            lat_ref = tags.get("GPS GPSLatitudeRef").values
-            lon_ref = tags.get("GPS GPSLongitudeRef").values
-            # 提取GPS纬度和经度值
-            lat = tags["GPS GPSLatitude"].values
-            lon = tags["GPS GPSLongitude"].values
-            # 将坐标转换为十进制度数
-            lat_dd = convert_to_degrees(lat)
-            lon_dd = convert_to_degrees(lon)
-            # 根据参考方向调整正负号
-            if lat_ref != "N":
-                lat_dd = -lat_dd
-            if lon_ref != "E":
-                lon_dd = -lon_dd
-            # 打印结果，保留15位小数
-            if "GPS GPSAltitude" in tags:
-                alt = tags["GPS GPSAltitude"].values[0].num / tags["GPS GPSAltitude"].values[0].den
-                print(f"文件: {filepath}, 经度: {lon_dd:.15f}, 纬度: {lat_dd:.15f}, 高度: {alt:.15f}")
-            else:
-                print(f"文件: {filepath}, 经度: {lon_dd:.15f}, 纬度: {lat_dd:.15f}, 高度: None")
+def read_exif_segment(f) -> Optional[bytes]:
+    """
+    依次跳过JPEG文件开头的各个段, 只读取EXIF所在的APP1段,
+    返回由图像开始标记和该段组成的最小JPEG头; 没有EXIF信息时返回None
+    """
+    if f.read(2) != JPEG_SOI:
+        return None
+    while True:
+        marker = f.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None
+        kind = marker[1]
+        if kind in (JPEG_SOS, JPEG_EOI):  # 图像数据开始，之后不会再有EXIF段
+            return None
+        length = int.from_bytes(marker[2:4], "big")
+        if kind == JPEG_APP1:
+            data = f.read(length - 2)
+            if data.startswith(EXIF_HEADER):
+                return JPEG_SOI + marker + data
+        else:
+            f.seek(length - 2, io.SEEK_CUR)
+
+
+def parse_gps(tags):
+    """从EXIF标签中提取经度、纬度、高度，没有GPS信息时返回 (None, None, None)"""
+    # 检查是否存在GPS信息
+    if "GPS GPSLatitude" not in tags or "GPS GPSLongitude" not in tags:
+        return None, None, None
+    # 提取GPS纬度和经度参考方向
+    lat_ref = tags["GPS GPSLatitudeRef"].values if "GPS GPSLatitudeRef" in tags else "N"
+    lon_ref = tags["GPS GPSLongitudeRef"].values if "GPS GPSLongitudeRef" in tags else "E"
+    # 将坐标转换为十进制度数
+    lat_dd = convert_to_degrees(tags["GPS GPSLatitude"].values)
+    lon_dd = convert_to_degrees(tags["GPS GPSLongitude"].values)
+    # 根据参考方向调整正负号
+    if lat_ref != "N":
+        lat_dd = -lat_dd
+    if lon_ref != "E":
+        lon_dd = -lon_dd
+    alt = None
+    if "GPS GPSAltitude" in tags:
+        alt = tags["GPS GPSAltitude"].values[0].num / tags["GPS GPSAltitude"].values[0].den
+    return lon_dd, lat_dd, alt
+
+
+def read_image_record(path: str, size: int, mtime: float) -> ImageRecord:
+    """读取单张图片的GPS信息"""
+    with open(path, "rb") as f:
+        header = read_exif_segment(f)
+    lon = lat = alt = None
+    if header is not None:
+        # 只解析EXIF头, 不解析厂商信息和缩略图
+        tags = exifread.process_file(io.BytesIO(header), details=False, extract_thumbnail=False)
+        lon, lat, alt = parse_gps(tags)
+    return ImageRecord(path, size, mtime, lon, lat, alt)
+
+
+def find_images(folder: str) -> Iterator[os.DirEntry]:
+    """递归遍历文件夹（包括子文件夹）中的jpg图片, 扩展名不区分大小写"""
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from find_images(entry.path)
+            elif entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry
+
+
+def load_index(index_path: str) -> Dict[str, ImageRecord]:
+    """读取索引文件，返回 路径 -> 记录 的字典"""
+    records = {}
+    if not os.path.exists(index_path):
+        return records
+    with open(index_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = ImageRecord(**json.loads(line))
+                records[record.path] = record
+    return records
+
+
+def save_index(index_path: str, records: List[ImageRecord]):
+    """先写临时文件再重命名, 写入过程中中断不会损坏原索引"""
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+    os.replace(temp_path, index_path)
+
+
+def scan_images(
+    folder: str,  # 图片文件夹
+    index_path: Optional[str] = None,  # 索引文件路径，取值为None时保存在图片文件夹中
+    max_workers: Optional[int] = None,  # 线程数，取值为None时根据CPU核数确定
+) -> List[ImageRecord]:
+    """
+    扫描文件夹中的所有图片并更新索引, 返回按路径排序的全部记录
+    路径、大小和修改时间都没有变化的图片直接使用索引中的记录, 已删除的图片从索引中移除
+    """
+    assert os.path.isdir(folder), "图片文件夹不存在"
+    if index_path is None:
+        index_path = os.path.join(folder, INDEX_FILENAME)
+    cached = load_index(index_path)
+
+    records = []
+    pending = []
+    for entry in find_images(folder):
+        stat = entry.stat()
+        record = cached.get(entry.path)
+        if record is not None and record.size == stat.st_size and record.mtime == stat.st_mtime:
+            records.append(record)
+        else:
+            pending.append((entry.path, stat.st_size, stat.st_mtime))
+
+    # 读取文件头以磁盘IO为主，使用线程池并行处理
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        records += executor.map(lambda item: read_image_record(*item), pending)
+
+    records.sort(key=lambda record: record.path)
+    save_index(index_path, records)
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提取jpg图像中的经度、纬度、高度信息")
+    parser.add_argument("folder", nargs="?", default="data/gd", help="包含图片的文件夹")
+    parser.add_argument("--index", default=None, help="索引文件路径（JSON lines），默认保存在图片文件夹中")
+    parser.add_argument("--workers", type=int, default=None, help="线程数")
+    args = parser.parse_args()
+
+    for record in scan_images(args.folder, args.index, args.workers):
+        # 打印结果，保留15位小数
+        if record.lon is None:
+            print(f"文件 {record.path} 中没有GPS信息")
+        elif record.alt is None:
+            print(f"文件: {record.path}, 经度: {record.lon:.15f}, 纬度: {record.lat:.15f}, 高度: None")
         else:
-            print(f"文件 {filepath} 中没有GPS信息")
+            print(f"文件: {record.path}, 经度: {record.lon:.15f}, 纬度: {record.lat:.15f}, 高度: {record.alt:.15f}")